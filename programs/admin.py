@@ -1,11 +1,20 @@
 import re
 from datetime import datetime
 from django.contrib import admin
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import format_html
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth import get_user_model
+from django.core.exceptions import PermissionDenied
+from django.contrib import messages
 from django.http import HttpResponse
+from django.shortcuts import render
 from django.template.loader import render_to_string
-from .models import Category, Program, StaffProfile, GoverningCouncil, CourseRegistration, StudyRoom, RoomReservation, StudentProfile
+from django.urls import path
+from .models import Category, Program, StaffProfile, GoverningCouncil, CourseRegistration, StudyRoom, RoomReservation, StudentProfile, Job
+from .forms import StudentImportForm
+from .onboarding import ImportFileError, import_students, read_rows, web_import_limit
 
 User = get_user_model()
 
@@ -21,11 +30,44 @@ class StudentProfileInline(admin.StackedInline):
 class UserAdmin(BaseUserAdmin):
     inlines = (StudentProfileInline,)
     list_display = ('username', 'get_student_id', 'email', 'is_staff', 'is_active')
+    list_select_related = ('student_profile',)
     
     def get_student_id(self, instance):
         return instance.student_profile.student_id if hasattr(instance, 'student_profile') else "-"
     get_student_id.short_description = 'Student ID'
 
+    # Intake sheets: the "Import students" button on the user list
+    change_list_template = 'admin/users/customuser/change_list.html'
+
+    def get_urls(self):
+        urls = [path('import-students/', self.admin_site.admin_view(self.import_students_view), name='users_customuser_import')]
+        return urls + super().get_urls()
+
+    def import_students_view(self, request):
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+        form = StudentImportForm(request.POST or None, request.FILES or None)
+        result = None
+        if request.method == 'POST' and form.is_valid():
+            sheet = form.cleaned_data['sheet']
+            try:
+                records = read_rows(sheet, sheet.name)
+                too_big = web_import_limit(records)
+                if too_big and not form.cleaned_data['dry_run']:
+                    raise ImportFileError(f"{too_big}. Import this sheet with `manage.py import_students`.")
+                # In-process hashing: no process pool forked from a web worker
+                created, errors = import_students(
+                    records, default_password=form.cleaned_data['default_password'] or None,
+                    workers=1, dry_run=form.cleaned_data['dry_run'],
+                )
+                result = {'rows': len(records), 'created': created, 'errors': errors, 'dry_run': form.cleaned_data['dry_run']}
+                if created and not result['dry_run']:
+                    messages.success(request, f"{created} students created.")
+            except ImportFileError as e:
+                form.add_error('sheet', str(e))
+        context = {**self.admin_site.each_context(request), 'opts': self.model._meta, 'form': form, 'result': result, 'title': "Import students"}
+        return render(request, 'admin/users/customuser/import_students.html', context)
+
 try:
     admin.site.unregister(User)
 except admin.sites.NotRegistered:
@@ -69,10 +111,16 @@ class GoverningCouncilAdmin(admin.ModelAdmin):
 
 @admin.register(CourseRegistration)
 class CourseRegistrationAdmin(admin.ModelAdmin):
-    list_display = ('full_name', 'email', 'program', 'registration_type', 'submitted_at')
+    list_display = ('full_name', 'email', 'program', 'registration_type', 'submitted_at', 'processed_at', 'receipt')
     list_filter = ('program', 'registration_type', 'submitted_at')
-    search_fields = ('full_name', 'email', 'phone_number')
-    readonly_fields = ('submitted_at',)
+    list_select_related = ('program',)
+    search_fields = ('full_name', 'email', 'phone_number', 'payment_checksum')
+    readonly_fields = ('submitted_at', 'payment_checksum', 'payment_preview', 'confirmation_sent_at', 'processed_at')
+
+    @admin.display(description='Receipt')
+    def receipt(self, obj):
+        url = reverse('programs:registration_receipt', args=[obj.pk])
+        return format_html('<a href="{}" target="_blank">PDF</a>', url)
 
 # --- 4. STUDY ROOM & RESERVATION UPDATES (FIXED FOR DATE + AM/PM) ---
 
@@ -158,4 +206,22 @@ class RoomReservationAdmin(admin.ModelAdmin):
             'fields': ('reserved_at',),
             'classes': ('collapse',)
         }),
-    )
\ No newline at end of file
+    )
+
+# --- 5. BACKGROUND JOBS ---
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('task', 'status', 'attempts', 'max_attempts', 'run_after', 'created_at', 'finished_at')
+    list_filter = ('status', 'task')
+    search_fields = ('task',)
+    readonly_fields = ('created_at', 'started_at', 'finished_at', 'worker', 'lease_until', 'last_error')
+    actions = ['retry_jobs']
+
+    @admin.action(description="Retry selected jobs now")
+    def retry_jobs(self, request, queryset):
+        updated = queryset.exclude(status=Job.RUNNING).update(
+            status=Job.QUEUED, run_after=timezone.now(), attempts=0, finished_at=None,
+        )
+        self.message_user(request, f"{updated} job(s) queued again.")
+
@@ -0,0 +1,239 @@
+"""
+Study room occupancy analytics.
+
+compute_day_stats() turns the reservations of a range of days into one
+RoomDayStats row per room and day, with NumPy instead of a Python loop per
+booking: each room gets a row of minute cells spanning the whole range, each
+reservation adds +1 at its first minute and -1 after its last (np.add.at),
+and a cumulative sum along the row says whether the room is held at each
+minute. Every figure is then a reduction over that array:
+
+* hourly_minutes - minutes held in each hour of the day;
+* booked_minutes - minutes held within ROOM_OPENING_HOURS, which with
+  open_minutes gives occupancy, and with capacity (each booking seats one
+  student) capacity use;
+* gap_minutes and gaps - idle time between the day's first and last booking,
+  the stranded slots a no-show or an early leaver leaves behind.
+
+refresh_room_stats() is the nightly, incremental run (`manage.py
+build_room_stats`): it recomputes the last REFRESH_OVERLAP_DAYS materialised
+days, to pick up late changes such as rooms released early or deleted
+bookings, and every day after them up to yesterday. Days in months moved to
+the history archive (programs/history.py) are never recomputed, so their
+figures outlive the raw rows.
+
+dashboard_summary() is what the staff room dashboard shows: totals, per
+floor, per room, per hour and per weekday for the last days, built from the
+aggregates alone and cached until the next refresh.
+"""
+import time as clock
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from .history import archived_months
+from .models import RoomDayStats, RoomReservation, StudyRoom
+
+MINUTES = 24 * 60
+# Days computed per pass; bounds the minute array to rooms x CHUNK_DAYS x 1440 cells
+CHUNK_DAYS = 14
+REFRESH_OVERLAP_DAYS = 2
+
+STATS_VERSION_KEY = 'analytics:version'
+SUMMARY_TIMEOUT = 60 * 60 * 24
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+
+
+def _midnight(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _minutes_since(values, origin):
+    """ Local wall-clock minutes from ``origin`` (a naive local datetime) for aware datetimes. """
+    import pandas as pd
+
+    local = pd.to_datetime(values, utc=True).dt.tz_convert(timezone.get_current_timezone_name()).dt.tz_localize(None)
+    return ((local - pd.Timestamp(origin)) // pd.Timedelta(minutes=1)).to_numpy(dtype='int64')
+
+
+def compute_day_stats(first_day, last_day):
+    """ Unsaved RoomDayStats for every room and every day from ``first_day`` to ``last_day``. """
+    import numpy as np
+    import pandas as pd
+
+    rooms = list(StudyRoom.objects.order_by('pk').values_list('pk', 'floor', 'capacity'))
+    days = (last_day - first_day).days + 1
+    if not rooms or days < 1:
+        return []
+    room_ids = np.array([pk for pk, _, _ in rooms])
+    total = days * MINUTES
+
+    reservations = pd.DataFrame.from_records(
+        list(RoomReservation.objects.filter(
+            room_id__in=room_ids.tolist(),
+            start_at__lt=_midnight(last_day + timedelta(days=1)), end_at__gt=_midnight(first_day),
+        ).values_list('room_id', 'start_at', 'end_at')),
+        columns=['room_id', 'start_at', 'end_at'],
+    )
+    origin = datetime.combine(first_day, time.min)
+    starts = _minutes_since(reservations['start_at'], origin)
+    ends = _minutes_since(reservations['end_at'], origin)
+    rows = np.searchsorted(room_ids, reservations['room_id'].to_numpy(dtype='int64'))
+
+    # +1 where a reservation starts holding the room, -1 where it stops
+    delta = np.zeros((len(rooms), total + 1), dtype=np.int32)
+    np.add.at(delta, (rows, np.clip(starts, 0, total)), 1)
+    np.add.at(delta, (rows, np.clip(ends, 0, total)), -1)
+    held = (np.cumsum(delta[:, :total], axis=1) > 0).reshape(len(rooms), days, MINUTES)
+
+    hourly = held.reshape(len(rooms), days, 24, 60).sum(axis=3)
+    open_from, open_until = settings.ROOM_OPENING_HOURS
+    booked = held[:, :, open_from * 60:open_until * 60].sum(axis=2)
+
+    held_minutes = held.sum(axis=2)
+    first = held.argmax(axis=2)
+    last = MINUTES - 1 - held[:, :, ::-1].argmax(axis=2)
+    span = np.where(held_minutes > 0, last - first + 1, 0)
+    runs = (np.diff(held.astype(np.int8), axis=2, prepend=0) == 1).sum(axis=2)
+
+    bookings = np.zeros((len(rooms), days), dtype=np.int64)
+    starting = (starts >= 0) & (starts < total)
+    np.add.at(bookings, (rows[starting], starts[starting] // MINUTES), 1)
+
+    open_minutes = (open_until - open_from) * 60
+    stats = []
+    for r, (room_id, floor, capacity) in enumerate(rooms):
+        for d in range(days):
+            stats.append(RoomDayStats(
+                room_id=room_id, day=first_day + timedelta(days=d), floor=floor, capacity=capacity,
+                bookings=int(bookings[r, d]), open_minutes=open_minutes, booked_minutes=int(booked[r, d]),
+                hourly_minutes=hourly[r, d].tolist(), gap_minutes=int(span[r, d] - held_minutes[r, d]),
+                gaps=max(int(runs[r, d]) - 1, 0),
+            ))
+    return stats
+
+
+def _first_unarchived_day():
+    months = archived_months()
+    if not months:
+        return None
+    year, month = map(int, months[-1].split('-'))
+    return datetime(year + month // 12, month % 12 + 1, 1).date()
+
+
+def refresh_room_stats(since=None, until=None):
+    """
+    Materialise RoomDayStats from ``since`` to ``until`` (default: incrementally,
+    see the module docstring, up to yesterday). Returns the (first, last) days
+    written, or None when there was nothing to do.
+    """
+    until = until or timezone.localdate() - timedelta(days=1)
+    if since is None:
+        latest = RoomDayStats.objects.aggregate(latest=Max('day'))['latest']
+        if latest is not None:
+            since = latest - timedelta(days=REFRESH_OVERLAP_DAYS - 1)
+        else:
+            earliest = RoomReservation.objects.aggregate(earliest=Min('start_at'))['earliest']
+            since = timezone.localdate(earliest) if earliest else until
+    floor = _first_unarchived_day()
+    if floor is not None:
+        since = max(since, floor)
+    if since > until:
+        return None
+
+    day = since
+    while day <= until:
+        last = min(day + timedelta(days=CHUNK_DAYS - 1), until)
+        stats = compute_day_stats(day, last)
+        with transaction.atomic():
+            RoomDayStats.objects.filter(day__gte=day, day__lte=last).delete()
+            RoomDayStats.objects.bulk_create(stats, batch_size=1000)
+        day = last + timedelta(days=1)
+    cache.set(STATS_VERSION_KEY, clock.time(), timeout=None)
+    return since, until
+
+
+# --- DASHBOARD ---
+
+def _percent(part, whole):
+    return round(100 * part / whole, 1) if whole else 0.0
+
+
+def dashboard_summary(days=30, today=None):
+    """
+    Occupancy figures for the ``days`` days up to yesterday, from RoomDayStats
+    only: one query, then served from the cache until the next refresh.
+    """
+    last = (today or timezone.localdate()) - timedelta(days=1)
+    first = last - timedelta(days=days - 1)
+    cache.add(STATS_VERSION_KEY, clock.time(), timeout=None)
+    key = f"analytics:summary:{cache.get(STATS_VERSION_KEY)}:{first}:{last}"
+    summary = cache.get(key)
+    if summary is None:
+        summary = _summarise(first, last)
+        cache.set(key, summary, SUMMARY_TIMEOUT)
+    return summary
+
+
+def _summarise(first, last):
+    import numpy as np
+    import pandas as pd
+
+    fields = ['room_id', 'room__name', 'floor', 'capacity', 'day', 'bookings', 'open_minutes', 'booked_minutes', 'gap_minutes', 'gaps', 'hourly_minutes']
+    stats = pd.DataFrame.from_records(
+        list(RoomDayStats.objects.filter(day__gte=first, day__lte=last).values_list(*fields)), columns=fields,
+    )
+    summary = {'first': first, 'last': last, 'has_data': not stats.empty}
+    if stats.empty:
+        return summary
+
+    stats['seat_minutes'] = stats['capacity'] * stats['open_minutes']
+    booked, opened = stats['booked_minutes'].sum(), stats['open_minutes'].sum()
+
+    hourly = np.array(stats['hourly_minutes'].tolist()).sum(axis=0)
+    hourly_share = hourly / (len(stats) * 60) * 100
+    peak_hour = int(hourly.argmax())
+
+    stats['weekday'] = pd.to_datetime(stats['day']).dt.weekday
+    by_weekday = stats.groupby('weekday')[['booked_minutes', 'open_minutes']].sum()
+    weekday_share = (by_weekday['booked_minutes'] / by_weekday['open_minutes'] * 100).reindex(range(7), fill_value=0)
+
+    by_floor = stats.groupby('floor')[['booked_minutes', 'open_minutes', 'bookings']].sum()
+    by_room = stats.groupby(['room_id', 'room__name']).agg(
+        booked_minutes=('booked_minutes', 'sum'), open_minutes=('open_minutes', 'sum'),
+        bookings=('bookings', 'sum'), gap_minutes=('gap_minutes', 'sum'), capacity=('capacity', 'last'),
+    )
+    by_room['occupancy'] = by_room['booked_minutes'] / by_room['open_minutes'] * 100
+    by_room = by_room.sort_values('occupancy', ascending=False)
+
+    active_days = stats[stats['booked_minutes'] > 0]
+    summary.update({
+        'occupancy': _percent(booked, opened),
+        'capacity_use': _percent(booked, stats['seat_minutes'].sum()),
+        'bookings': int(stats['bookings'].sum()),
+        'peak_hour': f"{peak_hour:02d}:00",
+        'peak_weekday': WEEKDAYS[int(weekday_share.to_numpy().argmax())],
+        'average_gap_minutes': round(float(active_days['gap_minutes'].mean()), 1) if len(active_days) else 0.0,
+        'hours': [
+            {'hour': f"{hour:02d}", 'percent': round(float(share), 1)} for hour, share in enumerate(hourly_share)
+        ],
+        'weekdays': [
+            {'day': WEEKDAYS[day], 'percent': round(float(share), 1)} for day, share in weekday_share.items()
+        ],
+        'floors': [
+            {'floor': int(floor), 'percent': _percent(row['booked_minutes'], row['open_minutes']), 'bookings': int(row['bookings'])}
+            for floor, row in by_floor.iterrows()
+        ],
+        'rooms': [
+            {
+                'name': name, 'percent': round(float(row['occupancy']), 1), 'bookings': int(row['bookings']),
+                'capacity': int(row['capacity']), 'gap_hours': round(float(row['gap_minutes']) / 60, 1),
+            }
+            for (_, name), row in by_room.iterrows()
+        ],
+    })
+    return summary
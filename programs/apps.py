@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class ProgramsConfig(AppConfig):
     name = 'programs'
+
+    def ready(self):
+        # Connects the catalogue cache, search index, image derivative, room state, profile,
+        # portal role and SQLite tuning receivers, and registers the stylesheet check
+        from . import availability, caching, context_processors, images, profiles, roles, search, sqlite  # noqa: F401
@@ -0,0 +1,207 @@
+"""
+Time-window availability for study rooms.
+
+A room is free for [start, end) when staff have not taken it out of service
+(StudyRoom.is_available) and no reservation for it overlaps the window. Two
+windows overlap when each one starts before the other ends, which maps onto a
+range scan of the (room, start_at, end_at) index. A reservation keeps its room
+for settings.ROOM_RELEASE_GRACE seconds after its departure time; after that
+the room is released without anyone having to click anything (see
+programs/release.py for the clock that announces it).
+
+Any change to rooms or reservations moves the room state version (a
+timestamp in the shared cache), which the availability API uses as its
+ETag/Last-Modified. It moves when the change commits: a poll made before
+then must not get the new ETag with the old grid, or it would be answered
+304 until the next change. Model saves move it through signals; code that changes
+rooms or reservations with QuerySet.update() or delete() must call
+touch_rooms() itself.
+"""
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import BooleanField, Exists, ExpressionWrapper, OuterRef, Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .broadcast import publish_rooms
+from .models import RoomReservation, StudyRoom
+from .sqlite import write_transaction
+
+
+def release_grace():
+    """ How long a reservation keeps its room after the departure time. """
+    return timedelta(seconds=getattr(settings, 'ROOM_RELEASE_GRACE', 0))
+
+
+def overlapping(start, end=None):
+    """
+    Q matching reservations that hold their room during [start, end), grace
+    period included. With no ``end`` it matches reservations holding the room
+    at the instant ``start``.
+    """
+    start_after = start - release_grace()
+    if end is None:
+        return Q(start_at__lte=start, end_at__gt=start_after)
+    return Q(start_at__lt=end, end_at__gt=start_after)
+
+
+def is_room_free(room, start, end):
+    """ True when ``room`` is in service and has no reservation overlapping [start, end). """
+    if not room.is_available:
+        return False
+    return not RoomReservation.objects.filter(overlapping(start, end), room=room).exists()
+
+
+def free_rooms(start, end):
+    """ Rooms that can be booked for [start, end). """
+    busy = RoomReservation.objects.filter(overlapping(start, end), room=OuterRef('pk'))
+    return StudyRoom.objects.filter(is_available=True).exclude(Exists(busy))
+
+
+def rooms_with_status(start=None, end=None, queryset=None):
+    """
+    Annotate rooms with ``is_booked`` (a reservation overlaps the window) and
+    ``is_free`` (in service and not booked). Defaults to "right now".
+    """
+    start = start or timezone.now()
+    rooms = queryset if queryset is not None else StudyRoom.objects.all()
+    busy = RoomReservation.objects.filter(overlapping(start, end), room=OuterRef('pk'))
+    return rooms.annotate(is_booked=Exists(busy)).annotate(
+        is_free=ExpressionWrapper(Q(is_available=True, is_booked=False), output_field=BooleanField())
+    )
+
+
+class RoomUnavailable(Exception):
+    """ Raised by book_room() when the room is out of service or already taken for the window. """
+
+
+def book_room(room, start, end, attempts=None, **fields):
+    """
+    Atomically reserve ``room`` for [start, end) and return the new RoomReservation.
+
+    The transaction opens with a conditional UPDATE on the room row. That takes
+    the row lock on PostgreSQL and the write lock on SQLite, so concurrent
+    bookings for the same room queue up behind it and each one runs its overlap
+    check only after the previous booking has committed. Exactly one of several
+    simultaneous requests for a window wins; the rest get RoomUnavailable.
+    Lock timeouts are retried a few times before giving up (see write_transaction).
+    """
+    return write_transaction(_book_room, attempts=attempts)(room, start, end, **fields)
+
+
+def _book_room(room, start, end, **fields):
+    claimed = StudyRoom.objects.filter(pk=room.pk, is_available=True).update(is_available=True)
+    if not claimed:
+        raise RoomUnavailable(f"{room.name} is currently out of service.")
+    if RoomReservation.objects.filter(overlapping(start, end), room_id=room.pk).exists():
+        raise RoomUnavailable(f"{room.name} is already taken for the selected time.")
+    return RoomReservation.objects.create(room=room, start_at=start, end_at=end, **fields)
+
+
+def parse_window(arrival, departure):
+    """
+    Turn the booking form's datetime-local values into an aware (start, end).
+    Raises ValueError with a user-facing message when the window is unusable.
+    """
+    try:
+        start = datetime.fromisoformat(arrival)
+        end = datetime.fromisoformat(departure)
+    except (TypeError, ValueError):
+        raise ValueError("Please provide both an arrival and a departure time.")
+    if timezone.is_naive(start):
+        start = timezone.make_aware(start)
+    if timezone.is_naive(end):
+        end = timezone.make_aware(end)
+    if end <= start:
+        raise ValueError("Departure must be after arrival.")
+    return start, end
+
+
+# --- ROOM STATE VERSION ---
+
+ROOM_STATE_KEY = 'rooms:changed_at'
+
+
+def room_state_version():
+    """ Unix time of the last room or reservation change (seeded with "now" if unknown). """
+    cache.add(ROOM_STATE_KEY, time.time(), timeout=None)
+    return cache.get(ROOM_STATE_KEY)
+
+
+def touch_rooms(*room_ids):
+    """ Record a change to ``room_ids`` (or to rooms in general) and push it to open grids, on commit. """
+    transaction.on_commit(lambda: cache.set(ROOM_STATE_KEY, time.time(), timeout=None))
+    publish_rooms(room_ids)
+
+
+@receiver(post_save, sender=RoomReservation)
+def reservation_changed(sender, instance, **kwargs):
+    # No post_delete receiver for RoomReservation: it would stop purges from
+    # using fast bulk deletes. Deleting code calls touch_rooms() instead.
+    touch_rooms(instance.room_id)
+
+
+@receiver(post_save, sender=StudyRoom)
+@receiver(post_delete, sender=StudyRoom)
+def room_changed(sender, instance, **kwargs):
+    touch_rooms(instance.pk)
+
+
+# --- DAY SCHEDULE ---
+
+def _iso(value):
+    return timezone.localtime(value).isoformat(timespec='minutes')
+
+
+def day_schedule(day, rooms=None):
+    """
+    Service status plus busy and free intervals on ``day`` (a local date) for
+    every room, or those in the queryset ``rooms``, as dicts ready for JSON.
+    Intervals are [start, end] ISO datetimes clipped to the day, merged where
+    bookings touch or overlap; busy ones run to the end of the grace period.
+    Two queries whatever the number of rooms.
+    """
+    grace = release_grace()
+    day_start = timezone.make_aware(datetime.combine(day, datetime.min.time()))
+    day_end = timezone.make_aware(datetime.combine(day + timedelta(days=1), datetime.min.time()))
+    rooms = rooms if rooms is not None else StudyRoom.objects.all()
+
+    busy = {}
+    reservations = (
+        RoomReservation.objects.filter(overlapping(day_start, day_end), room__in=rooms.values('pk'))
+        .order_by('room_id', 'start_at').values_list('room_id', 'start_at', 'end_at')
+    )
+    for room_id, start, end in reservations:
+        start, end = max(start, day_start), min(end + grace, day_end)
+        intervals = busy.setdefault(room_id, [])
+        if intervals and start <= intervals[-1][1]:
+            intervals[-1][1] = max(intervals[-1][1], end)
+        else:
+            intervals.append([start, end])
+
+    schedule = []
+    for room in rooms:
+        taken = busy.get(room.pk, [])
+        free, cursor = [], day_start
+        for start, end in taken:
+            if start > cursor:
+                free.append([cursor, start])
+            cursor = max(cursor, end)
+        if cursor < day_end:
+            free.append([cursor, day_end])
+        schedule.append({
+            'id': room.pk,
+            'name': room.name,
+            'floor': room.floor,
+            'capacity': room.capacity,
+            'in_service': room.is_available,
+            'busy': [[_iso(a), _iso(b)] for a, b in taken],
+            'free': [[_iso(a), _iso(b)] for a, b in free] if room.is_available else [],
+        })
+    return schedule
+
@@ -0,0 +1,278 @@
+"""
+Endpoint latency benchmarks for the portal (`manage.py benchmark_endpoints`).
+
+Every named route in config/urls.py and programs/urls.py is requested through
+the Django test client, in-process, as the kind of user it is meant for. Each
+route gets a few warm-up requests, then ``requests`` timed ones; a result
+records the p50/p95/p99/mean latency in milliseconds, the SQL queries and
+the response bytes of one request (streamed bodies are read to the end and
+their queries counted too).
+
+Results are plain dicts, written as JSON so two runs can be diffed with
+compare(). Routes that change data (logouts, releasing or toggling a room)
+are left out unless asked for, since they would skew the routes after them.
+
+booking_throughput() is the write-side counterpart for
+`manage.py benchmark_bookings`: many clients booking rooms at once.
+"""
+import math
+import random
+import statistics
+import threading
+import time
+from contextlib import ExitStack
+from datetime import datetime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from .availability import RoomUnavailable, book_room
+from .middleware import QueryStats
+from .models import CourseRegistration, Program, RoomReservation, StudentProfile, StudyRoom
+
+# URL name -> (who is asking, HTTP method)
+ROUTES = {
+    'home': ('anon', 'get'),
+    'login': ('anon', 'get'),
+    'logout': ('student', 'post'),
+    'registry': ('anon', 'get'),
+    'course_registration': ('anon', 'get'),
+    'room_reservation': ('anon', 'get'),
+    'registration_success': ('anon', 'get'),
+    'programs:program_list': ('anon', 'get'),
+    'programs:program_search': ('anon', 'get'),
+    'programs:program_detail': ('anon', 'get'),
+    'programs:admission': ('anon', 'get'),
+    'programs:president_message': ('anon', 'get'),
+    'programs:about_abs': ('anon', 'get'),
+    'programs:governing_council': ('anon', 'get'),
+    'programs:accreditation': ('anon', 'get'),
+    'programs:contact': ('anon', 'get'),
+    'programs:student_login': ('anon', 'get'),
+    'programs:student_logout': ('student', 'post'),
+    'programs:staff_logout': ('staff', 'post'),
+    'programs:student_request': ('anon', 'get'),
+    'programs:course_registration': ('anon', 'get'),
+    'programs:registration_success': ('anon', 'get'),
+    'programs:study_room_reservation': ('student', 'get'),
+    'programs:room_reservation_grid': ('student', 'get'),
+    'programs:room_availability': ('student', 'get'),
+    'programs:room_events': ('student', 'get'),
+    'programs:staff_dashboard': ('staff', 'get'),
+    'programs:add_program': ('staff', 'get'),
+    'programs:edit_program': ('staff', 'get'),
+    'programs:staff_room_portal': ('staff', 'get'),
+    'programs:staff_room_dashboard': ('staff', 'get'),
+    'programs:release_room': ('staff', 'get'),
+    'programs:toggle_room_status': ('staff', 'get'),
+    'programs:staff_room_bookings': ('staff', 'get'),
+    'programs:export_room_bookings': ('staff', 'get'),
+    'programs:clear_all_bookings': ('staff', 'get'),
+    'programs:delete_single_booking': ('staff', 'get'),
+    'programs:staff_job_queue': ('staff', 'get'),
+    'programs:reservation_receipt': ('staff', 'get'),
+    'programs:registration_receipt': ('staff', 'get'),
+}
+
+# Requests to these change data or end the session
+WRITES = {
+    'logout', 'programs:student_logout', 'programs:staff_logout',
+    'programs:release_room', 'programs:toggle_room_status',
+}
+
+QUERY_STRINGS = {'programs:program_search': '?q=management'}
+
+# Benchmarks run with their own cache, so pages rendered from throwaway data
+# never land in (or are served from) the site's shared cache
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'benchmarks'}}
+
+
+class Fixtures:
+    """ The users and records the routes need, picked from whatever is in the database. """
+
+    def __init__(self, staff=None, student=None):
+        User = get_user_model()
+        self.users = {
+            'anon': None,
+            'staff': staff or User.objects.filter(is_staff=True, is_active=True).order_by('pk').first(),
+            'student': student or User.objects.filter(
+                student_profile__in=StudentProfile.objects.exclude(student_id=None), is_active=True,
+            ).order_by('pk').first(),
+        }
+        self.room = StudyRoom.objects.order_by('pk').first()
+        booking = RoomReservation.objects.order_by('pk')
+        self.booking = booking.filter(user=self.users['student']).first() or booking.first()
+        self.registration = CourseRegistration.objects.order_by('pk').first()
+        self.program = Program.objects.filter(is_active=True, external_url__isnull=True).order_by('pk').first()
+
+    def kwargs(self, name):
+        """ URL kwargs for ``name``, or None when the record it needs does not exist. """
+        needs = {
+            'programs:program_detail': ('program', 'slug', 'slug'),
+            'programs:edit_program': ('program', 'slug', 'slug'),
+            'programs:release_room': ('room', 'room_id', 'pk'),
+            'programs:toggle_room_status': ('room', 'room_id', 'pk'),
+            'programs:delete_single_booking': ('booking', 'booking_id', 'pk'),
+            'programs:reservation_receipt': ('booking', 'booking_id', 'pk'),
+            'programs:registration_receipt': ('registration', 'registration_id', 'pk'),
+        }
+        if name not in needs:
+            return {}
+        record, kwarg, attr = needs[name]
+        obj = getattr(self, record)
+        return None if obj is None else {kwarg: getattr(obj, attr)}
+
+
+def percentile(samples, pct):
+    """ Nearest-rank percentile of a non-empty list. """
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+def _timed_request(client, method, url):
+    stats = QueryStats()
+    with ExitStack() as stack:
+        for conn in connections.all():
+            stack.enter_context(conn.execute_wrapper(stats))
+        started = time.perf_counter()
+        response = getattr(client, method)(url)
+        if response.streaming:
+            size = sum(len(chunk) for chunk in response.streaming_content)
+        else:
+            size = len(response.content)
+        elapsed = (time.perf_counter() - started) * 1000
+    return response.status_code, elapsed, stats.count, size
+
+
+def bench_route(client, method, url, requests=20, warmup=2):
+    for _ in range(warmup):
+        _timed_request(client, method, url)
+    samples = []
+    for _ in range(requests):
+        status, elapsed, queries, size = _timed_request(client, method, url)
+        samples.append(elapsed)
+    return {
+        'url': url,
+        'status': status,
+        'p50_ms': round(percentile(samples, 50), 3),
+        'p95_ms': round(percentile(samples, 95), 3),
+        'p99_ms': round(percentile(samples, 99), 3),
+        'mean_ms': round(statistics.fmean(samples), 3),
+        'queries': queries,
+        'bytes': size,
+    }
+
+
+def run_benchmarks(fixtures, routes=None, requests=20, warmup=2, include_writes=False, progress=None):
+    """ ({url name: result}, {url name: why it was skipped}) for ``routes`` (default: all of ROUTES). """
+    clients = {}
+    results, skipped = {}, {}
+    # Writes go last so that logging out or releasing a room does not affect the other routes
+    for name in sorted(routes or ROUTES, key=lambda name: name in WRITES):
+        who, method = ROUTES[name]
+        if name in WRITES and not include_writes:
+            skipped[name] = "changes data"
+            continue
+        kwargs = fixtures.kwargs(name)
+        if kwargs is None:
+            skipped[name] = "no record to request"
+            continue
+        if who != 'anon' and fixtures.users[who] is None:
+            skipped[name] = f"no {who} user"
+            continue
+        if who not in clients:
+            clients[who] = Client(raise_request_exception=False)  # a broken route is reported as a 500
+            if who != 'anon':
+                clients[who].force_login(fixtures.users[who])
+        url = reverse(name, kwargs=kwargs) + QUERY_STRINGS.get(name, '')
+        results[name] = bench_route(clients[who], method, url, requests=requests, warmup=warmup)
+        if progress:
+            progress(name, results[name])
+    return results, skipped
+
+
+# --- BOOKING THROUGHPUT ---
+
+def booking_throughput(rooms, clients, bookings, seed=0):
+    """
+    ``clients`` threads, each with its own connection, start together and
+    make ``bookings`` book_room() calls apiece for random hour-long windows
+    over a week in ``rooms``. Returns counts of bookings made, windows found
+    taken and attempts that failed (a lock outlasting every retry), the
+    attempts per second and p50/p95 latency in milliseconds.
+    """
+    rooms = list(rooms)
+    base = timezone.make_aware(datetime.combine(timezone.localdate() + timedelta(days=1), datetime.min.time()))
+    barrier = threading.Barrier(clients)
+    outcomes = {'booked': 0, 'taken': 0, 'failed': 0}
+    samples, lock = [], threading.Lock()
+
+    def client(number):
+        rng = random.Random(seed * 1000 + number)
+        mine, latencies = dict.fromkeys(outcomes, 0), []
+        try:
+            barrier.wait()
+            for _ in range(bookings):
+                room = rng.choice(rooms)
+                start = base + timedelta(hours=rng.randrange(7 * 24))
+                started = time.perf_counter()
+                try:
+                    book_room(room, start, start + timedelta(hours=1), student_name=f'Client {number}',
+                              date=start.date(), time_slot='-')
+                    mine['booked'] += 1
+                except RoomUnavailable:
+                    mine['taken'] += 1
+                except Exception:
+                    mine['failed'] += 1
+                latencies.append((time.perf_counter() - started) * 1000)
+        finally:
+            connections.close_all()
+        with lock:
+            for outcome, count in mine.items():
+                outcomes[outcome] += count
+            samples.extend(latencies)
+
+    threads = [threading.Thread(target=client, args=(number,)) for number in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    return {
+        'clients': clients,
+        **outcomes,
+        'attempts_per_s': round(len(samples) / elapsed, 1),
+        'p50_ms': round(percentile(samples, 50), 3),
+        'p95_ms': round(percentile(samples, 95), 3),
+    }
+
+
+# --- COMPARING RUNS ---
+
+# Latency changes smaller than this are noise whatever the percentage
+MIN_REGRESSION_MS = 1.0
+
+
+def compare(baseline, current, threshold_pct):
+    """
+    Regressions of ``current`` against ``baseline`` (both as written by the
+    command): routes whose p95 grew by more than ``threshold_pct`` percent, or
+    that now run more queries. Returns [(size, route, message)].
+    """
+    previous = {run['size']: run['routes'] for run in baseline.get('runs', [])}
+    regressions = []
+    for run in current.get('runs', []):
+        for name, result in run['routes'].items():
+            before = previous.get(run['size'], {}).get(name)
+            if before is None:
+                continue
+            slower = result['p95_ms'] - before['p95_ms']
+            if slower > MIN_REGRESSION_MS and result['p95_ms'] > before['p95_ms'] * (1 + threshold_pct / 100):
+                regressions.append((run['size'], name, f"p95 {before['p95_ms']:.1f} -> {result['p95_ms']:.1f} ms"))
+            if result['queries'] > before['queries']:
+                regressions.append((run['size'], name, f"queries {before['queries']} -> {result['queries']}"))
+    return regressions
@@ -0,0 +1,179 @@
+"""
+Room state push for the room grids (rr.html, staff_room_dashboard.html).
+
+When a room or reservation changes, publish_rooms() sends the affected rooms'
+entries (the same shape as the availability API) to every open
+/study-room-events/ stream. The broadcaster is chosen by
+settings.ROOM_BROADCASTER:
+
+* InProcessBroadcaster (default): subscribers are asyncio queues in this
+  process. Right for a single ASGI worker.
+* CacheBroadcaster: events also go through the shared cache, and every worker
+  polls it once per CACHE_POLL_INTERVAL and fans new events out to its own
+  subscribers. A local stand-in for a pub/sub server when several workers
+  serve the streams; no broker needed. Events are numbered with cache.incr(),
+  so the cache must increment atomically - Redis or Memcached (LocMemCache
+  only within one process). On the file or database cache two publishers can
+  draw the same number and one event is lost, so those are refused.
+
+Events are dicts; subscribers receive them as they are published, or a
+{'type': 'resync'} when they fell too far behind and should refetch the grid.
+"""
+import asyncio
+import logging
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.cache.backends.base import BaseCache
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBER_QUEUE_SIZE = 100
+RESYNC = {'type': 'resync'}
+
+
+class InProcessBroadcaster:
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def has_listeners(self):
+        return bool(self._subscribers)
+
+    def publish(self, event):
+        """ Hand ``event`` to every subscriber; safe to call from any thread. """
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, event)
+            except RuntimeError:
+                # The subscriber's event loop has closed
+                self._discard((loop, queue))
+
+    @staticmethod
+    def _deliver(queue, event):
+        if queue.full():
+            # A stalled client: drop its backlog and have it refetch instead
+            while not queue.empty():
+                queue.get_nowait()
+            event = RESYNC
+        queue.put_nowait(event)
+
+    def _discard(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    async def subscribe(self, heartbeat=None):
+        """
+        Async iterator over the events published from now on. With a
+        ``heartbeat`` (seconds) it also yields None whenever that long passes
+        without an event, so the caller can keep its connection alive.
+        """
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE))
+        with self._lock:
+            self._subscribers.add(subscriber)
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(subscriber[1].get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            self._discard(subscriber)
+
+
+class CacheBroadcaster(InProcessBroadcaster):
+    """ InProcessBroadcaster whose events are shared between worker processes through the cache. """
+
+    SEQUENCE_KEY = 'rooms:events:seq'
+    EVENT_KEY = 'rooms:events:{}'
+    EVENT_TIMEOUT = 60
+    CACHE_POLL_INTERVAL = 0.5
+
+    def __init__(self):
+        backend = type(caches['default'])
+        if backend.incr is BaseCache.incr:
+            # The generic incr() is a get() then a set(): concurrent publishers would share numbers
+            raise ImproperlyConfigured(
+                f"CacheBroadcaster needs a cache with an atomic incr() (Redis or Memcached), not {backend.__name__}."
+            )
+        super().__init__()
+        self._seen = None
+        self._poller = None
+
+    def has_listeners(self):
+        # Streams may be open in other workers
+        return True
+
+    def publish(self, event):
+        cache.add(self.SEQUENCE_KEY, 0, timeout=None)
+        seq = cache.incr(self.SEQUENCE_KEY)
+        cache.set(self.EVENT_KEY.format(seq), event, timeout=self.EVENT_TIMEOUT)
+
+    async def subscribe(self, heartbeat=None):
+        if self._poller is None or self._poller.done():
+            # Starts on the next loop iteration, after this subscriber has registered
+            self._poller = asyncio.get_running_loop().create_task(self._poll())
+        async for event in super().subscribe(heartbeat):
+            yield event
+
+    async def _poll(self):
+        while self.subscriber_count():
+            seq = await cache.aget(self.SEQUENCE_KEY, 0)
+            if self._seen is None or seq < self._seen:
+                self._seen = seq
+            elif seq > self._seen:
+                if seq - self._seen > SUBSCRIBER_QUEUE_SIZE:
+                    events = [RESYNC]
+                else:
+                    keys = [self.EVENT_KEY.format(n) for n in range(self._seen + 1, seq + 1)]
+                    found = await cache.aget_many(keys)
+                    events = [found[key] if key in found else RESYNC for key in keys]
+                self._seen = seq
+                for event in events:
+                    InProcessBroadcaster.publish(self, event)
+            await asyncio.sleep(self.CACHE_POLL_INTERVAL)
+
+
+@lru_cache(maxsize=None)
+def get_broadcaster():
+    path = getattr(settings, 'ROOM_BROADCASTER', 'programs.broadcast.InProcessBroadcaster')
+    return import_string(path)()
+
+
+def publish_rooms(room_ids=None):
+    """
+    Broadcast the current entries of ``room_ids`` once the transaction commits;
+    with no ids, tell every client to refetch the whole grid.
+    """
+    transaction.on_commit(lambda: _publish_rooms(room_ids))
+
+
+def _publish_rooms(room_ids):
+    from .availability import day_schedule
+    from .models import StudyRoom
+
+    broadcaster = get_broadcaster()
+    if not broadcaster.has_listeners():
+        return
+    try:
+        if not room_ids:
+            event = RESYNC
+        else:
+            today = timezone.localdate()
+            rooms = StudyRoom.objects.filter(pk__in=set(room_ids))
+            event = {'type': 'rooms', 'date': today.isoformat(), 'rooms': day_schedule(today, rooms)}
+        broadcaster.publish(event)
+    except Exception:
+        # Pushing is best effort; clients still poll the availability API
+        logger.exception("Could not broadcast room changes")
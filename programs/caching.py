@@ -0,0 +1,147 @@
+"""
+Rendered-page cache for the public programme catalogue.
+
+Anonymous GETs of the catalogue pages are served from the cache. Every key
+embeds a catalogue version; saving or deleting a Program, Category or
+GoverningCouncil replaces it once the change commits, so all cached pages go
+stale at once without waiting for a TTL. (Replaced before the commit, a page
+rendered meanwhile from the old rows would be cached under the new version.)
+The version is a timestamp rather than a counter, so no backend needs an
+atomic incr(). Keys use the path and only the query parameters the view
+reads; anything else in the query string shares the plain page's entry.
+Hit and miss counters live in the same cache and are approximate where
+incr() is not atomic (the file cache).
+
+With a read replica (programs/routers.py), pages rendered shortly after a
+change read the primary, so a lagging replica cannot be cached in.
+"""
+import time
+from contextlib import nullcontext
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.utils.http import urlencode
+
+from .models import Category, GoverningCouncil, Program
+from .routers import REPLICA, primary_reads
+
+VERSION_KEY = 'catalogue:version'
+CHANGED_KEY = 'catalogue:changed_at'
+HITS_KEY = 'catalogue:hits'
+MISSES_KEY = 'catalogue:misses'
+
+# Versions invalidate entries; the timeout only reclaims space from old versions.
+PAGE_TIMEOUT = 60 * 60 * 24
+# Longer parameter strings (pasted junk, scanners) render fresh instead of filling the cache
+MAX_QUERY_LENGTH = 200
+
+
+def catalogue_version():
+    # Seeded from the clock so a version key lost to eviction never reuses an old value
+    cache.add(VERSION_KEY, time.time_ns(), timeout=None)
+    return cache.get(VERSION_KEY)
+
+
+def bump_catalogue_version():
+    now = time.time_ns()
+    cache.set_many({CHANGED_KEY: now / 1e9, VERSION_KEY: now}, timeout=None)
+
+
+def _count(key):
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key)
+    except ValueError:
+        pass
+
+
+def catalogue_cache_stats():
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / total if total else 0.0,
+        'version': cache.get(VERSION_KEY),
+    }
+
+
+def reset_catalogue_cache_stats():
+    cache.delete_many([HITS_KEY, MISSES_KEY])
+
+
+def page_key(request, params=()):
+    """ Cache key for ``request``: version, path and the ``params`` it carries, sorted; None if too long. """
+    query = urlencode(sorted((name, request.GET[name]) for name in params if request.GET.get(name)))
+    if len(query) > MAX_QUERY_LENGTH:
+        return None
+    return f"catalogue:page:{catalogue_version()}:{request.path}?{query}"
+
+
+def cache_catalogue_page(view_func=None, *, params=()):
+    """
+    Serve anonymous GET/HEAD requests from the catalogue cache. ``params`` names
+    the query parameters the view reads; only those are part of the key.
+
+    Goes *under* redirect_if_authenticated so logged-in users are redirected
+    before the cache is consulted. Responses are only stored when they are
+    plain 200s that set no cookies and used no CSRF token, and requests with
+    pending flash messages always render fresh.
+    """
+    if view_func is None:
+        return lambda view_func: cache_catalogue_page(view_func, params=params)
+
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        if (request.method not in ('GET', 'HEAD')
+                or request.user.is_authenticated
+                or len(messages.get_messages(request))):
+            return view_func(request, *args, **kwargs)
+
+        key = page_key(request, params)
+        if key is None:
+            return view_func(request, *args, **kwargs)
+        cached = cache.get(key)
+        if cached is not None:
+            _count(HITS_KEY)
+            content, content_type = cached
+            response = HttpResponse(content, content_type=content_type)
+            response['X-Catalogue-Cache'] = 'HIT'
+            return response
+
+        _count(MISSES_KEY)
+        # Pages cached from a replica that has not caught up yet would stay stale until the next change
+        catching_up = (
+            REPLICA in settings.DATABASES
+            and time.time() - cache.get(CHANGED_KEY, 0) < settings.DATABASE_REPLICA_LAG
+        )
+        with primary_reads() if catching_up else nullcontext():
+            response = view_func(request, *args, **kwargs)
+        cacheable = (
+            response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+            and not request.META.get('CSRF_COOKIE_USED')
+        )
+        if cacheable:
+            cache.set(key, (response.content, response['Content-Type']), PAGE_TIMEOUT)
+        response['X-Catalogue-Cache'] = 'MISS'
+        return response
+    return _wrapped_view
+
+
+@receiver(post_save, sender=Program)
+@receiver(post_delete, sender=Program)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=GoverningCouncil)
+@receiver(post_delete, sender=GoverningCouncil)
+def invalidate_catalogue(sender, **kwargs):
+    transaction.on_commit(bump_catalogue_version)
@@ -0,0 +1,35 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.checks import Error, Tags, register
+from django.core.exceptions import ImproperlyConfigured
+
+TAILWIND_BUNDLE = 'css/site.css'
+MISSING_BUNDLE = f"static/{TAILWIND_BUNDLE} has not been built; run `manage.py build_css` before collectstatic."
+
+
+@lru_cache(maxsize=None)
+def _bundle_built():
+    return finders.find(TAILWIND_BUNDLE) is not None
+
+
+def tailwind_bundle(request):
+    """
+    ``tailwind_bundle`` is the compiled stylesheet's static path once
+    `manage.py build_css` has produced it. Until then base.html falls back to
+    the in-browser Tailwind CDN build, but only where TAILWIND_CDN_FALLBACK
+    allows it (DEBUG by default); elsewhere a missing bundle is an error.
+    """
+    if _bundle_built():
+        return {'tailwind_bundle': TAILWIND_BUNDLE}
+    if not settings.TAILWIND_CDN_FALLBACK:
+        raise ImproperlyConfigured(MISSING_BUNDLE)
+    return {'tailwind_bundle': None}
+
+
+@register(Tags.staticfiles)
+def check_tailwind_bundle(app_configs, **kwargs):
+    if settings.TAILWIND_CDN_FALLBACK or _bundle_built():
+        return []
+    return [Error(MISSING_BUNDLE, hint="Or set TAILWIND_CDN_FALLBACK=true for a local preview.", id='programs.E001')]
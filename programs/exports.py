@@ -0,0 +1,214 @@
+"""
+Streaming exports of the RoomReservation log.
+
+Rows are pulled from the database in chunks with ``.iterator()`` and written
+out as they arrive, so exporting the whole log never holds more than one
+chunk in the worker's memory. Archived months (programs/history.py) export
+the same way, one month at a time. The XLSX export is zipped on the fly
+(stream_xlsx), so its first bytes go out before the query has finished too.
+
+Names and IDs are typed in by students. Text starting with =, +, - or @ is
+exported with a leading apostrophe so a spreadsheet shows it instead of
+running it as a formula; phone and other plain numbers are left alone.
+"""
+import csv
+import re
+import zipfile
+from datetime import date, datetime, time
+from xml.sax.saxutils import escape
+
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .history import archived_rows
+from .reservations import filter_reservations
+
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_COLUMNS = [
+    ('student_name', 'Student Name'),
+    ('student_id', 'Student ID'),
+    ('email', 'Email'),
+    ('phone_number', 'Phone'),
+    ('room__name', 'Room'),
+    ('date', 'Date'),
+    ('time_slot', 'Time Slot'),
+    ('reserved_at', 'Reserved At'),
+]
+
+
+class _Echo:
+    """ File-like object whose write() hands the line straight back to csv.writer's caller. """
+    def write(self, value):
+        return value
+
+
+def export_rows(params):
+    """ Yield plain tuples for every reservation matching the staff log filters. """
+    fields = [field for field, _ in EXPORT_COLUMNS]
+    qs = filter_reservations(params).order_by('-reserved_at', '-id').values_list(*fields)
+    for row in qs.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield tuple(_cell(value) for value in row)
+
+
+def archived_export_rows(params):
+    """ export_rows() for the months moved out to the history archive (programs/history.py). """
+    fields = [field for field, _ in EXPORT_COLUMNS]
+    for row in archived_rows(params, fields):
+        yield tuple(_cell(value) for value in row)
+
+
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+PLAIN_NUMBER = re.compile(r'[+-]?\d[\d.]*')
+
+
+def _cell(value):
+    if hasattr(value, 'tzinfo') and value.tzinfo is not None:
+        # Spreadsheets cannot hold aware datetimes; export in local time.
+        return timezone.localtime(value).replace(tzinfo=None)
+    if isinstance(value, str) and len(value) > 1 and value.startswith(FORMULA_PREFIXES) and not PLAIN_NUMBER.fullmatch(value):
+        return "'" + value
+    return value
+
+
+def _filename(extension, archived=False):
+    kind = "Archived_Reservations" if archived else "Reservations"
+    return f"ABS_Room_{kind}_{timezone.localdate():%Y%m%d}.{extension}"
+
+
+def stream_csv(params, archived=False):
+    writer = csv.writer(_Echo())
+    header = [label for _, label in EXPORT_COLUMNS]
+    rows = archived_export_rows if archived else export_rows
+
+    def lines():
+        yield writer.writerow(header)
+        for row in rows(params):
+            yield writer.writerow(row)
+
+    response = StreamingHttpResponse(lines(), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{_filename("csv", archived)}"'
+    return response
+
+
+# --- XLSX ---
+# The smallest package Excel, LibreOffice and openpyxl open: one sheet of
+# inline strings, plus date and date-time number formats (styles 1 and 2).
+
+XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Reservations" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/styles.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<numFmts count="1"><numFmt numFmtId="164" formatCode="yyyy-mm-dd hh:mm:ss"/></numFmts>'
+        '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="1"><fill><patternFill patternType="none"/></fill></fills>'
+        '<borders count="1"><border/></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="3"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '<xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        '</styleSheet>'
+    ),
+}
+SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+SHEET_TAIL = '</sheetData></worksheet>'
+EPOCH = datetime(1899, 12, 30)
+# Control characters XML 1.0 cannot carry
+XML_ILLEGAL = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+class _Pipe:
+    """ Write-only, unseekable file: zipfile falls back to data descriptors and we collect what it writes. """
+    def __init__(self):
+        self.chunks, self.size = [], 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data, self.chunks, self.size = b''.join(self.chunks), [], 0
+        return data
+
+
+def _xlsx_cell(value):
+    if value is None:
+        return '<c/>'
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c><v>{value!r}</v></c>'
+    if isinstance(value, datetime):
+        return f'<c s="2"><v>{(value - EPOCH).total_seconds() / 86400!r}</v></c>'
+    if isinstance(value, date):
+        return f'<c s="1"><v>{(value - EPOCH.date()).days}</v></c>'
+    if isinstance(value, time):
+        value = value.isoformat()
+    text = escape(XML_ILLEGAL.sub('', str(value)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def xlsx_blocks(header, rows, block_size=64 * 1024):
+    """ Yield an XLSX file of ``header`` and ``rows`` as it is zipped, in blocks of about ``block_size`` bytes. """
+    pipe = _Pipe()
+    with zipfile.ZipFile(pipe, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, xml in XLSX_PARTS.items():
+            archive.writestr(name, xml)
+        # The size is unknown up front: without ZIP64 zipfile would fail past 2 GiB, mid-response
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(SHEET_HEAD.encode())
+            for part in ([header], rows):
+                for row in part:
+                    sheet.write(f"<row>{''.join(_xlsx_cell(value) for value in row)}</row>".encode())
+                    if pipe.size >= block_size:
+                        yield pipe.drain()
+            sheet.write(SHEET_TAIL.encode())
+    yield pipe.drain()
+
+
+def stream_xlsx(params, archived=False):
+    rows = (archived_export_rows if archived else export_rows)(params)
+    response = StreamingHttpResponse(
+        xlsx_blocks([label for _, label in EXPORT_COLUMNS], rows),
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
+    response['Content-Disposition'] = f'attachment; filename="{_filename("xlsx", archived)}"'
+    return response
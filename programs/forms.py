@@ -1,5 +1,7 @@
+import calendar
+
 from django import forms
-from .models import Program, RoomReservation, StudyRoom
+from .models import CourseRegistration, Program, RoomReservation, StudyRoom
 
 class ProgramForm(forms.ModelForm):
     class Meta:
@@ -96,4 +98,43 @@ class RoomReservationForm(forms.ModelForm):
 class RoomStatusForm(forms.ModelForm):
     class Meta:
         model = StudyRoom
-        fields = ['is_available']
\ No newline at end of file
+        fields = ['is_available']
+
+# --- PUBLIC COURSE REGISTRATION (fields named as in course_registration.html) ---
+
+class CourseRegistrationForm(forms.ModelForm):
+    first_name = forms.CharField(max_length=80)
+    middle_name = forms.CharField(max_length=80, required=False)
+    last_name = forms.CharField(max_length=80)
+    reg_type = forms.ChoiceField(choices=CourseRegistration.REG_TYPE_CHOICES)
+    study_month = forms.ChoiceField(choices=[(m.lower(), m) for m in calendar.month_name[1:]])
+    # Size and type are enforced while streaming by registrations.PaymentProofUploadHandler
+    payment_file = forms.FileField()
+
+    class Meta:
+        model = CourseRegistration
+        fields = ['email', 'phone_number', 'program', 'study_month']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['program'].queryset = Program.objects.filter(is_active=True)
+
+    def save(self, commit=True):
+        instance = super().save(commit=False)
+        names = [self.cleaned_data['first_name'], self.cleaned_data['middle_name'], self.cleaned_data['last_name']]
+        instance.full_name = ' '.join(name.strip() for name in names if name.strip())
+        instance.registration_type = self.cleaned_data['reg_type']
+        instance.payment_proof = self.cleaned_data['payment_file']
+        if commit:
+            instance.save()
+        return instance
+
+# --- BULK STUDENT ONBOARDING (admin, see programs/onboarding.py) ---
+
+class StudentImportForm(forms.Form):
+    sheet = forms.FileField(help_text="CSV or XLSX with student_id, first_name and last_name columns; email, phone_number, username and password are optional.")
+    default_password = forms.CharField(
+        required=False, widget=forms.PasswordInput,
+        help_text="Used for rows without a password. Left empty, those students set theirs through password reset.",
+    )
+    dry_run = forms.BooleanField(required=False, label="Only check the file")
@@ -0,0 +1,276 @@
+"""
+Hot/cold storage for the RoomReservation history.
+
+Live bookings and the recent past stay in the database (the hot table);
+archive_reservations() moves every whole calendar month older than
+RESERVATION_HOT_MONTHS out to one compressed columnar file per month under
+RESERVATION_ARCHIVE_DIR/history: YYYY-MM.parquet when a Parquet engine
+(pyarrow or fastparquet) is installed, YYYY-MM.csv.gz otherwise. Months are
+keyed by the reservation's ``date``. `manage.py archive_reservations` runs it;
+schedule it monthly or nightly - a run with nothing old enough does nothing.
+
+For each month the file is written (merged by id with any earlier file for
+that month) and recorded in history/index.json before its rows are deleted,
+in primary-key batches as purge_reservations() does. A run interrupted
+between the two leaves rows in both places; the next run merges them again
+without duplicates.
+
+Staff read archived months through archived_rows(), which takes the same
+filters as the live log (reservations.FILTER_KEYS) and loads only the months
+the date filters reach, one at a time, so an export of old history never
+holds more than a month in memory.
+"""
+import gzip
+import importlib.util
+import json
+import os
+import time
+from datetime import date
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .availability import touch_rooms
+from .models import RoomReservation
+from .purge import ARCHIVE_FIELDS, PURGE_BATCH_SIZE, PURGE_PAUSE, archive_dir
+from .reservations import filter_date
+
+HISTORY_FIELDS = ARCHIVE_FIELDS + ['room__name']
+INT_FIELDS = ['id', 'room_id', 'user_id']
+TEXT_FIELDS = ['student_name', 'student_id', 'email', 'phone_number', 'time_slot', 'room__name']
+DATETIME_FIELDS = ['start_at', 'end_at', 'reserved_at']
+INDEX_NAME = 'index.json'
+
+
+def history_dir():
+    path = archive_dir() / 'history'
+    path.mkdir(exist_ok=True)
+    return path
+
+
+def archive_format():
+    """ 'parquet' when configured and an engine is installed, else 'csv.gz'. """
+    wanted = getattr(settings, 'RESERVATION_ARCHIVE_FORMAT', 'parquet')
+    if wanted == 'parquet' and (importlib.util.find_spec('pyarrow') or importlib.util.find_spec('fastparquet')):
+        return 'parquet'
+    return 'csv.gz'
+
+
+def _month(day):
+    return f"{day:%Y-%m}"
+
+
+def _month_bounds(month):
+    year, number = map(int, month.split('-'))
+    return date(year, number, 1), date(year + number // 12, number % 12 + 1, 1)
+
+
+def hot_cutoff(today=None, months=None):
+    """ First day of the oldest month kept in the database. """
+    today = today or timezone.localdate()
+    months = settings.RESERVATION_HOT_MONTHS if months is None else months
+    index = today.year * 12 + today.month - 1 - months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+# --- INDEX ---
+
+def load_index():
+    """ {month: {'file', 'rows', 'archived_at'}} for every archived month. """
+    try:
+        with open(history_dir() / INDEX_NAME) as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        return {}
+
+
+def _save_index(index):
+    path = history_dir() / INDEX_NAME
+    tmp = path.with_suffix('.tmp')
+    with open(tmp, 'w') as fh:
+        json.dump(dict(sorted(index.items())), fh, indent=2)
+    os.replace(tmp, path)
+
+
+def archived_months():
+    return sorted(load_index())
+
+
+# --- MONTH FILES ---
+
+def _normalise(frame):
+    """ The same column types whichever way the frame was made or read back. """
+    import pandas as pd
+
+    for field in INT_FIELDS:
+        if field in frame:
+            frame[field] = frame[field].astype('Int64')
+    for field in TEXT_FIELDS:
+        if field in frame:
+            frame[field] = frame[field].astype('string')
+    for field in DATETIME_FIELDS:
+        if field in frame:
+            frame[field] = pd.to_datetime(frame[field], utc=True)
+    if 'date' in frame:
+        frame['date'] = pd.to_datetime(frame['date']).dt.date
+    return frame
+
+
+def read_month(month, columns=None):
+    """ The archived reservations of ``month`` ('YYYY-MM') as a DataFrame. """
+    import pandas as pd
+
+    path = history_dir() / load_index()[month]['file']
+    if path.suffix == '.parquet':
+        frame = pd.read_parquet(path, columns=columns)
+    else:
+        # Only empty cells are missing values; a student called "NA" stays one
+        frame = pd.read_csv(path, usecols=columns, keep_default_na=False, na_values=[''])
+    return _normalise(frame)
+
+
+def _write_month(month, frame, fmt):
+    path = history_dir() / f"{month}.{fmt}"
+    tmp = path.with_name(path.name + '.tmp')
+    if fmt == 'parquet':
+        frame.to_parquet(tmp, index=False, compression='zstd' if importlib.util.find_spec('pyarrow') else 'gzip')
+    else:
+        with gzip.open(tmp, 'wt', newline='') as fh:
+            frame.to_csv(fh, index=False)
+    os.replace(tmp, path)
+    return path.name
+
+
+def _rows_frame(qs):
+    import pandas as pd
+
+    return _normalise(pd.DataFrame.from_records(list(qs.values_list(*HISTORY_FIELDS)), columns=HISTORY_FIELDS))
+
+
+# --- ARCHIVING ---
+
+def archive_reservations(months=None, today=None, batch_size=PURGE_BATCH_SIZE, pause=PURGE_PAUSE, dry_run=False):
+    """
+    Move reservations dated before hot_cutoff() into the monthly files.
+    Returns {month: rows moved}; with ``dry_run`` only counts them.
+    """
+    cutoff = hot_cutoff(today, months)
+    old = RoomReservation.objects.filter(date__lt=cutoff)
+    ceiling = old.order_by('-id').values_list('id', flat=True).first()
+    if ceiling is None:
+        return {}
+    old = old.filter(id__lte=ceiling)  # bookings made while this runs are left alone
+
+    first_day = old.order_by('date').values_list('date', flat=True).first()
+    moved = {}
+    fmt = archive_format()
+    month = _month(first_day)
+    while _month_bounds(month)[0] < cutoff:
+        start, end = _month_bounds(month)
+        rows = old.filter(date__gte=start, date__lt=end)
+        if dry_run:
+            count = rows.count()
+        else:
+            count = _archive_month(month, rows, fmt, batch_size, pause)
+        if count:
+            moved[month] = count
+        month = _month(end)
+
+    if moved and not dry_run:
+        touch_rooms()
+    return moved
+
+
+def _archive_month(month, rows, fmt, batch_size, pause):
+    import pandas as pd
+
+    frame = _rows_frame(rows.order_by('id'))
+    if frame.empty:
+        return 0
+    index = load_index()
+    if month in index:
+        # Rows written by an earlier (perhaps interrupted) run are merged, by id
+        frame = pd.concat([read_month(month), frame]).drop_duplicates('id', keep='last').sort_values('id')
+        previous = history_dir() / index[month]['file']
+    else:
+        previous = None
+    name = _write_month(month, frame, fmt)
+    index[month] = {'file': name, 'rows': len(frame), 'archived_at': timezone.now().isoformat()}
+    _save_index(index)
+    if previous is not None and previous.name != name:
+        previous.unlink(missing_ok=True)
+
+    # Only now that the month is safely on disk do its rows leave the hot table
+    ids = frame['id'].tolist()
+    moved = 0
+    for i in range(0, len(ids), batch_size):
+        with transaction.atomic():
+            count, _ = RoomReservation.objects.filter(id__in=ids[i:i + batch_size]).delete()
+        moved += count
+        if pause:
+            time.sleep(pause)
+    return moved
+
+
+# --- READING ---
+
+def _filter(frame, params):
+    """ reservations.filter_reservations(), for an archived month. """
+    q = (params.get('q') or '').strip()
+    if q:
+        lower = q.lower()
+        frame = frame[
+            frame['student_name'].str.lower().str.startswith(lower).fillna(False)
+            | frame['student_id'].str.lower().eq(lower).fillna(False)
+            | frame['email'].str.lower().eq(lower).fillna(False)
+            | frame['room__name'].str.lower().eq(lower).fillna(False)
+        ]
+    name = (params.get('name') or '').strip()
+    if name:
+        frame = frame[frame['student_name'].str.lower().str.startswith(name.lower()).fillna(False)]
+    student_id = (params.get('student_id') or '').strip()
+    if student_id:
+        frame = frame[frame['student_id'].eq(student_id).fillna(False)]
+    email = (params.get('email') or '').strip()
+    if email:
+        frame = frame[frame['email'].eq(email).fillna(False)]
+    room = (params.get('room') or '').strip()
+    if room.isdigit():
+        frame = frame[frame['room_id'] == int(room)]
+    date_from = filter_date(params, 'date_from')
+    if date_from:
+        frame = frame[frame['date'] >= date_from]
+    date_to = filter_date(params, 'date_to')
+    if date_to:
+        frame = frame[frame['date'] <= date_to]
+    return frame
+
+
+def archived_rows(params, fields=None):
+    """
+    Yield archived reservations matching the staff log filters in ``params``
+    as tuples of ``fields`` (default HISTORY_FIELDS), newest month first.
+    Months outside date_from/date_to are never read.
+    """
+    import pandas as pd
+
+    fields = fields or HISTORY_FIELDS
+    date_from = filter_date(params, 'date_from')
+    date_to = filter_date(params, 'date_to')
+    for month in reversed(archived_months()):
+        start, end = _month_bounds(month)
+        if (date_from and end <= date_from) or (date_to and start > date_to):
+            continue
+        frame = _filter(read_month(month), params).sort_values(['reserved_at', 'id'], ascending=False)
+        for row in frame[fields].itertuples(index=False, name=None):
+            yield tuple(None if pd.isna(value) else _python(value) for value in row)
+
+
+def _python(value):
+    """ Plain Python values for the exporters, datetimes aware. """
+    if hasattr(value, 'to_pydatetime'):
+        return value.to_pydatetime()
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
@@ -0,0 +1,165 @@
+"""
+Resized WebP/AVIF derivatives for site images.
+
+For an image ``council/Andy.png`` the derivatives are written next to it as
+``council/_derivatives/Andy-640w.webp`` and so on, one per width in
+DERIVATIVE_WIDTHS that is not wider than the original. The {% responsive_image %}
+tag (programs/templatetags/images.py) turns whichever of them exist into a
+<picture> with srcset, falling back to the original file.
+
+Static images are processed by the build_image_derivatives command; uploaded
+GoverningCouncil thumbnails are queued for the job worker (programs/jobs.py)
+when the member is saved, so the admin save does not wait for the encoders.
+Until the job has run the page shows the original file. The derivative
+listing for an upload is cached (media_derivative_files), so rendering the
+council page does not scan the storage for every member.
+"""
+import logging
+import os
+import re
+from io import BytesIO
+from pathlib import Path, PurePosixPath
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from PIL import Image, ImageOps, features
+
+from .jobs import enqueue
+from .models import GoverningCouncil
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVE_WIDTHS = (320, 640, 1024)
+DERIVATIVE_DIR = '_derivatives'
+SOURCE_EXTENSIONS = {'.png', '.jpg', '.jpeg', '.webp'}
+
+# Best first; <source> elements are emitted in this order
+FORMATS = [fmt for fmt in ('avif', 'webp') if features.check(fmt)]
+QUALITY = {'avif': 50, 'webp': 75}
+
+MEDIA_DERIVATIVES_KEY = 'images:derivatives:{}'
+# An empty listing may predate a queued build, so it is only trusted briefly
+MISSING_DERIVATIVES_TIMEOUT = 5 * 60
+
+
+def derivative_name(name, width, fmt):
+    path = PurePosixPath(name)
+    return str(path.parent / DERIVATIVE_DIR / f"{path.stem}-{width}w.{fmt}")
+
+
+def widths_for(original_width):
+    """ The derivative widths worth producing for an image this wide (never upscales). """
+    widths = [w for w in DERIVATIVE_WIDTHS if w < original_width]
+    return widths + [min(original_width, DERIVATIVE_WIDTHS[-1])]
+
+
+def render_derivatives(fh):
+    """ Yield (width, fmt, bytes) for every derivative of the image in ``fh``. """
+    with Image.open(fh) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'P') else 'RGB')
+        for width in widths_for(image.width):
+            height = round(image.height * width / image.width)
+            resized = image.resize((width, height), Image.Resampling.LANCZOS) if width != image.width else image
+            for fmt in FORMATS:
+                out = BytesIO()
+                resized.save(out, format=fmt.upper(), quality=QUALITY[fmt])
+                yield width, fmt, out.getvalue()
+
+
+def build_static_derivatives(root, force=False):
+    """
+    Write derivatives for every image under the directory ``root``.
+    Up-to-date derivatives are skipped unless ``force``. Returns the number of files written.
+    """
+    root = Path(root)
+    written = 0
+    for source in sorted(root.rglob('*')):
+        if source.suffix.lower() not in SOURCE_EXTENSIONS or DERIVATIVE_DIR in source.parts:
+            continue
+        rel = source.relative_to(root).as_posix()
+        if not force and _static_is_current(root, rel, source):
+            continue
+        with open(source, 'rb') as fh:
+            for width, fmt, data in render_derivatives(fh):
+                target = root / derivative_name(rel, width, fmt)
+                target.parent.mkdir(parents=True, exist_ok=True)
+                target.write_bytes(data)
+                written += 1
+    return written
+
+
+def _static_is_current(root, rel, source):
+    # The last width we produce always exists; if it is newer than the source, the set is current
+    with Image.open(source) as image:
+        width = widths_for(image.width)[-1]
+    for fmt in FORMATS:
+        target = root / derivative_name(rel, width, fmt)
+        if not target.exists() or target.stat().st_mtime < source.stat().st_mtime:
+            return False
+    return True
+
+
+def _list_media_derivatives(name, storage):
+    path = PurePosixPath(name)
+    folder = str(path.parent / DERIVATIVE_DIR)
+    if not storage.exists(folder):
+        return []
+    _, files = storage.listdir(folder)
+    pattern = re.compile(rf"{re.escape(path.stem)}-\d+w\.\w+")
+    return sorted(f for f in files if pattern.fullmatch(f))
+
+
+def has_media_derivatives(name, storage=default_storage):
+    return bool(_list_media_derivatives(name, storage))
+
+
+def media_derivative_files(name, storage=default_storage):
+    """ Filenames of the derivatives of upload ``name`` in its _derivatives folder, from the cache when known. """
+    key = MEDIA_DERIVATIVES_KEY.format(name)
+    files = cache.get(key)
+    if files is None:
+        files = _list_media_derivatives(name, storage)
+        cache.set(key, files, timeout=None if files else MISSING_DERIVATIVES_TIMEOUT)
+    return files
+
+
+def build_media_derivatives(name, storage=default_storage, force=False):
+    """
+    Write derivatives for an uploaded file stored as ``name``; skipped when they
+    already exist unless ``force``. Returns the number of files written.
+    """
+    if os.path.splitext(name)[1].lower() not in SOURCE_EXTENSIONS:
+        return 0
+    if not force and has_media_derivatives(name, storage):
+        return 0
+    written = 0
+    with storage.open(name, 'rb') as fh:
+        for width, fmt, data in render_derivatives(fh):
+            target = derivative_name(name, width, fmt)
+            if storage.exists(target):
+                storage.delete(target)
+            storage.save(target, ContentFile(data))
+            written += 1
+    cache.delete(MEDIA_DERIVATIVES_KEY.format(name))
+    return written
+
+
+def build_upload_derivatives(name):
+    """ Job: build_media_derivatives() for an upload in the default storage. """
+    try:
+        build_media_derivatives(name)
+    except OSError:
+        # A broken or missing upload will not get better on a retry
+        logger.exception("Could not build derivatives for %s", name)
+
+
+@receiver(post_save, sender=GoverningCouncil)
+def build_thumbnail_derivatives(sender, instance, raw=False, **kwargs):
+    # Uploads get unique names, so existing derivatives always belong to this file
+    if not raw and instance.thumbnail and not media_derivative_files(instance.thumbnail.name, instance.thumbnail.storage):
+        enqueue(build_upload_derivatives, instance.thumbnail.name)
@@ -0,0 +1,175 @@
+"""
+A small job queue kept in the main database (the Job model), for work that
+should not hold up a request: email, SMS, PDFs, image processing.
+
+    from .jobs import enqueue
+    enqueue(email_booking_confirmation, reservation.pk)
+
+enqueue() only inserts a row, inside the caller's transaction, so a job for a
+record that is rolled back never runs. `manage.py run_jobs` claims due jobs
+with a conditional UPDATE (so several workers never run the same job) and runs
+them in a thread or process pool. A claim is a lease of JOB_LEASE seconds
+that the worker renews while the job runs; only a job whose lease ran out -
+its worker died or hung - is given back to the queue, so a slow job is never
+run twice. A job that raises is retried with exponential backoff until it has
+used up max_attempts, then marked failed.
+Arguments must be JSON-serialisable; pass primary keys, not model instances.
+"""
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Avg, Count, DurationField, ExpressionWrapper, F, Min, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def task_name(task):
+    if isinstance(task, str):
+        return task
+    return f"{task.__module__}.{task.__qualname__}"
+
+
+def enqueue(task, *args, delay=None, max_attempts=None, **kwargs):
+    """ Queue ``task(*args, **kwargs)`` to run in the worker, after ``delay`` seconds if given. """
+    job = Job(task=task_name(task), args=list(args), kwargs=kwargs)
+    if delay:
+        job.run_after = timezone.now() + timedelta(seconds=delay)
+    if max_attempts:
+        job.max_attempts = max_attempts
+    job.save()
+    return job
+
+
+def backoff(attempts):
+    """ Seconds to wait before retry number ``attempts``: doubles each time, with jitter. """
+    base = _setting('JOB_RETRY_DELAY', 30)
+    delay = min(base * 2 ** (attempts - 1), _setting('JOB_RETRY_MAX_DELAY', 3600))
+    return delay * random.uniform(0.8, 1.2)
+
+
+# --- WORKER SIDE ---
+
+def lease():
+    return timedelta(seconds=_setting('JOB_LEASE', 60))
+
+
+def claim_jobs(worker, limit):
+    """ Mark up to ``limit`` due jobs as running for ``worker`` and return their ids. """
+    now = timezone.now()
+    due = list(
+        Job.objects.filter(status=Job.QUEUED, run_after__lte=now)
+        .order_by('run_after', 'pk').values_list('pk', flat=True)[:limit]
+    )
+    claimed = []
+    for pk in due:
+        # Another worker may have claimed it since the SELECT; only one UPDATE can match
+        if Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING, started_at=now, lease_until=now + lease(), worker=worker, attempts=F('attempts') + 1,
+        ):
+            claimed.append(pk)
+    return claimed
+
+
+def renew_leases(worker, pks):
+    """ Extend ``worker``'s leases on the running jobs ``pks``; the worker's heartbeat. """
+    return Job.objects.filter(pk__in=pks, status=Job.RUNNING, worker=worker).update(lease_until=timezone.now() + lease())
+
+
+def execute_job(pk):
+    """ Run one claimed job and record the outcome. Returns the final status. """
+    close_old_connections()
+    try:
+        job = Job.objects.get(pk=pk)
+        try:
+            import_string(job.task)(*job.args, **job.kwargs)
+        except Exception:
+            return _record_failure(job, traceback.format_exc())
+        Job.objects.filter(pk=pk).update(status=Job.DONE, finished_at=timezone.now(), last_error='')
+        return Job.DONE
+    finally:
+        close_old_connections()
+
+
+def _record_failure(job, error):
+    now = timezone.now()
+    if job.attempts >= job.max_attempts:
+        logger.error("Job %s (%s) failed for good after %s attempts", job.pk, job.task, job.attempts)
+        Job.objects.filter(pk=job.pk).update(status=Job.FAILED, finished_at=now, last_error=error)
+        return Job.FAILED
+    retry_at = now + timedelta(seconds=backoff(job.attempts))
+    logger.warning("Job %s (%s) failed, retrying at %s", job.pk, job.task, retry_at)
+    Job.objects.filter(pk=job.pk).update(status=Job.QUEUED, run_after=retry_at, last_error=error)
+    return Job.QUEUED
+
+
+def requeue_stale(at=None):
+    """ Give running jobs whose lease expired by ``at`` (default now) back to the queue. """
+    now = timezone.now()
+    stale = Job.objects.filter(status=Job.RUNNING, lease_until__lt=at or now)
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, finished_at=now, last_error="Worker stopped responding.",
+    )
+    requeued = stale.update(status=Job.QUEUED, run_after=now)
+    return requeued + failed
+
+
+def prune_jobs(days=None):
+    """ Delete jobs that finished successfully more than ``days`` ago. """
+    days = days if days is not None else _setting('JOB_RETENTION_DAYS', 7)
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = Job.objects.filter(status=Job.DONE, finished_at__lt=cutoff).delete()
+    return deleted
+
+
+def run_due_jobs(worker='inline', limit=100):
+    """
+    Claim and run due jobs one by one in this thread; handy in shells and tests.
+    Nothing renews the leases, so keep jobs run this way shorter than JOB_LEASE.
+    """
+    results = {}
+    for pk in claim_jobs(worker, limit):
+        results[pk] = execute_job(pk)
+    return results
+
+
+# --- MONITORING ---
+
+def queue_stats(window=timedelta(hours=1)):
+    """
+    Queue depth by status, how late the oldest due job is, and the average
+    wait and run times of jobs finished within ``window``; times in seconds.
+    """
+    now = timezone.now()
+    depth = Job.objects.aggregate(
+        scheduled=Count('pk', filter=Q(status=Job.QUEUED, run_after__gt=now)),
+        due=Count('pk', filter=Q(status=Job.QUEUED, run_after__lte=now)),
+        running=Count('pk', filter=Q(status=Job.RUNNING)),
+        failed=Count('pk', filter=Q(status=Job.FAILED)),
+        oldest_due=Min('run_after', filter=Q(status=Job.QUEUED, run_after__lte=now)),
+    )
+    recent = Job.objects.filter(status=Job.DONE, finished_at__gte=now - window).aggregate(
+        done=Count('pk'),
+        wait=Avg(ExpressionWrapper(F('started_at') - F('created_at'), output_field=DurationField())),
+        runtime=Avg(ExpressionWrapper(F('finished_at') - F('started_at'), output_field=DurationField())),
+    )
+    oldest_due = depth.pop('oldest_due')
+    seconds = lambda delta: delta.total_seconds() if delta is not None else None
+    return {
+        **depth,
+        'lag': seconds(now - oldest_due) if oldest_due else 0.0,
+        'done_recently': recent['done'],
+        'avg_wait': seconds(recent['wait']),
+        'avg_runtime': seconds(recent['runtime']),
+    }
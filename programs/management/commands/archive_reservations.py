@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from programs.history import archive_format, archive_reservations, history_dir, hot_cutoff
+from programs.purge import PURGE_BATCH_SIZE, PURGE_PAUSE
+
+
+class Command(BaseCommand):
+    help = (
+        "Move room reservations older than RESERVATION_HOT_MONTHS whole months out of the database "
+        "into monthly archive files (see programs/history.py)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, help="Whole months to keep in the database (default: RESERVATION_HOT_MONTHS).")
+        parser.add_argument('--batch-size', type=int, default=PURGE_BATCH_SIZE)
+        parser.add_argument('--pause', type=float, default=PURGE_PAUSE, help="Seconds to wait between delete batches.")
+        parser.add_argument('--dry-run', action='store_true', help="Only count what would move.")
+
+    def handle(self, *args, months, batch_size, pause, dry_run, **options):
+        if months is not None and months < 1:
+            raise CommandError("--months must be at least 1; the current month always stays in the database.")
+        moved = archive_reservations(months=months, batch_size=batch_size, pause=pause, dry_run=dry_run)
+        if not moved:
+            self.stdout.write(f"Nothing dated before {hot_cutoff(months=months)} to archive.")
+            return
+        verb = "would move" if dry_run else "moved"
+        for month, count in moved.items():
+            self.stdout.write(f"{month}: {count} reservations")
+        self.stdout.write(self.style.SUCCESS(
+            f"{sum(moved.values())} reservations {verb} to {history_dir()} ({archive_format()})."
+        ))
@@ -0,0 +1,83 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import override_settings
+
+from programs.benchmarks import LOCMEM_CACHE, booking_throughput
+from programs.models import StudyRoom
+
+
+def _counts(value):
+    try:
+        return [int(count) for count in value.split(',') if count.strip()]
+    except ValueError:
+        raise CommandError(f"'{value}' is not a comma-separated list of client counts.")
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure room booking throughput with many concurrent clients on SQLite, with the default "
+        "connection settings and with SQLITE_TUNING (see programs/sqlite.py), each on a fresh "
+        "throwaway database file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=_counts, default=[1, 8, 32], help="Comma-separated client counts.")
+        parser.add_argument('--bookings', type=int, default=50, help="Booking attempts per client.")
+        parser.add_argument('--rooms', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help="Also write the results to this JSON file.")
+
+    def handle(self, *args, clients, bookings, rooms, seed, output, **options):
+        database = connections['default'].settings_dict
+        if database['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError("This benchmark measures SQLite; the default database is not SQLite.")
+
+        original_name = database['NAME']
+        workdir = tempfile.mkdtemp(prefix='booking-bench-')
+        results = []
+        try:
+            # The cache is kept in memory so only the database is measured
+            with override_settings(CACHES=LOCMEM_CACHE):
+                template = os.path.join(workdir, 'template.sqlite3')
+                self.use_database(database, template)
+                call_command('migrate', verbosity=0, interactive=False)
+                StudyRoom.objects.bulk_create(StudyRoom(name=f'Bench Room {n + 1:03}') for n in range(rooms))
+                connections.close_all()
+
+                self.stdout.write(f"{'mode':<8} {'clients':>7} {'booked':>7} {'taken':>6} {'failed':>6} {'per s':>8} {'p50 ms':>8} {'p95 ms':>8}")
+                for tuned in (False, True):
+                    for count in clients:
+                        path = os.path.join(workdir, f"{'tuned' if tuned else 'default'}-{count}.sqlite3")
+                        shutil.copy(template, path)
+                        self.use_database(database, path)
+                        with override_settings(SQLITE_TUNING=tuned):
+                            result = booking_throughput(
+                                StudyRoom.objects.all(), clients=max(1, count), bookings=bookings, seed=seed,
+                            )
+                        connections.close_all()
+                        result['mode'] = 'tuned' if tuned else 'default'
+                        results.append(result)
+                        self.stdout.write(
+                            f"{result['mode']:<8} {result['clients']:>7} {result['booked']:>7} {result['taken']:>6} "
+                            f"{result['failed']:>6} {result['attempts_per_s']:>8.1f} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f}"
+                        )
+        finally:
+            self.use_database(database, original_name)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        if output:
+            with open(output, 'w') as fh:
+                json.dump({'bookings_per_client': bookings, 'rooms': rooms, 'runs': results}, fh, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {output}"))
+
+    @staticmethod
+    def use_database(database, name):
+        # Every thread's connection is built from this same settings dict
+        connections.close_all()
+        database['NAME'] = name
@@ -0,0 +1,146 @@
+import json
+import os
+import platform
+import tempfile
+from datetime import datetime
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_databases, setup_test_environment, teardown_databases, teardown_test_environment
+from django.utils import timezone
+
+from programs.availability import touch_rooms
+from programs.benchmarks import LOCMEM_CACHE, ROUTES, Fixtures, compare, run_benchmarks
+from programs.caching import bump_catalogue_version
+from programs.models import CourseRegistration, Program, RoomReservation, StudyRoom
+from programs.purge import archive_dir
+from programs.search import rebuild_index
+from programs.synthetic import SyntheticData
+
+
+def _sizes(value):
+    try:
+        return [int(size) for size in value.split(',') if size.strip()]
+    except ValueError:
+        raise CommandError(f"'{value}' is not a comma-separated list of reservation counts.")
+
+
+class Command(BaseCommand):
+    help = (
+        "Time every named route with the test client and write p50/p95/p99 latency, queries and response "
+        "bytes to JSON. With --sizes, runs against freshly seeded throwaway databases of each size."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=_sizes,
+            help="Comma-separated reservation counts, e.g. 1000,10000,100000. Each is seeded into a test "
+                 "database (see seed_data); without this the current database is used as it is.",
+        )
+        parser.add_argument('--requests', type=int, default=20, help="Timed requests per route.")
+        parser.add_argument('--warmup', type=int, default=2, help="Untimed requests per route first.")
+        parser.add_argument('--route', action='append', dest='routes', choices=sorted(ROUTES), help="Only this route (repeatable).")
+        parser.add_argument('--include-writes', action='store_true', help="Also time routes that change data.")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help="JSON file to write (default: the archive directory).")
+        parser.add_argument('--baseline', help="JSON file from an earlier run to compare against.")
+        parser.add_argument(
+            '--fail-over', type=float, metavar='PERCENT',
+            help="With --baseline, exit with an error when a route's p95 grew by more than this, or it runs more queries.",
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['baseline']:
+            with open(options['baseline']) as fh:
+                baseline = json.load(fh)
+
+        setup_test_environment()  # lets the test client through ALLOWED_HOSTS and keeps mail in memory
+        try:
+            if options['sizes']:
+                runs = self.seeded_runs(options)
+            else:
+                runs = [self.run(None, Fixtures(), options)]
+        finally:
+            teardown_test_environment()
+
+        report = {
+            'created_at': timezone.now().isoformat(),
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'requests': options['requests'],
+            },
+            'runs': runs,
+        }
+        path = options['output'] or os.path.join(archive_dir(), f"benchmark-{datetime.now():%Y%m%d-%H%M%S}.json")
+        with open(path, 'w') as fh:
+            json.dump(report, fh, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Results written to {path}"))
+
+        if baseline is not None:
+            regressions = compare(baseline, report, options['fail_over'] or 0)
+            for size, name, message in regressions:
+                self.stdout.write(self.style.WARNING(f"[{size or 'current'}] {name}: {message}"))
+            if not regressions:
+                self.stdout.write("No regressions against the baseline.")
+            elif options['fail_over'] is not None:
+                raise CommandError(f"{len(regressions)} regressions over {options['fail_over']:g}%.")
+
+    def seeded_runs(self, options):
+        old_config = setup_databases(verbosity=0, interactive=False)
+        media = tempfile.TemporaryDirectory()  # placeholder proofs and receipts stay out of MEDIA_ROOT
+        try:
+            with override_settings(MEDIA_ROOT=media.name, CACHES=LOCMEM_CACHE):
+                staff = get_user_model().objects.create_user('bench.staff', password='bench', is_staff=True)
+                runs = []
+                for size in sorted(options['sizes']):
+                    self.stdout.write(f"Seeding {size:,} reservations...")
+                    data = SyntheticData(seed=options['seed'])
+                    data.clear()
+                    programs = data.programs(60)
+                    rooms = data.rooms(min(300, max(10, size // 3000)), 8)
+                    students = data.students(min(20_000, max(50, size // 50)))
+                    data.reservations(size, rooms, students)
+                    data.registrations(min(50_000, max(20, size // 20)), programs)
+                    # As seed_data does: bulk_create bypasses the signals that keep these in step
+                    rebuild_index()
+                    bump_catalogue_version()
+                    touch_rooms()
+                    runs.append(self.run(size, Fixtures(staff=staff), options))
+                return runs
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            media.cleanup()
+
+    def run(self, size, fixtures, options):
+        label = f"{size:,} reservations" if size else "current database"
+        self.stdout.write(f"\n{label}")
+        self.stdout.write(f"{'route':<40} {'status':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'queries':>8} {'bytes':>9}")
+
+        def progress(name, result):
+            self.stdout.write(
+                f"{name:<40} {result['status']:>6} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} "
+                f"{result['p99_ms']:>8.1f} {result['queries']:>8} {result['bytes']:>9}"
+            )
+
+        results, skipped = run_benchmarks(
+            fixtures, routes=options['routes'], requests=max(1, options['requests']),
+            warmup=max(0, options['warmup']), include_writes=options['include_writes'], progress=progress,
+        )
+        for name, reason in skipped.items():
+            self.stdout.write(f"{name:<40} skipped ({reason})")
+        return {
+            'size': size,
+            'rows': {
+                'reservations': RoomReservation.objects.count(),
+                'rooms': StudyRoom.objects.count(),
+                'programs': Program.objects.count(),
+                'registrations': CourseRegistration.objects.count(),
+            },
+            'routes': results,
+            'skipped': skipped,
+        }
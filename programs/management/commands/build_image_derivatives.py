@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from programs.images import FORMATS, build_media_derivatives, build_static_derivatives
+from programs.models import GoverningCouncil
+
+
+class Command(BaseCommand):
+    help = "Generate resized WebP/AVIF derivatives for static images and council thumbnails."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Rebuild derivatives that are already up to date.")
+        parser.add_argument('--skip-static', action='store_true')
+        parser.add_argument('--skip-media', action='store_true')
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Formats: {', '.join(FORMATS) or 'none available in this Pillow build'}")
+        if not FORMATS:
+            return
+
+        if not options['skip_static']:
+            for root in settings.STATICFILES_DIRS:
+                written = build_static_derivatives(root, force=options['force'])
+                self.stdout.write(f"{root}: {written} files written")
+
+        if not options['skip_media']:
+            written = 0
+            for name in GoverningCouncil.objects.exclude(thumbnail='').values_list('thumbnail', flat=True):
+                if default_storage.exists(name):
+                    written += build_media_derivatives(name, force=options['force'])
+            self.stdout.write(f"Council thumbnails: {written} files written")
+
+        self.stdout.write(self.style.SUCCESS("Image derivatives are up to date."))
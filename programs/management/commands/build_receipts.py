@@ -0,0 +1,67 @@
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date, datetime, time, timedelta
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+from programs.purge import archive_dir
+from programs.receipts import KINDS, records_between, render_batch
+
+BATCH_SIZE = 50
+
+
+def _day(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"'{value}' is not a date (YYYY-MM-DD).")
+
+
+class Command(BaseCommand):
+    help = "Render PDF receipts for every reservation/registration in a date range into one zip file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('start', type=_day, help="First day (YYYY-MM-DD).")
+        parser.add_argument('end', type=_day, help="Last day, inclusive (YYYY-MM-DD).")
+        parser.add_argument('--kind', choices=[*KINDS, 'all'], default='all')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+        parser.add_argument('--output', help="Zip file to write (default: the archive directory).")
+
+    def handle(self, *args, start, end, kind, workers, output, **options):
+        if end < start:
+            raise CommandError("The end date is before the start date.")
+        window = (
+            timezone.make_aware(datetime.combine(start, time.min)),
+            timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)),
+        )
+        kinds = list(KINDS) if kind == 'all' else [kind]
+        batches = []
+        for k in kinds:
+            ids = records_between(k, *window)
+            batches += [(k, ids[i:i + BATCH_SIZE]) for i in range(0, len(ids), BATCH_SIZE)]
+        if not batches:
+            self.stdout.write("No records in that range.")
+            return
+
+        path = output or os.path.join(archive_dir(), f"receipts-{start}-{end}.zip")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        written = 0
+        # Forked workers must open their own database connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=max(1, workers), initializer=django.setup) as pool, \
+                zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+            futures = {pool.submit(render_batch, k, ids): k for k, ids in batches}
+            for future in as_completed(futures):
+                # A finished future holds its batch's PDFs: forget it once they are in the zip
+                k = futures.pop(future)
+                for filename, data in future.result():
+                    archive.writestr(f"{k}s/{filename}", data)
+                    written += 1
+                del future
+                self.stdout.write(f"{written} receipts written...", ending='\r')
+
+        self.stdout.write(self.style.SUCCESS(f"\nWrote {written} receipts to {path}"))
@@ -0,0 +1,38 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from programs.analytics import refresh_room_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Materialise daily study room occupancy (RoomDayStats) for the staff dashboard. Without options "
+        "it refreshes the last couple of days and catches up to yesterday (see programs/analytics.py)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help="First day to (re)compute, YYYY-MM-DD.")
+        parser.add_argument('--until', help="Last day to compute, YYYY-MM-DD (default: yesterday).")
+        parser.add_argument('--days', type=int, help="Recompute this many days up to --until instead of --since.")
+
+    def handle(self, *args, since, until, days, **options):
+        try:
+            since, until = [parse_date(value) if value else None for value in (since, until)]
+        except ValueError:
+            raise CommandError("Dates must be valid YYYY-MM-DD days.")
+        if days is not None:
+            if days < 1:
+                raise CommandError("--days must be at least 1.")
+            if since is not None:
+                raise CommandError("Use either --since or --days, not both.")
+            since = (until or timezone.localdate() - timedelta(days=1)) - timedelta(days=days - 1)
+
+        written = refresh_room_stats(since=since, until=until)
+        if written is None:
+            self.stdout.write("Room stats are already up to date.")
+            return
+        first, last = written
+        self.stdout.write(self.style.SUCCESS(f"Room stats computed for {first} to {last}."))
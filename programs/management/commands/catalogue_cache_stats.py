@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from programs.caching import catalogue_cache_stats, reset_catalogue_cache_stats
+
+
+class Command(BaseCommand):
+    help = "Show hit/miss counters for the public catalogue page cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help="Zero the counters after printing them.")
+
+    def handle(self, *args, **options):
+        stats = catalogue_cache_stats()
+        self.stdout.write(
+            f"hits={stats['hits']} misses={stats['misses']} "
+            f"hit_rate={stats['hit_rate']:.1%} version={stats['version']}"
+        )
+        if options['reset']:
+            reset_catalogue_cache_stats()
+            self.stdout.write("Counters reset.")
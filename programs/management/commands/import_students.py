@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from programs.onboarding import ImportFileError, import_students, read_rows, write_error_report
+
+
+class Command(BaseCommand):
+    help = "Create student accounts and profiles from a CSV or XLSX intake sheet (see programs/onboarding.py)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help="The .csv or .xlsx intake sheet.")
+        parser.add_argument('--default-password', help="Password for rows without one (otherwise they get none).")
+        parser.add_argument('--workers', type=int, help="Processes hashing passwords (default: one per CPU).")
+        parser.add_argument('--report', help="Write the per-row error report to this CSV file (default: stdout).")
+        parser.add_argument('--dry-run', action='store_true', help="Only validate; create nothing.")
+
+    def handle(self, *args, file, default_password, workers, report, dry_run, **options):
+        started = time.monotonic()
+        try:
+            with open(file, 'rb') as fh:
+                records = read_rows(fh, file)
+        except (OSError, ImportFileError) as e:
+            raise CommandError(str(e))
+
+        created, errors = import_students(records, default_password=default_password, workers=workers, dry_run=dry_run)
+
+        if errors:
+            if report:
+                with open(report, 'w', newline='') as fh:
+                    write_error_report(errors, fh)
+                self.stdout.write(self.style.WARNING(f"{len(errors)} row(s) skipped; see {report}."))
+            else:
+                self.stdout.write(self.style.WARNING(f"{len(errors)} row(s) skipped:"))
+                write_error_report(errors, self.stdout)
+        verb = "would be created" if dry_run else "created"
+        self.stdout.write(self.style.SUCCESS(
+            f"{created} of {len(records)} students {verb} in {time.monotonic() - started:.1f}s."
+        ))
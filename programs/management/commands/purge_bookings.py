@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from programs.purge import PURGE_BATCH_SIZE, PURGE_PAUSE, purge_reservations
+
+
+class Command(BaseCommand):
+    help = "Archive room reservation logs to a compressed CSV, then delete them in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', help="Only purge reservations dated before this day (YYYY-MM-DD).")
+        parser.add_argument('--batch-size', type=int, default=PURGE_BATCH_SIZE)
+        parser.add_argument('--pause', type=float, default=PURGE_PAUSE, help="Seconds to wait between batches.")
+
+    def handle(self, *args, **options):
+        before = None
+        if options['before']:
+            before = parse_date(options['before'])
+            if before is None:
+                raise CommandError("--before must be a date in YYYY-MM-DD format.")
+
+        deleted, path = purge_reservations(before=before, batch_size=options['batch_size'], pause=options['pause'])
+        if path is None:
+            self.stdout.write("Nothing to purge.")
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Purged {deleted} reservations; archive written to {path}"))
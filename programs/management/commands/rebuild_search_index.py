@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from programs.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Re-index every programme for full-text search (e.g. after a bulk import)."
+
+    def handle(self, *args, **options):
+        rebuild_index()
+        self.stdout.write(self.style.SUCCESS("Programme search index rebuilt."))
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from programs.release import next_change, release_due
+
+# Never sleep less than this between sweeps (seconds)
+MIN_SLEEP = 1.0
+
+
+class Command(BaseCommand):
+    help = "Release study rooms as bookings lapse, pushing each change to the open room grids, until stopped."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--poll', type=float, default=30.0,
+            help="Longest sleep between sweeps (seconds); bounds how late a just-made booking is noticed.",
+        )
+        parser.add_argument('--once', action='store_true', help="Run a single sweep and exit.")
+
+    def handle(self, *args, poll, once, **options):
+        if not once:
+            self.stdout.write(f"Release clock running (sweeping at least every {poll:g}s).")
+        try:
+            while True:
+                now = timezone.now()
+                room_ids = release_due(now)
+                if room_ids:
+                    self.stdout.write(f"{timezone.localtime(now):%H:%M:%S} rooms changed: {sorted(room_ids)}")
+                if once:
+                    break
+                upcoming = next_change(now)
+                wait = poll if upcoming is None else (upcoming - timezone.now()).total_seconds()
+                time.sleep(min(poll, max(MIN_SLEEP, wait)))
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping.")
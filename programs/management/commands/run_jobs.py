@@ -0,0 +1,74 @@
+import os
+import socket
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from programs.jobs import claim_jobs, execute_job, lease, prune_jobs, renew_leases, requeue_stale
+
+# Stale-job recovery and pruning run this often (seconds)
+HOUSEKEEPING_INTERVAL = 300
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (email, SMS, receipts, previews) until stopped."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help="Jobs to run at the same time.")
+        parser.add_argument(
+            '--processes', action='store_true',
+            help="Use a process pool instead of threads (for CPU-heavy jobs such as PDF rendering).",
+        )
+        parser.add_argument('--poll', type=float, default=1.0, help="Seconds to sleep when the queue is empty.")
+        parser.add_argument('--once', action='store_true', help="Exit once no job is due.")
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        name = f"{socket.gethostname()}:{os.getpid()}"
+        if options['processes']:
+            # Children must not inherit this process's open database connections
+            connections.close_all()
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=django.setup)
+        else:
+            pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='job')
+
+        self.stdout.write(f"Worker {name} running {workers} {'processes' if options['processes'] else 'threads'}.")
+        running = {}
+        done = 0
+        next_housekeeping = 0
+        # Renew well before the leases run out, so a slow poll or query cannot let one lapse
+        renew_every = lease().total_seconds() / 3
+        next_renewal = time.monotonic() + renew_every
+        try:
+            while True:
+                if time.monotonic() >= next_housekeeping:
+                    requeue_stale()
+                    prune_jobs()
+                    next_housekeeping = time.monotonic() + HOUSEKEEPING_INTERVAL
+                if time.monotonic() >= next_renewal:
+                    if running:
+                        renew_leases(name, list(running.values()))
+                    next_renewal = time.monotonic() + renew_every
+
+                for pk in claim_jobs(name, workers - len(running)):
+                    running[pool.submit(execute_job, pk)] = pk
+
+                if running:
+                    finished, _ = wait(running, timeout=options['poll'], return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        pk = running.pop(future)
+                        done += 1
+                        if future.exception():
+                            self.stderr.write(f"Job {pk} crashed the worker: {future.exception()}")
+                elif options['once']:
+                    break
+                else:
+                    time.sleep(options['poll'])
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping; waiting for running jobs to finish.")
+        finally:
+            pool.shutdown(wait=True)
+        self.stdout.write(self.style.SUCCESS(f"Ran {done} jobs."))
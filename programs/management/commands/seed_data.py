@@ -0,0 +1,65 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from programs.availability import touch_rooms
+from programs.caching import bump_catalogue_version
+from programs.search import rebuild_index
+from programs.synthetic import SEED_PASSWORD, SEED_ROOM, SyntheticData
+
+
+class Command(BaseCommand):
+    help = "Fill the database with a reproducible, production-sized synthetic dataset (see programs/synthetic.py)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=42, help="Random seed; the same seed gives the same data.")
+        parser.add_argument('--rooms', type=int, default=300)
+        parser.add_argument('--floors', type=int, default=8)
+        parser.add_argument('--reservations', type=int, default=1_000_000)
+        parser.add_argument('--per-day', type=int, default=4, help="Average bookings per room per day.")
+        parser.add_argument('--students', type=int, default=20_000)
+        parser.add_argument('--programs', type=int, default=60)
+        parser.add_argument('--registrations', type=int, default=50_000)
+        parser.add_argument('--chunk-size', type=int, default=5000, help="Rows per bulk insert.")
+        parser.add_argument('--clear', action='store_true', help="Delete previously seeded data first.")
+        parser.add_argument('--force', action='store_true', help="Allow running with DEBUG off.")
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['force']:
+            raise CommandError("Refusing to seed synthetic data with DEBUG off; pass --force if this really is not production.")
+        if options['rooms'] < 1 and options['reservations']:
+            raise CommandError("Reservations need at least one room.")
+
+        started = time.monotonic()
+        data = SyntheticData(seed=options['seed'], chunk_size=options['chunk_size'], progress=self.progress)
+        if options['clear']:
+            self.stdout.write("Removing previously seeded data...")
+            data.clear()
+        elif data.rooms_seeded():
+            raise CommandError(f"Seeded rooms ('{SEED_ROOM}...') already exist; use --clear to replace them.")
+
+        programs = data.programs(options['programs'])
+        rooms = data.rooms(options['rooms'], max(1, options['floors']))
+        students = data.students(options['students'])
+        data.reservations(options['reservations'], rooms, students, per_day=max(1, options['per_day']))
+        if programs:
+            data.registrations(options['registrations'], programs)
+        self.stdout.write("")
+
+        # bulk_create bypasses the signals that keep these in step
+        rebuild_index()
+        bump_catalogue_version()
+        touch_rooms()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded in {time.monotonic() - started:.0f}s. Student logins use the password '{SEED_PASSWORD}'."
+        ))
+
+    def progress(self, label, done):
+        # One line per table, rewritten in place as chunks go in
+        if label != getattr(self, '_label', None):
+            if getattr(self, '_label', None):
+                self.stdout.write("")
+            self._label = label
+        self.stdout.write(f"{label}: {done:,}", ending='\r')
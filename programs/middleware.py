@@ -0,0 +1,61 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('programs.queries')
+
+DEFAULT_QUERY_BUDGET = 20
+
+
+class QueryStats:
+    """ execute_wrapper that counts queries and accumulates their wall-clock time (ms). """
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.time += (time.perf_counter() - started) * 1000
+
+
+class QueryBudgetMiddleware:
+    """
+    Records the number of SQL queries and the time spent in them for every
+    request, and logs a warning when a view goes over its budget.
+
+    Budgets come from settings.QUERY_BUDGETS (keyed by URL name, e.g.
+    'programs:staff_room_bookings') and fall back to settings.QUERY_BUDGET.
+    The numbers are attached to the response as ``response.query_stats`` so
+    tests can assert on them, and sent as a Server-Timing header when DEBUG is on.
+    Queries run while a StreamingHttpResponse is being consumed are not counted.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = QueryStats()
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(stats))
+            response = self.get_response(request)
+
+        response.query_stats = stats
+        view_name = request.resolver_match.view_name if request.resolver_match else request.path
+        budget = getattr(settings, 'QUERY_BUDGETS', {}).get(view_name, getattr(settings, 'QUERY_BUDGET', DEFAULT_QUERY_BUDGET))
+        if stats.count > budget:
+            logger.warning(
+                "%s ran %d queries (%.1f ms), over its budget of %d",
+                view_name, stats.count, stats.time, budget,
+            )
+        if settings.DEBUG:
+            response['Server-Timing'] = f'db;dur={stats.time:.1f};desc="{stats.count} queries"'
+        return response
@@ -0,0 +1,61 @@
+# Generated by Django 6.0.1 on 2026-10-17 16:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+# The log's search box matches names by prefix and IDs/emails case-insensitively
+# (reservations.filter_reservations); plain indexes cannot serve those lookups.
+CASE_INSENSITIVE = ['student_name', 'student_id', 'email']
+
+
+def create_case_insensitive_indexes(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for field in CASE_INSENSITIVE:
+        name = f'reservation_{field}_ci_idx'
+        if vendor == 'sqlite':
+            # LIKE (Django's i-lookups on SQLite) can range-scan a NOCASE index
+            column = f'"{field}" COLLATE NOCASE'
+        elif vendor == 'postgresql':
+            # Matches UPPER("field"::text) = / LIKE UPPER(...), including prefix patterns
+            column = f'UPPER("{field}"::text) text_pattern_ops'
+        else:
+            return
+        schema_editor.execute(f'CREATE INDEX IF NOT EXISTS {name} ON programs_roomreservation ({column})')
+
+
+def drop_case_insensitive_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        for field in CASE_INSENSITIVE:
+            schema_editor.execute(f'DROP INDEX IF EXISTS reservation_{field}_ci_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('programs', '0015_alter_roomreservation_email_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='roomreservation',
+            index=models.Index(fields=['-reserved_at', '-id'], name='reservation_log_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roomreservation',
+            index=models.Index(fields=['student_name'], name='reservation_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roomreservation',
+            index=models.Index(fields=['student_id'], name='reservation_student_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roomreservation',
+            index=models.Index(fields=['email'], name='reservation_email_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roomreservation',
+            index=models.Index(fields=['date'], name='reservation_date_idx'),
+        ),
+        migrations.RunPython(create_case_insensitive_indexes, drop_case_insensitive_indexes),
+    ]
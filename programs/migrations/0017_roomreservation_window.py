@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:23
+
+import re
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+SLOT_PATTERN = re.compile(r'^\s*(\d{1,2}:\d{2})\s*(?:TO|-)\s*(\d{1,2}:\d{2})\s*$', re.IGNORECASE)
+
+
+def backfill_windows(apps, schema_editor):
+    """ Derive start_at/end_at for existing rows from date + time_slot. """
+    RoomReservation = apps.get_model('programs', 'RoomReservation')
+    tz = timezone.get_default_timezone()
+    batch = []
+    for booking in RoomReservation.objects.filter(start_at__isnull=True).only('id', 'date', 'time_slot').iterator(chunk_size=2000):
+        match = SLOT_PATTERN.match(booking.time_slot or '')
+        if not match:
+            continue
+        try:
+            start = datetime.combine(booking.date, datetime.strptime(match.group(1), '%H:%M').time())
+            end = datetime.combine(booking.date, datetime.strptime(match.group(2), '%H:%M').time())
+        except ValueError:
+            continue
+        if end <= start:
+            end += timedelta(days=1)
+        booking.start_at = timezone.make_aware(start, tz)
+        booking.end_at = timezone.make_aware(end, tz)
+        batch.append(booking)
+        if len(batch) >= 2000:
+            RoomReservation.objects.bulk_update(batch, ['start_at', 'end_at'])
+            batch = []
+    if batch:
+        RoomReservation.objects.bulk_update(batch, ['start_at', 'end_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('programs', '0016_roomreservation_log_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='roomreservation',
+            name='end_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='roomreservation',
+            name='start_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='roomreservation',
+            index=models.Index(fields=['room', 'start_at', 'end_at'], name='reservation_window_idx'),
+        ),
+        migrations.RunPython(backfill_windows, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,69 @@
+# Full-text index for programme search (see programs/search.py)
+
+from django.db import OperationalError, migrations
+
+
+def create_search_index(apps, schema_editor):
+    Program = apps.get_model('programs', 'Program')
+    vendor = schema_editor.connection.vendor
+    levels = dict(Program._meta.get_field('level').choices)
+
+    with schema_editor.connection.cursor() as cursor:
+        if vendor == 'sqlite':
+            try:
+                cursor.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS programs_program_fts "
+                    "USING fts5(title, summary, description, category, level, tokenize='porter unicode61')"
+                )
+            except OperationalError:
+                # SQLite built without FTS5: search falls back to icontains matching
+                return
+        elif vendor == 'postgresql':
+            cursor.execute(
+                "CREATE TABLE IF NOT EXISTS programs_program_search ("
+                "program_id bigint PRIMARY KEY, "
+                "document tsvector NOT NULL)"
+            )
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS programs_program_search_gin "
+                "ON programs_program_search USING GIN (document)"
+            )
+        else:
+            return
+
+        for program in Program.objects.select_related('category').iterator():
+            level = f"{program.level} {levels.get(program.level, '')}"
+            if vendor == 'sqlite':
+                cursor.execute(
+                    "INSERT INTO programs_program_fts (rowid, title, summary, description, category, level) "
+                    "VALUES (%s, %s, %s, %s, %s, %s)",
+                    [program.pk, program.title, program.summary, program.description, program.category.name, level],
+                )
+            else:
+                cursor.execute(
+                    "INSERT INTO programs_program_search (program_id, document) VALUES (%s, "
+                    "setweight(to_tsvector('english', %s), 'A') || setweight(to_tsvector('english', %s), 'B') || "
+                    "setweight(to_tsvector('english', %s), 'B') || setweight(to_tsvector('english', %s), 'C') || "
+                    "to_tsvector('english', %s)) ON CONFLICT (program_id) DO NOTHING",
+                    [program.pk, program.title, program.category.name, level, program.summary, program.description],
+                )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    with schema_editor.connection.cursor() as cursor:
+        if vendor == 'sqlite':
+            cursor.execute("DROP TABLE IF EXISTS programs_program_fts")
+        elif vendor == 'postgresql':
+            cursor.execute("DROP TABLE IF EXISTS programs_program_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('programs', '0017_roomreservation_window'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('programs', '0018_program_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='courseregistration',
+            name='confirmation_sent_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='courseregistration',
+            name='payment_checksum',
+            field=models.CharField(blank=True, help_text='SHA-256 of the payment proof.', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='courseregistration',
+            name='payment_preview',
+            field=models.ImageField(blank=True, upload_to='registrations/previews/'),
+        ),
+        migrations.AddField(
+            model_name='courseregistration',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 17:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('programs', '0020_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='roomreservation',
+            index=models.Index(fields=['end_at'], name='reservation_end_idx'),
+        ),
+    ]
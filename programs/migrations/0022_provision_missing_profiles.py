@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.db import migrations
+
+ROLE_FIELDS = ('is_staff', 'is_superuser', 'is_staff_member')
+
+
+def provision_missing(apps, schema_editor):
+    """
+    Give every existing user the profile of their role. Profiles used to be
+    (re)checked on every save, logins included; now only role changes are,
+    so users who never got one would otherwise stay without.
+    """
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    StaffProfile = apps.get_model('programs', 'StaffProfile')
+    StudentProfile = apps.get_model('programs', 'StudentProfile')
+    for Profile, staff, users in (
+        (StaffProfile, True, User.objects.filter(staff_profile__isnull=True)),
+        (StudentProfile, False, User.objects.filter(student_profile__isnull=True)),
+    ):
+        missing = [
+            Profile(user_id=pk)
+            for pk, *flags in users.values_list('pk', *ROLE_FIELDS).iterator(chunk_size=2000)
+            if any(flags) == staff
+        ]
+        Profile.objects.bulk_create(missing, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('programs', '0021_roomreservation_end_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(provision_missing, migrations.RunPython.noop),
+    ]
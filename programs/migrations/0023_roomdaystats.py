@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 18:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('programs', '0022_provision_missing_profiles'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoomDayStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('floor', models.IntegerField()),
+                ('capacity', models.IntegerField()),
+                ('bookings', models.PositiveIntegerField(default=0, help_text='Reservations starting on this day.')),
+                ('open_minutes', models.PositiveIntegerField(help_text="Length of the day's opening hours.")),
+                ('booked_minutes', models.PositiveIntegerField(default=0, help_text='Minutes of the opening hours the room was held.')),
+                ('hourly_minutes', models.JSONField(default=list, help_text='Minutes held in each of the 24 hours.')),
+                ('gap_minutes', models.PositiveIntegerField(default=0, help_text="Idle minutes between the day's first and last booking.")),
+                ('gaps', models.PositiveSmallIntegerField(default=0, help_text='Idle stretches between bookings.')),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='day_stats', to='programs.studyroom')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='room_day_stats_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('room', 'day'), name='room_day_stats_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-17 19:13
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def expire_unleased(apps, schema_editor):
+    # Jobs claimed before leases existed get one that has already run out from
+    # their start, so a worker that died with them gives them back to the queue
+    Job = apps.get_model('programs', 'Job')
+    Job.objects.filter(status='running', lease_until__isnull=True).update(lease_until=F('started_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('programs', '0023_roomdaystats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='lease_until',
+            field=models.DateTimeField(blank=True, help_text='The worker renews this while the job runs.', null=True),
+        ),
+        migrations.RunPython(expire_unleased, migrations.RunPython.noop),
+    ]
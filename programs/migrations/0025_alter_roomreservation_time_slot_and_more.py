@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-17 20:05
+
+from importlib import import_module
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def provision_students_again(apps, schema_editor):
+    """
+    Until student_id allowed NULL, 0022 gave new student profiles an empty ID,
+    so only one per database survived the unique constraint. Clear that one
+    and provision the students who were left out.
+    """
+    StudentProfile = apps.get_model('programs', 'StudentProfile')
+    StudentProfile.objects.filter(student_id='').update(student_id=None)
+    import_module('programs.migrations.0022_provision_missing_profiles').provision_missing(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('programs', '0024_job_lease'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='roomreservation',
+            name='time_slot',
+            field=models.CharField(max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='studentprofile',
+            name='student_id',
+            field=models.CharField(blank=True, max_length=20, null=True, unique=True),
+        ),
+        migrations.RunPython(provision_students_again, migrations.RunPython.noop),
+    ]
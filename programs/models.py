@@ -2,6 +2,7 @@ from django.db import models
 from django.urls import reverse
 from django.utils.text import slugify
 from django.conf import settings 
+from django.utils import timezone
 
 # --- EXISTING MODELS (UNTOUCHED: Category, Program, CourseRegistration, GoverningCouncil) ---
 
@@ -76,6 +77,12 @@ class CourseRegistration(models.Model):
     payment_proof = models.FileField(upload_to='registrations/payments/', null=True, blank=True)
     submitted_at = models.DateTimeField(auto_now_add=True)
 
+    # Filled in after the request by programs.registrations.process_registration
+    payment_checksum = models.CharField(max_length=64, blank=True, help_text="SHA-256 of the payment proof.")
+    payment_preview = models.ImageField(upload_to='registrations/previews/', blank=True)
+    confirmation_sent_at = models.DateTimeField(null=True, blank=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
     class Meta:
         verbose_name = "Course Registration"
         verbose_name_plural = "Course Registrations"
@@ -164,5 +171,92 @@ class RoomReservation(models.Model):
     time_slot = models.CharField(max_length=50) # Increased length to handle formatted time slots
     reserved_at = models.DateTimeField(auto_now_add=True)
 
+    # The booked window. time_slot is kept as the human-readable label; these are what
+    # availability is computed from. Null only for legacy rows whose slot could not be parsed.
+    start_at = models.DateTimeField(null=True, blank=True)
+    end_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Staff log: newest-first keyset pagination on (reserved_at, id)
+            models.Index(fields=['-reserved_at', '-id'], name='reservation_log_idx'),
+            models.Index(fields=['student_name'], name='reservation_name_idx'),
+            models.Index(fields=['student_id'], name='reservation_student_id_idx'),
+            models.Index(fields=['email'], name='reservation_email_idx'),
+            models.Index(fields=['date'], name='reservation_date_idx'),
+            # Availability: overlap checks are range scans within one room
+            models.Index(fields=['room', 'start_at', 'end_at'], name='reservation_window_idx'),
+            # Release clock: "which reservations ended since the last sweep" across all rooms
+            models.Index(fields=['end_at'], name='reservation_end_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student_name} - {self.room.name} ({self.date})"
+
+# --- BACKGROUND JOBS (see programs/jobs.py) ---
+
+class Job(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    task = models.CharField(max_length=200, help_text="Dotted path of the function to call.")
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    worker = models.CharField(max_length=100, blank=True)
+    lease_until = models.DateTimeField(null=True, blank=True, help_text="The worker renews this while the job runs.")
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            # Workers poll for the oldest due job in one status
+            models.Index(fields=['status', 'run_after'], name='job_due_idx'),
+            models.Index(fields=['status', 'finished_at'], name='job_finished_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.task} [{self.status}]"
+
+# --- ROOM ANALYTICS (see programs/analytics.py) ---
+
+class RoomDayStats(models.Model):
+    """One room's use on one local day, materialised nightly from RoomReservation."""
+    room = models.ForeignKey(StudyRoom, on_delete=models.CASCADE, related_name='day_stats')
+    day = models.DateField()
+    # Copied from the room so past days keep the layout they had
+    floor = models.IntegerField()
+    capacity = models.IntegerField()
+
+    bookings = models.PositiveIntegerField(default=0, help_text="Reservations starting on this day.")
+    open_minutes = models.PositiveIntegerField(help_text="Length of the day's opening hours.")
+    booked_minutes = models.PositiveIntegerField(default=0, help_text="Minutes of the opening hours the room was held.")
+    hourly_minutes = models.JSONField(default=list, help_text="Minutes held in each of the 24 hours.")
+    gap_minutes = models.PositiveIntegerField(default=0, help_text="Idle minutes between the day's first and last booking.")
+    gaps = models.PositiveSmallIntegerField(default=0, help_text="Idle stretches between bookings.")
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['room', 'day'], name='room_day_stats_unique'),
+        ]
+        indexes = [
+            # The dashboard reads a range of days across all rooms
+            models.Index(fields=['day'], name='room_day_stats_day_idx'),
+        ]
+
     def __str__(self):
-        return f"{self.student_name} - {self.room.name} ({self.date})"
\ No newline at end of file
+        return f"{self.room.name} on {self.day}"
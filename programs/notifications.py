@@ -0,0 +1,77 @@
+"""
+Email and SMS messages sent to students. These run as background jobs
+(programs/jobs.py); they raise on delivery errors so the job is retried.
+"""
+import logging
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.utils import timezone
+
+try:
+    from twilio.rest import Client as TwilioClient
+except ImportError:  # twilio is optional; SMS is skipped without it
+    TwilioClient = None
+
+from .jobs import enqueue
+from .models import RoomReservation
+
+logger = logging.getLogger(__name__)
+
+
+def sms_configured():
+    return TwilioClient is not None and all(
+        getattr(settings, name, '') for name in ('TWILIO_ACCOUNT_SID', 'TWILIO_AUTH_TOKEN', 'TWILIO_FROM_NUMBER')
+    )
+
+
+def send_sms(to, body):
+    """ Send ``body`` to the E.164 number ``to``; returns False when SMS is not configured. """
+    if not sms_configured():
+        logger.info("SMS not configured; not texting %s", to)
+        return False
+    client = TwilioClient(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+    client.messages.create(to=to, from_=settings.TWILIO_FROM_NUMBER, body=body)
+    return True
+
+
+def queue_booking_confirmation(reservation):
+    """ Queue the confirmation email and text for a new booking as separate jobs, so each retries on its own. """
+    if reservation.email and '@' in reservation.email:
+        enqueue(email_booking_confirmation, reservation.pk)
+    if reservation.user and reservation.user.phone_number_for_sms:
+        enqueue(text_booking_confirmation, reservation.pk)
+
+
+def _booking_summary(reservation):
+    if reservation.start_at and reservation.end_at:
+        start, end = timezone.localtime(reservation.start_at), timezone.localtime(reservation.end_at)
+        return f"{reservation.room.name}, {start:%a %d %b, %H:%M} to {end:%H:%M}"
+    return f"{reservation.room.name}, {reservation.date} ({reservation.time_slot})"
+
+
+def email_booking_confirmation(reservation_id):
+    reservation = RoomReservation.objects.select_related('room').filter(pk=reservation_id).first()
+    if reservation is None:
+        # Deleted or purged before the job ran
+        return
+    send_mail(
+        subject=f"Accra Business School - {reservation.room.name} reserved",
+        message=(
+            f"Dear {reservation.student_name},\n\n"
+            f"Your study room reservation is confirmed: {_booking_summary(reservation)}.\n"
+            f"Please release the room at the front desk if you leave early.\n\n"
+            f"Accra Business School"
+        ),
+        from_email=None,
+        recipient_list=[reservation.email],
+    )
+
+
+def text_booking_confirmation(reservation_id):
+    reservation = RoomReservation.objects.select_related('room', 'user').filter(pk=reservation_id).first()
+    if reservation is None or reservation.user is None:
+        return
+    phone = reservation.user.phone_number_for_sms
+    if phone:
+        send_sms(phone, f"ABS: {_booking_summary(reservation)} is reserved for you.")
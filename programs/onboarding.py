@@ -0,0 +1,231 @@
+"""
+Bulk student onboarding from a CSV or XLSX intake sheet.
+
+One row per student. Columns (header names are case-insensitive):
+
+    student_id, first_name, last_name  required
+    email, phone_number                optional
+    username                           optional, defaults to the student ID in lower case
+    password                           optional, see below
+
+Every row is checked before anything is written: required values, e-mail
+and phone number format (local numbers are read in
+PHONENUMBER_DEFAULT_REGION and stored as E.164), duplicates inside the file,
+and clashes with existing accounts - one query for usernames and one for
+student IDs and phone numbers, whatever the size of the file. Valid rows are
+then created with profiles.create_users(): a few bulk INSERTs instead of one
+signal-laden save() per student. Invalid rows are reported and skipped.
+
+Passwords: PBKDF2 takes about half a second per hash, so per-row passwords
+are hashed in a process pool by `manage.py import_students`. Rows without one
+get the shared ``default_password`` (hashed once) if given, or an unusable
+password so the student sets their own through password reset.
+
+The admin upload runs inside a web request, so it hashes in-process and
+takes sheets only up to WEB_IMPORT_MAX_ROWS rows and WEB_IMPORT_MAX_PASSWORDS
+own passwords (see web_import_limit); bigger intakes go through the command.
+
+A student ID or username taken by someone else between the checks and the
+INSERT is reported against its row: the batch is checked again and the
+remaining rows are created.
+"""
+import csv
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, connections
+from django.db.models import Q
+from phonenumber_field.phonenumber import PhoneNumber
+
+from .models import StudentProfile
+from .profiles import create_users
+
+COLUMNS = ['student_id', 'first_name', 'last_name', 'email', 'phone_number', 'username', 'password']
+REQUIRED = ['student_id', 'first_name', 'last_name']
+HEADER_ALIASES = {'id': 'student_id', 'phone': 'phone_number', 'first': 'first_name', 'last': 'last_name'}
+# Below this many passwords a process pool costs more than it saves
+POOL_THRESHOLD = 8
+# Largest sheet the admin upload imports within the request
+WEB_IMPORT_MAX_ROWS = 2000
+WEB_IMPORT_MAX_PASSWORDS = 20
+
+
+class ImportFileError(Exception):
+    """ The file cannot be read as an intake sheet at all. """
+
+
+def _header(value):
+    key = str(value or '').strip().lower().replace(' ', '_').replace('-', '_')
+    return HEADER_ALIASES.get(key, key)
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)  # spreadsheet cells turn IDs and phone numbers into floats
+    return str(value).strip()
+
+
+def read_rows(fileobj, filename):
+    """ [(row number, {column: text})] from a CSV or XLSX upload; blank rows are dropped. """
+    if filename.lower().endswith('.xlsx'):
+        from openpyxl import load_workbook
+        try:
+            sheet = load_workbook(fileobj, read_only=True, data_only=True).active
+        except Exception as e:
+            raise ImportFileError(f"Could not open the workbook: {e}")
+        rows = sheet.iter_rows(values_only=True)
+    elif filename.lower().endswith('.csv'):
+        data = fileobj.read()
+        if isinstance(data, bytes):
+            data = data.decode('utf-8-sig')
+        rows = csv.reader(io.StringIO(data))
+    else:
+        raise ImportFileError("Upload a .csv or .xlsx file.")
+
+    header = [_header(cell) for cell in next(rows, [])]
+    missing = [column for column in REQUIRED if column not in header]
+    if missing:
+        raise ImportFileError(f"Missing column(s): {', '.join(missing)}.")
+    records = []
+    for number, row in enumerate(rows, start=2):
+        record = {column: _text(value) for column, value in zip(header, row) if column in COLUMNS}
+        if any(record.values()):
+            records.append((number, record))
+    return records
+
+
+def _phone(raw):
+    region = getattr(settings, 'PHONENUMBER_DEFAULT_REGION', None)
+    try:
+        number = PhoneNumber.from_string(raw, region=region)
+    except Exception:
+        number = None
+    if number is None or not number.is_valid():
+        raise ValidationError(f"'{raw}' is not a valid phone number")
+    return number.as_e164
+
+
+def validate_rows(records):
+    """
+    Split ``records`` into (valid, errors): valid is [(row number, cleaned dict)],
+    errors is [(row number, student ID, message)].
+    """
+    User = get_user_model()
+    cleaned, errors = [], []
+    seen = {'student_id': {}, 'username': {}, 'phone_number': {}}
+    for number, record in records:
+        problems = [f"{column.replace('_', ' ')} is required" for column in REQUIRED if not record.get(column)]
+        row = dict(record)
+        row['username'] = row.get('username') or row.get('student_id', '').lower()
+        if row.get('email'):
+            try:
+                validate_email(row['email'])
+            except ValidationError:
+                problems.append(f"'{row['email']}' is not a valid e-mail address")
+        if row.get('phone_number'):
+            try:
+                row['phone_number'] = _phone(row['phone_number'])
+            except ValidationError as e:
+                problems.append(e.message)
+        for column, rows_with in seen.items():
+            value = row.get(column)
+            if value and value in rows_with:
+                problems.append(f"{column.replace('_', ' ')} {value} repeats row {rows_with[value]}")
+            elif value:
+                rows_with[value] = number
+        if problems:
+            errors.append((number, record.get('student_id', ''), '; '.join(problems)))
+        else:
+            cleaned.append((number, row))
+
+    # Clashes with existing accounts: set-based, one query per table
+    taken_usernames = set(User.objects.filter(username__in=seen['username']).values_list('username', flat=True))
+    taken = StudentProfile.objects.filter(
+        Q(student_id__in=seen['student_id']) | Q(phone_number__in=seen['phone_number'])
+    ).values_list('student_id', 'phone_number')
+    taken_ids = {student_id for student_id, _ in taken}
+    taken_phones = {phone for _, phone in taken}
+    valid = []
+    for number, row in cleaned:
+        problems = []
+        if row['username'] in taken_usernames:
+            problems.append(f"username {row['username']} is already taken")
+        if row['student_id'] in taken_ids:
+            problems.append(f"student ID {row['student_id']} already exists")
+        if row.get('phone_number') and row['phone_number'] in taken_phones:
+            problems.append(f"phone number {row['phone_number']} belongs to another student")
+        if problems:
+            errors.append((number, row['student_id'], '; '.join(problems)))
+        else:
+            valid.append((number, row))
+    errors.sort()
+    return valid, errors
+
+
+def hash_passwords(passwords, workers=None):
+    """ make_password() for each password, across a process pool when there are enough of them. """
+    if len(passwords) < POOL_THRESHOLD or workers == 1:
+        return [make_password(password) for password in passwords]
+    # Workers are forked; they must not share this process's database connections
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=django.setup) as pool:
+        return list(pool.map(make_password, passwords, chunksize=16))
+
+
+def web_import_limit(records):
+    """ Why ``records`` is too big to import inside a web request, or None if it is not. """
+    passwords = sum(1 for _, record in records if record.get('password'))
+    if len(records) > WEB_IMPORT_MAX_ROWS:
+        return f"{len(records)} rows is more than the {WEB_IMPORT_MAX_ROWS} the upload takes"
+    if passwords > WEB_IMPORT_MAX_PASSWORDS:
+        return f"{passwords} rows bring their own password; hashing more than {WEB_IMPORT_MAX_PASSWORDS} would time the page out"
+    return None
+
+
+def import_students(records, default_password=None, workers=None, dry_run=False):
+    """
+    Validate and create the students in ``records`` (see read_rows).
+    Returns (created count, errors); nothing is written when ``dry_run``.
+    """
+    shared = make_password(default_password) if default_password else None
+    hashes = {}
+    for attempt in range(2):
+        valid, errors = validate_rows(records)
+        if dry_run or not valid:
+            return len(valid), errors
+
+        own = [(number, row['password']) for number, row in valid if row.get('password') and number not in hashes]
+        hashes.update(zip([number for number, _ in own], hash_passwords([password for _, password in own], workers)))
+
+        User = get_user_model()
+        users, profiles = [], []
+        for number, row in valid:
+            users.append(User(
+                username=row['username'], first_name=row['first_name'], last_name=row['last_name'],
+                email=row.get('email', ''), phone_number=row.get('phone_number') or None,
+                password=hashes.get(number) or shared or make_password(None),
+            ))
+            profiles.append({'student_id': row['student_id'], 'phone_number': row.get('phone_number') or None})
+        try:
+            create_users(users, profiles)
+            return len(users), errors
+        except IntegrityError as e:
+            # Taken since validate_rows() looked: the next pass reports those rows
+            if attempt:
+                failed = [(number, row['student_id'], f"could not be saved: {e}") for number, row in valid]
+                return 0, sorted(errors + failed)
+
+
+def write_error_report(errors, fileobj):
+    writer = csv.writer(fileobj)
+    writer.writerow(['Row', 'Student ID', 'Problem'])
+    writer.writerows(errors)
@@ -0,0 +1,71 @@
+"""
+Student and staff profile provisioning.
+
+Every user has the profile of their role: a StaffProfile when any of
+CustomUser.ROLE_FIELDS is set, a StudentProfile otherwise. One post_save
+receiver keeps that true:
+
+* a new user gets their profile with a single INSERT;
+* a saved user whose role is unchanged costs nothing - logins only write
+  last_login, and CustomUser remembers the role it was loaded with;
+* a user whose role changed gets the new role's profile with one
+  INSERT ... ON CONFLICT DO NOTHING (no SELECT first). The old profile is
+  kept, with its student or employee ID.
+
+Users created with bulk_create() send no signals; create_users() inserts
+them and their profiles in a fixed number of queries, whatever the count.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import StaffProfile, StudentProfile
+
+PROFILE_MODELS = {'staff': StaffProfile, 'student': StudentProfile}
+
+
+def ensure_profiles(users, profile_fields=None, ignore_conflicts=True):
+    """
+    Create the missing profile of each user's role; one INSERT per role present.
+    ``profile_fields`` optionally gives field values for each user's profile, in order.
+    """
+    by_role = {}
+    for user, fields in zip(users, profile_fields or [{}] * len(users)):
+        by_role.setdefault(user.role, []).append(PROFILE_MODELS[user.role](user_id=user.pk, **fields))
+    for role, profiles in by_role.items():
+        PROFILE_MODELS[role].objects.bulk_create(profiles, batch_size=1000, ignore_conflicts=ignore_conflicts)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def provision_profile(sender, instance, created, update_fields=None, raw=False, **kwargs):
+    if raw:
+        return
+    if not created:
+        if update_fields is not None and not set(update_fields).intersection(sender.ROLE_FIELDS):
+            return
+        if getattr(instance, '_loaded_role', None) == instance.role:
+            return
+    ensure_profiles([instance])
+    instance._loaded_role = instance.role
+
+
+def create_users(users, profile_fields=None, batch_size=1000):
+    """
+    bulk_create ``users`` (unsaved CustomUser objects) together with their
+    profiles, filled in from ``profile_fields`` (see ensure_profiles).
+    """
+    User = get_user_model()
+    with transaction.atomic():
+        created = User.objects.bulk_create(users, batch_size=batch_size)
+        if any(user.pk is None for user in created):
+            # Backends that cannot return ids from a bulk insert
+            ids = dict(User.objects.filter(username__in=[u.username for u in created]).values_list('username', 'pk'))
+            for user in created:
+                user.pk = ids[user.username]
+        # New users cannot have a profile yet, so a conflict (a taken student ID) is a real error
+        ensure_profiles(created, profile_fields, ignore_conflicts=False)
+    for user in created:
+        user._loaded_role = user.role
+    return created
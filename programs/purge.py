@@ -0,0 +1,80 @@
+"""
+Chunked, archiving purge of the RoomReservation log.
+
+Rows are copied to a gzipped CSV and then deleted in primary-key batches,
+each in its own short transaction, with a pause between batches so student
+bookings can take the write lock in between. On a large log that takes far
+longer than a web request may, so the staff "System Purge" button queues it
+for the job worker (programs/jobs.py); `manage.py purge_bookings` runs it
+directly.
+"""
+import csv
+import gzip
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .availability import touch_rooms
+from .models import RoomReservation
+
+PURGE_BATCH_SIZE = 1000
+PURGE_PAUSE = 0.05
+
+ARCHIVE_FIELDS = [
+    'id', 'room_id', 'user_id', 'student_name', 'student_id', 'email', 'phone_number',
+    'date', 'time_slot', 'start_at', 'end_at', 'reserved_at',
+]
+
+
+def archive_dir():
+    path = Path(getattr(settings, 'RESERVATION_ARCHIVE_DIR', settings.BASE_DIR / 'archive'))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def purge_reservations(before=None, batch_size=PURGE_BATCH_SIZE, pause=PURGE_PAUSE, up_to=None):
+    """
+    Archive then delete reservations (all of them, or those dated before ``before``).
+
+    Only rows that existed when the purge started (or with ids up to ``up_to``,
+    when queued) are touched; bookings made since are left alone. Returns
+    (deleted_count, archive_path), with archive_path None when there was
+    nothing to purge.
+    """
+    qs = RoomReservation.objects.all()
+    if before is not None:
+        qs = qs.filter(date__lt=before)
+    if up_to is not None:
+        qs = qs.filter(id__lte=up_to)
+
+    ceiling = qs.order_by('-id').values_list('id', flat=True).first()
+    if ceiling is None:
+        return 0, None
+    qs = qs.filter(id__lte=ceiling)
+
+    path = archive_dir() / f"reservations-{timezone.localtime():%Y%m%d-%H%M%S}.csv.gz"
+    deleted = 0
+    last_id = 0
+    with gzip.open(path, 'wt', newline='') as fh:
+        writer = csv.writer(fh)
+        writer.writerow(ARCHIVE_FIELDS)
+        while True:
+            rows = list(qs.filter(id__gt=last_id).order_by('id').values_list(*ARCHIVE_FIELDS)[:batch_size])
+            if not rows:
+                break
+            writer.writerows(rows)
+            # Make sure the batch is on disk before it disappears from the database
+            fh.flush()
+
+            first_id, last_id = rows[0][0], rows[-1][0]
+            with transaction.atomic():
+                count, _ = qs.filter(id__gte=first_id, id__lte=last_id).delete()
+            deleted += count
+            if pause:
+                time.sleep(pause)
+
+    touch_rooms()
+    return deleted, path
@@ -0,0 +1,140 @@
+"""
+Printable PDF receipts for room reservations and course registrations.
+
+Rendering through xhtml2pdf is the slow part, so every PDF is stored once
+under ``receipts/<kind>/<hash>.pdf`` in default storage, where the hash
+covers every value printed on the receipt plus the receipt template itself.
+Asking again for an unchanged record is a storage lookup; editing the record
+(or the template) produces a new hash and a fresh PDF.
+
+The `build_receipts` command renders a date range in a process pool and
+bundles the PDFs into one zip file.
+"""
+import hashlib
+import json
+from functools import lru_cache
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+from django.template.loader import get_template
+from django.utils import timezone
+from xhtml2pdf import pisa
+
+from .models import CourseRegistration, RoomReservation
+
+
+class ReceiptError(Exception):
+    pass
+
+
+def _when(value):
+    return timezone.localtime(value).strftime('%d %b %Y, %H:%M') if value else ''
+
+
+def reservation_context(reservation):
+    return {
+        'number': f"RR-{reservation.pk:06d}",
+        'title': "Study Room Reservation",
+        'name': reservation.student_name,
+        'rows': [
+            ("Student ID", reservation.student_id or '-'),
+            ("Email", reservation.email or '-'),
+            ("Phone", reservation.phone_number or '-'),
+            ("Room", reservation.room.name),
+            ("Arrival", _when(reservation.start_at) or str(reservation.date)),
+            ("Departure", _when(reservation.end_at) or reservation.time_slot),
+            ("Booked on", _when(reservation.reserved_at)),
+        ],
+        'note': "Please keep to your arrival and departure times.",
+    }
+
+
+def registration_context(registration):
+    return {
+        'number': f"CR-{registration.pk:06d}",
+        'title': "Course Registration",
+        'name': registration.full_name,
+        'rows': [
+            ("Programme", registration.program.title),
+            ("Registration type", registration.get_registration_type_display()),
+            ("Month of study", registration.study_month.title()),
+            ("Email", registration.email),
+            ("Phone / ID", registration.phone_number),
+            ("Submitted", _when(registration.submitted_at)),
+            ("Payment proof (SHA-256)", registration.payment_checksum or "Being processed"),
+        ],
+        'note': "Registration remains pending until payment has been validated by the finance office.",
+    }
+
+
+KINDS = {
+    'reservation': (RoomReservation, ('room',), 'reserved_at', reservation_context),
+    'registration': (CourseRegistration, ('program',), 'submitted_at', registration_context),
+}
+
+TEMPLATE_NAME = 'programs/receipt.html'
+
+
+@lru_cache(maxsize=None)
+def _template():
+    # Compiled once per process; every receipt is just a render of this template
+    template = get_template(TEMPLATE_NAME)
+    source = template.template.source.encode()
+    return template, hashlib.sha256(source).hexdigest()[:12]
+
+
+def content_hash(context):
+    _, template_version = _template()
+    payload = json.dumps([template_version, context], sort_keys=True, default=str).encode()
+    return hashlib.sha256(payload).hexdigest()
+
+
+def storage_name(kind, context):
+    return f"receipts/{kind}/{content_hash(context)}.pdf"
+
+
+def render_pdf(context):
+    template, _ = _template()
+    html = template.render({**context, 'generated_at': timezone.localtime()})
+    out = BytesIO()
+    result = pisa.CreatePDF(html, dest=out, encoding='utf-8')
+    if result.err:
+        raise ReceiptError(f"Could not render receipt {context['number']}.")
+    return out.getvalue()
+
+
+def receipt_for(kind, record):
+    """ (filename, PDF bytes) for ``record``, rendering only if this exact content is not stored yet. """
+    context = KINDS[kind][3](record)
+    name = storage_name(kind, context)
+    if default_storage.exists(name):
+        with default_storage.open(name, 'rb') as fh:
+            data = fh.read()
+    else:
+        data = render_pdf(context)
+        default_storage.save(name, ContentFile(data))
+    return f"{context['number']}.pdf", data
+
+
+# --- BATCHES ---
+
+def records_between(kind, start, end):
+    """ Ids of ``kind`` records created in [start, end), oldest first. """
+    model, _, date_field, _ = KINDS[kind]
+    return list(
+        model.objects.filter(**{f'{date_field}__gte': start, f'{date_field}__lt': end})
+        .order_by(date_field, 'pk').values_list('pk', flat=True)
+    )
+
+
+def render_batch(kind, ids):
+    """ [(filename, PDF bytes)] for the given records; runs in a worker process. """
+    close_old_connections()
+    model, related, _, _ = KINDS[kind]
+    records = model.objects.select_related(*related).filter(pk__in=ids).order_by('pk')
+    try:
+        return [receipt_for(kind, record) for record in records]
+    finally:
+        close_old_connections()
@@ -0,0 +1,170 @@
+"""
+Course registration submissions.
+
+The payment proof is streamed to a temporary file by PaymentProofUploadHandler
+in 64 KiB chunks, so an upload never sits in memory whatever its size; it is
+rejected while streaming once it passes PAYMENT_PROOF_MAX_SIZE or if its
+first bytes are not a JPEG, PNG or PDF. Saving the registration moves that
+temporary file into MEDIA_ROOT.
+
+Everything slower than that (checksum, preview image, confirmation email) runs
+in process_registration as a background job (programs/jobs.py).
+"""
+import hashlib
+import logging
+import os
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.uploadhandler import SkipFile, TemporaryFileUploadHandler
+from django.core.mail import send_mail
+from django.template.defaultfilters import filesizeformat
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .jobs import enqueue
+from .models import CourseRegistration
+
+logger = logging.getLogger(__name__)
+
+PAYMENT_PROOF_FIELD = 'payment_file'
+PAYMENT_PROOF_TYPES = {
+    'jpeg': (b'\xff\xd8\xff', {'.jpg', '.jpeg'}),
+    'png': (b'\x89PNG\r\n\x1a\n', {'.png'}),
+    'pdf': (b'%PDF-', {'.pdf'}),
+}
+# Multipart headers and the text fields of the form on top of the file itself
+FORM_OVERHEAD = 64 * 1024
+PREVIEW_WIDTH = 480
+
+
+def max_proof_size():
+    return getattr(settings, 'PAYMENT_PROOF_MAX_SIZE', 2 * 1024 * 1024)
+
+
+class PaymentProofUploadHandler(TemporaryFileUploadHandler):
+    """
+    Streams the payment proof to disk and enforces the size and type limits
+    as the chunks arrive. Rejected files are skipped (the rest of the part is
+    read and discarded); the reason is left in ``error`` for the view.
+    """
+    chunk_size = 64 * 1024
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.error = None
+        self.max_size = max_proof_size()
+        self.request_too_large = False
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # A request this big cannot hold an acceptable file; don't write any of it to disk
+        self.request_too_large = content_length > self.max_size + FORM_OVERHEAD
+
+    def new_file(self, field_name, file_name, *args, **kwargs):
+        if field_name != PAYMENT_PROOF_FIELD:
+            raise SkipFile()
+        if self.request_too_large:
+            self._reject(f"The payment proof must be {filesizeformat(self.max_size)} or smaller.")
+        extension = os.path.splitext(file_name)[1].lower()
+        if not any(extension in extensions for _, extensions in PAYMENT_PROOF_TYPES.values()):
+            self._reject("Upload the payment proof as a JPG, PNG or PDF file.")
+        super().new_file(field_name, file_name, *args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        if start == 0 and not any(raw_data.startswith(magic) for magic, _ in PAYMENT_PROOF_TYPES.values()):
+            self._reject("The payment proof is not a valid JPG, PNG or PDF file.")
+        if start + len(raw_data) > self.max_size:
+            self._reject(f"The payment proof must be {filesizeformat(self.max_size)} or smaller.")
+        return super().receive_data_chunk(raw_data, start)
+
+    def _reject(self, message):
+        self.error = message
+        raise SkipFile()
+
+
+def proof_kind(fieldfile):
+    """ 'jpeg', 'png', 'pdf' or None, from the stored file's leading bytes. """
+    with fieldfile.open('rb') as fh:
+        head = fh.read(16)
+    for kind, (magic, _) in PAYMENT_PROOF_TYPES.items():
+        if head.startswith(magic):
+            return kind
+    return None
+
+
+# --- BACKGROUND PROCESSING ---
+
+def schedule_processing(registration):
+    """ Queue process_registration; the job row commits (or rolls back) with the registration. """
+    return enqueue(process_registration, registration.pk)
+
+
+def file_checksum(fieldfile):
+    digest = hashlib.sha256()
+    with fieldfile.open('rb'):
+        for chunk in fieldfile.chunks():
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_preview(fieldfile):
+    """ A small JPEG of an image proof, or None for PDFs and unreadable files. """
+    if proof_kind(fieldfile) not in ('jpeg', 'png'):
+        return None
+    with fieldfile.open('rb') as fh, Image.open(fh) as image:
+        image.draft('RGB', (PREVIEW_WIDTH, PREVIEW_WIDTH))
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        image.thumbnail((PREVIEW_WIDTH, PREVIEW_WIDTH * 2))
+        out = BytesIO()
+        image.save(out, format='JPEG', quality=75)
+    return ContentFile(out.getvalue(), name=f"{PurePosixPath(fieldfile.name).stem}.jpg")
+
+
+def send_confirmation(registration):
+    send_mail(
+        subject="Accra Business School - Course Registration Received",
+        message=(
+            f"Dear {registration.full_name},\n\n"
+            f"We have received your {registration.get_registration_type_display().lower()} registration "
+            f"for {registration.program.title} ({registration.study_month.title()} intake).\n"
+            f"Your registration stays pending until the finance office has validated your payment.\n\n"
+            f"Accra Business School"
+        ),
+        from_email=None,
+        recipient_list=[registration.email],
+    )
+
+
+def process_registration(pk):
+    """ Checksum, preview and confirmation email for a saved registration; safe to re-run. """
+    registration = CourseRegistration.objects.select_related('program').get(pk=pk)
+    proof = registration.payment_proof
+
+    if proof and not registration.payment_checksum:
+        registration.payment_checksum = file_checksum(proof)
+    if proof and not registration.payment_preview:
+        try:
+            preview = build_preview(proof)
+        except OSError:
+            logger.warning("Could not build a preview for %s", proof.name, exc_info=True)
+            preview = None
+        if preview:
+            registration.payment_preview.save(preview.name, preview, save=False)
+
+    mail_error = None
+    if not registration.confirmation_sent_at:
+        try:
+            send_confirmation(registration)
+        except OSError as exc:
+            mail_error = exc
+        else:
+            registration.confirmation_sent_at = timezone.now()
+
+    registration.processed_at = timezone.now()
+    registration.save(update_fields=['payment_checksum', 'payment_preview', 'confirmation_sent_at', 'processed_at'])
+    if mail_error:
+        # Checksum and preview are kept; the job retries just the email
+        raise mail_error
+    return registration
@@ -0,0 +1,74 @@
+"""
+The release clock: tells the room grids when rooms change state by themselves.
+
+Availability is computed from reservation windows, so a room becomes free on
+its own once a reservation's departure time plus the grace period
+(settings.ROOM_RELEASE_GRACE) has passed, and becomes occupied when a booking
+starts. Nothing is written at those moments, though, so without this clock the
+room state version and the pushed events only move when somebody books or
+clicks, and open dashboards keep showing a lapsed booking.
+
+`manage.py release_rooms` keeps a cursor and, on each tick, sweeps the
+reservations whose start or release time fell in (cursor, now] - two index
+range scans (date/start_at and end_at) whose cost depends on how many
+bookings changed state, not on how many exist. It then sleeps until the next
+start or release, capped by the poll interval so bookings made in the
+meantime are not missed for long.
+"""
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import Min
+from django.utils import timezone
+
+from .availability import release_grace, touch_rooms
+from .models import RoomReservation
+
+CURSOR_KEY = 'rooms:release_cursor'
+# A restarted clock catches up on at most this much missed time
+MAX_CATCH_UP = timedelta(hours=1)
+
+
+def _starting(since, until):
+    # RoomReservation.date is the local arrival day; it narrows the scan to a few days of the date index
+    return RoomReservation.objects.filter(
+        date__gte=timezone.localdate(since) - timedelta(days=1), date__lte=timezone.localdate(until),
+        start_at__gt=since, start_at__lte=until,
+    )
+
+
+def rooms_changing(since, until):
+    """ Ids of rooms where a booking started or was released in (since, until]. """
+    grace = release_grace()
+    released = RoomReservation.objects.filter(end_at__gt=since - grace, end_at__lte=until - grace)
+    started = _starting(since, until)
+    return set(released.values_list('room_id', flat=True).union(started.values_list('room_id', flat=True)))
+
+
+def next_change(after):
+    """ When the next booking starts or is released after ``after``, or None. """
+    grace = release_grace()
+    next_end = RoomReservation.objects.filter(end_at__gt=after - grace).aggregate(at=Min('end_at'))['at']
+    next_start = (
+        RoomReservation.objects.filter(date__gte=timezone.localdate(after) - timedelta(days=1), start_at__gt=after)
+        .aggregate(at=Min('start_at'))['at']
+    )
+    moments = [m for m in (next_end and next_end + grace, next_start) if m is not None]
+    return min(moments, default=None)
+
+
+def release_due(now=None):
+    """
+    Announce every start and release since the last sweep (bumping the room
+    state version and pushing the rooms to open grids) and return their room ids.
+    """
+    now = now or timezone.now()
+    since = cache.get(CURSOR_KEY)
+    if since is None or since > now:
+        since = now
+    since = max(since, now - MAX_CATCH_UP)
+    room_ids = rooms_changing(since, now)
+    if room_ids:
+        touch_rooms(*sorted(room_ids))
+    cache.set(CURSOR_KEY, now, timeout=None)
+    return room_ids
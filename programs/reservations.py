@@ -0,0 +1,141 @@
+"""
+Query helpers for the RoomReservation log.
+
+The staff log and anything that reads it in bulk (exports, reports) share
+the same filter parsing so that what staff see on screen is exactly what
+they get out of the system.
+"""
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import RoomReservation, StudyRoom
+
+LOG_PAGE_SIZE = 50
+# The log header counts matches up to this many; past it, counting would scan the whole log
+LOG_COUNT_LIMIT = 1000
+
+# Query-string keys understood by filter_reservations()
+FILTER_KEYS = ('q', 'name', 'student_id', 'email', 'room', 'date_from', 'date_to')
+
+
+def filter_date(params, key):
+    """ The date in ``params[key]``, or None when it is missing or not a real day (e.g. 2024-02-30). """
+    try:
+        return parse_date((params.get(key) or '').strip())
+    except ValueError:
+        return None
+
+
+def filter_reservations(params, queryset=None):
+    """ Apply the staff log filters found in ``params`` (usually request.GET). """
+    qs = queryset if queryset is not None else RoomReservation.objects.all()
+    qs = qs.select_related('room')
+
+    q = (params.get('q') or '').strip()
+    if q:
+        # Every branch is a lookup on this table that the case-insensitive
+        # indexes of migration 0016 can serve, so the OR stays indexed
+        qs = qs.filter(
+            Q(student_name__istartswith=q)
+            | Q(student_id__iexact=q)
+            | Q(email__iexact=q)
+            | Q(room_id__in=StudyRoom.objects.filter(name__iexact=q).values('pk'))
+        )
+
+    name = (params.get('name') or '').strip()
+    if name:
+        qs = qs.filter(student_name__istartswith=name)
+
+    student_id = (params.get('student_id') or '').strip()
+    if student_id:
+        qs = qs.filter(student_id=student_id)
+
+    email = (params.get('email') or '').strip()
+    if email:
+        qs = qs.filter(email=email)
+
+    room = (params.get('room') or '').strip()
+    if room.isdigit():
+        qs = qs.filter(room_id=int(room))
+
+    date_from = filter_date(params, 'date_from')
+    if date_from:
+        qs = qs.filter(date__gte=date_from)
+
+    date_to = filter_date(params, 'date_to')
+    if date_to:
+        qs = qs.filter(date__lte=date_to)
+
+    return qs
+
+
+def count_matches(queryset, limit=LOG_COUNT_LIMIT):
+    """ How many rows ``queryset`` has, counting no further than ``limit`` + 1. """
+    return queryset.order_by()[:limit + 1].count()
+
+
+def active_filters(params):
+    """ The subset of ``params`` that filter_reservations() acts on. """
+    return {key: params.get(key) for key in FILTER_KEYS if params.get(key)}
+
+
+# --- KEYSET (CURSOR) PAGINATION ---
+
+def encode_cursor(booking):
+    raw = f"{booking.reserved_at.isoformat()}|{booking.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """ Returns (reserved_at, id) or None when the cursor is missing or tampered with. """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        stamp, pk = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        reserved_at = parse_datetime(stamp)
+        if not isinstance(reserved_at, datetime):
+            return None
+        return reserved_at, int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def paginate_log(queryset, after=None, before=None, page_size=LOG_PAGE_SIZE):
+    """
+    Newest-first keyset pagination on (reserved_at, id).
+
+    Each page is a single indexed range scan of ``page_size + 1`` rows, so the
+    cost of page 500 is the same as page 1. Returns a dict with the rows and
+    the cursors for the neighbouring pages (None when there is no such page).
+    """
+    after_key = decode_cursor(after)
+    before_key = decode_cursor(before)
+
+    if before_key and not after_key:
+        stamp, pk = before_key
+        qs = queryset.filter(
+            Q(reserved_at__gt=stamp) | Q(reserved_at=stamp, id__gt=pk)
+        ).order_by('reserved_at', 'id')
+        rows = list(qs[:page_size + 1])
+        has_newer = len(rows) > page_size
+        rows = list(reversed(rows[:page_size]))
+        has_older = True
+    else:
+        qs = queryset
+        if after_key:
+            stamp, pk = after_key
+            qs = qs.filter(Q(reserved_at__lt=stamp) | Q(reserved_at=stamp, id__lt=pk))
+        rows = list(qs.order_by('-reserved_at', '-id')[:page_size + 1])
+        has_older = len(rows) > page_size
+        rows = rows[:page_size]
+        has_newer = after_key is not None
+
+    return {
+        'rows': rows,
+        'next_cursor': encode_cursor(rows[-1]) if rows and has_older else None,
+        'prev_cursor': encode_cursor(rows[0]) if rows and has_newer else None,
+    }
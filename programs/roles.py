@@ -0,0 +1,122 @@
+"""
+Portal roles for the auth decorators.
+
+Where a signed-in user belongs - 'superuser', 'staff', 'student' or 'none' -
+decides where role_based_redirect() sends them and what abs_staff_required
+and student_required let through. Working it out takes the user row and a
+profile lookup, so it is resolved once, at login, and kept in the session
+together with the user's profile IDs. After that the decorators read the
+session and nothing else: a request that passes them without touching
+request.user costs the session query only (none without a session cookie).
+
+The stored role carries a per-user version kept in the cache, which must be
+shared between worker processes (see CACHES). Saving the user, other than
+the last_login write at login, creating or deleting one of their profiles,
+or deleting the user replaces that version once the change has committed -
+a request resolving before then would read the old row and store the old
+role under the new version. Each of their sessions then resolves again on
+its next request, loading the user - which also re-checks is_active and the
+session's password hash. QuerySet.update() sends no
+signals, so code changing role fields in bulk calls invalidate_role().
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY, get_user_model
+from django.contrib.auth.signals import user_logged_in
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import StaffProfile, StudentProfile
+
+ROLE_SESSION_KEY = '_portal_role'
+ROLE_VERSION_KEY = 'roles:user:{}'
+
+PORTALS = {
+    'superuser': 'admin:index',
+    'staff': 'programs:staff_room_bookings',
+    'student': 'programs:study_room_reservation',
+    'none': 'programs:program_list',
+}
+
+
+def role_version(user_id):
+    """ Unix time of the last change to ``user_id``'s role (seeded with "now" if unknown). """
+    key = ROLE_VERSION_KEY.format(user_id)
+    cache.add(key, time.time(), timeout=None)
+    return cache.get(key)
+
+
+def invalidate_role(*user_ids):
+    """ Make every session of ``user_ids`` resolve its role again. Call it after the change has committed. """
+    now = time.time()
+    cache.set_many({ROLE_VERSION_KEY.format(user_id): now for user_id in user_ids}, timeout=None)
+
+
+def resolve_role(user):
+    """ The session entry for ``user``: their portal role and profile IDs, in one query. """
+    student_profile, staff_profile = get_user_model().objects.filter(pk=user.pk).values_list(
+        'student_profile__id', 'staff_profile__id',
+    ).first() or (None, None)
+    if user.is_superuser:
+        name = 'superuser'
+    elif user.is_staff:
+        name = 'staff'
+    elif student_profile:
+        name = 'student'
+    else:
+        name = 'none'
+    return {
+        'user': user._meta.pk.value_to_string(user),
+        'name': name,
+        'student_profile': student_profile,
+        'staff_profile': staff_profile,
+        'version': role_version(user.pk),
+    }
+
+
+def get_role(request):
+    """ The role entry of the signed-in user (see resolve_role), or None for anonymous requests. """
+    if hasattr(request, '_portal_role'):
+        return request._portal_role
+    role = None
+    user_id = request.session.get(SESSION_KEY)
+    if user_id is not None:
+        role = request.session.get(ROLE_SESSION_KEY)
+        if not role or role['user'] != user_id or role['version'] != cache.get(ROLE_VERSION_KEY.format(user_id)):
+            role = None
+            if request.user.is_authenticated:
+                role = request.session[ROLE_SESSION_KEY] = resolve_role(request.user)
+    request._portal_role = role
+    return role
+
+
+@receiver(user_logged_in)
+def remember_role(sender, request, user, **kwargs):
+    if request is not None and hasattr(request, 'session'):
+        request._portal_role = request.session[ROLE_SESSION_KEY] = resolve_role(user)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_changed(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields is not None and set(update_fields) == {'last_login'}):
+        return
+    transaction.on_commit(lambda: invalidate_role(instance.pk))
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def user_deleted(sender, instance, **kwargs):
+    user_id = instance.pk
+    transaction.on_commit(lambda: invalidate_role(user_id))
+
+
+@receiver(post_save, sender=StudentProfile)
+@receiver(post_save, sender=StaffProfile)
+@receiver(post_delete, sender=StudentProfile)
+@receiver(post_delete, sender=StaffProfile)
+def profile_changed(sender, instance, created=True, **kwargs):
+    # Only a new or deleted profile changes the role; edits keep its ID
+    if created:
+        transaction.on_commit(lambda: invalidate_role(instance.user_id))
@@ -0,0 +1,55 @@
+"""
+Database routing for an optional read replica.
+
+With DATABASE_REPLICA_URL set (config/settings.py), reads of the public
+catalogue - Program, Category and GoverningCouncil - go to the 'replica'
+alias. Those pages are read-mostly and served from the catalogue cache, so a
+replica a moment behind costs little. Everything else (reservations,
+registrations, accounts, jobs) and every write stays on 'default', as do
+reads inside a transaction on 'default' - admin edits and form validation
+see their own writes. Migrations only run on 'default'; the replica gets its
+schema by replication.
+
+Code that must read the catalogue as just written wraps it in
+primary_reads().
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA = 'replica'
+CATALOGUE_MODELS = {'programs.program', 'programs.category', 'programs.governingcouncil'}
+
+_primary_reads = ContextVar('primary_reads', default=False)
+
+
+@contextmanager
+def primary_reads():
+    """ Send catalogue reads in this block to 'default' too. """
+    token = _primary_reads.set(True)
+    try:
+        yield
+    finally:
+        _primary_reads.reset(token)
+
+
+class CatalogueReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if (model._meta.label_lower in CATALOGUE_MODELS
+                and REPLICA in settings.DATABASES
+                and not _primary_reads.get()
+                and not connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return REPLICA
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same rows
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
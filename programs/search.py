@@ -0,0 +1,189 @@
+"""
+Ranked full-text search over the programme catalogue.
+
+The index lives in a shadow table next to programs_program:
+
+* SQLite: an FTS5 virtual table, ``programs_program_fts``, ranked with bm25().
+* PostgreSQL: ``programs_program_search`` holding a tsvector per programme
+  behind a GIN index, ranked with ts_rank().
+
+Rows whose programme no longer exists are harmless: every search joins back
+to programs_program.
+
+Both are created by migration 0018 and kept in sync from Program post_save /
+post_delete (and Category post_save, since the category name is indexed).
+On any other backend, or if the index table is missing, search falls back to
+unranked icontains matching.
+"""
+import re
+
+from django.core.paginator import Paginator
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Category, Program
+
+PROGRAMS_PAGE_SIZE = 12
+
+FTS_TABLE = 'programs_program_fts'
+TSV_TABLE = 'programs_program_search'
+
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+def _terms(query):
+    return TOKEN_PATTERN.findall((query or '').lower())[:10]
+
+
+_backends = {}
+
+
+def _backend():
+    """ 'fts5', 'tsvector' or None; looked up once per database. """
+    key = (connection.vendor, str(connection.settings_dict['NAME']))
+    if key not in _backends:
+        tables = connection.introspection.table_names()
+        if connection.vendor == 'sqlite' and FTS_TABLE in tables:
+            _backends[key] = 'fts5'
+        elif connection.vendor == 'postgresql' and TSV_TABLE in tables:
+            _backends[key] = 'tsvector'
+        else:
+            _backends[key] = None
+    return _backends[key]
+
+
+def _document(program):
+    return {
+        'title': program.title,
+        'summary': program.summary,
+        'description': program.description,
+        'category': program.category.name,
+        'level': f"{program.level} {program.get_level_display()}",
+    }
+
+
+# --- INDEX MAINTENANCE ---
+
+def index_programs(programs):
+    backend = _backend()
+    if backend is None:
+        return
+    with connection.cursor() as cursor:
+        for program in programs:
+            doc = _document(program)
+            if backend == 'fts5':
+                cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [program.pk])
+                cursor.execute(
+                    f"INSERT INTO {FTS_TABLE} (rowid, title, summary, description, category, level) "
+                    f"VALUES (%s, %s, %s, %s, %s, %s)",
+                    [program.pk, doc['title'], doc['summary'], doc['description'], doc['category'], doc['level']],
+                )
+            else:
+                cursor.execute(
+                    f"INSERT INTO {TSV_TABLE} (program_id, document) VALUES (%s, "
+                    f"setweight(to_tsvector('english', %s), 'A') || setweight(to_tsvector('english', %s), 'B') || "
+                    f"setweight(to_tsvector('english', %s), 'B') || setweight(to_tsvector('english', %s), 'C') || "
+                    f"to_tsvector('english', %s)) "
+                    f"ON CONFLICT (program_id) DO UPDATE SET document = EXCLUDED.document",
+                    [program.pk, doc['title'], doc['category'], doc['level'], doc['summary'], doc['description']],
+                )
+
+
+def unindex_program(pk):
+    backend = _backend()
+    if backend is None:
+        return
+    with connection.cursor() as cursor:
+        if backend == 'fts5':
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [pk])
+        else:
+            cursor.execute(f"DELETE FROM {TSV_TABLE} WHERE program_id = %s", [pk])
+
+
+def rebuild_index():
+    with transaction.atomic():
+        index_programs(Program.objects.select_related('category').iterator())
+
+
+@receiver(post_save, sender=Program)
+def index_saved_program(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_programs([instance])
+
+
+@receiver(post_delete, sender=Program)
+def unindex_deleted_program(sender, instance, **kwargs):
+    unindex_program(instance.pk)
+
+
+@receiver(post_save, sender=Category)
+def reindex_category_programs(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        index_programs(instance.programs.select_related('category'))
+
+
+# --- QUERYING ---
+
+def _ranked_ids(terms, level=None):
+    """ Ids of active programmes matching every term (prefix match), best first. """
+    program_table = Program._meta.db_table
+    params = []
+    level_sql = ''
+    if level:
+        level_sql = ' AND p.level = %s'
+    with connection.cursor() as cursor:
+        if _backend() == 'fts5':
+            params.append(' AND '.join(f'"{term}"*' for term in terms))
+            if level:
+                params.append(level)
+            # Column weights follow the table order: title, summary, description, category, level
+            cursor.execute(
+                f"SELECT f.rowid FROM {FTS_TABLE} f JOIN {program_table} p ON p.id = f.rowid "
+                f"WHERE {FTS_TABLE} MATCH %s AND p.is_active{level_sql} "
+                f"ORDER BY bm25({FTS_TABLE}, 10.0, 4.0, 1.0, 4.0, 4.0)",
+                params,
+            )
+        else:
+            params.append(' & '.join(f'{term}:*' for term in terms))
+            if level:
+                params.append(level)
+            cursor.execute(
+                f"SELECT s.program_id FROM {TSV_TABLE} s JOIN {program_table} p ON p.id = s.program_id, "
+                f"to_tsquery('english', %s) query "
+                f"WHERE s.document @@ query AND p.is_active{level_sql} "
+                f"ORDER BY ts_rank(s.document, query) DESC",
+                params,
+            )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def search_programs(query='', level=None, page=1, per_page=PROGRAMS_PAGE_SIZE):
+    """
+    One page of active programmes matching ``query`` (and ``level``), best
+    match first; without a query the catalogue is listed by title.
+    Returns a django.core.paginator.Page.
+    """
+    programs = Program.objects.filter(is_active=True).select_related('category')
+    if level:
+        programs = programs.filter(level=level)
+
+    terms = _terms(query)
+    if not terms:
+        return Paginator(programs.order_by('title'), per_page).get_page(page)
+
+    if _backend() is None:
+        match = Q()
+        for term in terms:
+            match &= (
+                Q(title__icontains=term) | Q(summary__icontains=term) | Q(description__icontains=term)
+                | Q(category__name__icontains=term) | Q(level__icontains=term)
+            )
+        return Paginator(programs.filter(match).order_by('title'), per_page).get_page(page)
+
+    # Rank ids only, then load just the programmes on the requested page
+    result = Paginator(_ranked_ids(terms, level), per_page).get_page(page)
+    found = programs.in_bulk(result.object_list)
+    result.object_list = [found[pk] for pk in result.object_list if pk in found]
+    return result
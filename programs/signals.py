@@ -1,18 +0,0 @@
-from django.db.models.signals import post_save
-from django.dispatch import receiver
-from django.contrib.auth import get_user_model
-from .models import StudentProfile
-
-User = get_user_model()
-
-@receiver(post_save, sender=User)
-def create_student_profile(sender, instance, created, **kwargs):
-    if created:
-        # Automatically create a profile when a new user is registered
-        StudentProfile.objects.get_or_create(user=instance)
-
-@receiver(post_save, sender=User)
-def save_student_profile(sender, instance, **kwargs):
-    # Ensure the profile is saved whenever the user is saved
-    if hasattr(instance, 'student_profile'):
-        instance.student_profile.save()
\ No newline at end of file
@@ -0,0 +1,82 @@
+"""
+Concurrent-write tuning for SQLite deployments, and retries for write paths.
+
+SQLite lets one connection write at a time. With the default rollback
+journal, readers and the writer block each other, and a transaction that
+reads first and writes later cannot wait for the write lock: it fails at
+once with "database is locked". SQLITE_TUNING (config/settings.py) sets up
+each new connection for several workers sharing db.sqlite3:
+
+* journal_mode=WAL - readers no longer block the writer or each other;
+* busy_timeout - a connection waits up to SQLITE_BUSY_TIMEOUT ms for the
+  write lock instead of failing, which turns the lock into a writers' queue;
+* BEGIN IMMEDIATE transactions - atomic() blocks take the write lock up front,
+  so they queue on busy_timeout instead of deadlocking on a lock upgrade;
+* synchronous=NORMAL - safe with WAL; commits stop waiting for an fsync;
+* mmap_size - reads go through SQLITE_MMAP_SIZE bytes of memory-mapped I/O.
+
+write_transaction() covers what is left: it runs a write path in its own
+transaction and retries it, with jittered backoff, when the database still
+reports a lock (a busy_timeout ran out, or a PostgreSQL lock timeout or
+deadlock). `manage.py benchmark_bookings` measures booking throughput with
+and without the tuning.
+"""
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+# Backoff before the first retry, in seconds; doubled for each one after it
+RETRY_DELAY = 0.05
+RETRY_MAX_DELAY = 1.0
+
+
+@receiver(connection_created)
+def tune_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite' or not settings.SQLITE_TUNING:
+        return
+    connection.transaction_mode = 'IMMEDIATE'
+    # Straight on the sqlite3 connection, so query logging and budgets never see them
+    for pragma in (
+        'journal_mode=WAL',
+        f'busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT)}',
+        'synchronous=NORMAL',
+        f'mmap_size={int(settings.SQLITE_MMAP_SIZE)}',
+    ):
+        connection.connection.execute(f'PRAGMA {pragma}')
+
+
+def is_lock_error(error):
+    """ True for "database is locked"/"table is locked", lock timeouts and deadlocks. """
+    message = str(error).lower()
+    return isinstance(error, OperationalError) and ('lock' in message or 'busy' in message)
+
+
+def write_transaction(func=None, *, attempts=None):
+    """
+    Decorator: run ``func`` in transaction.atomic() and retry it, up to
+    ``attempts`` times (default settings.WRITE_RETRIES), while it fails on a
+    lock. Inside an outer transaction it is a plain call: the outer
+    transaction is what commits, rolls back or could be retried.
+    """
+    def decorator(func):
+        @wraps(func)
+        def _wrapped(*args, **kwargs):
+            if transaction.get_connection().in_atomic_block:
+                return func(*args, **kwargs)
+            tries = attempts or settings.WRITE_RETRIES
+            for attempt in range(tries):
+                try:
+                    with transaction.atomic():
+                        return func(*args, **kwargs)
+                except OperationalError as e:
+                    if attempt == tries - 1 or not is_lock_error(e):
+                        raise
+                    delay = min(RETRY_DELAY * 2 ** attempt, RETRY_MAX_DELAY)
+                    time.sleep(delay * random.uniform(0.5, 1.5))
+        return _wrapped
+    return decorator(func) if func is not None else decorator
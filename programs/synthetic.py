@@ -0,0 +1,254 @@
+"""
+Synthetic data at production scale, for measuring performance work locally.
+
+Everything is generated from one seeded random.Random, so the same options
+always give the same dataset, and written with chunked bulk_create (no
+per-row save(), signals or password hashing). Generated rows are marked so
+they can be removed again (see SyntheticData.clear):
+
+* categories and programmes have slugs starting with ``seed-``;
+* rooms are named ``Seed <floor>-<n>``;
+* students are users named ``seed.student<n>`` (profile included);
+* reservations belong to seeded rooms and registrations to seeded programmes.
+
+Reservations are laid out room by room, day by day, inside opening hours and
+without overlaps, ending a week in the future. Their ``time_slot`` labels
+follow the formats found in real data: the current booking view's
+"HH:MM TO HH:MM", the old fixed slots ("09:00-11:00"), the staff form's
+"YYYY-MM-DD HH:MM TO ..." and a few unusable "N/A TO N/A" rows. Rows whose
+label the window backfill could not parse have no start_at/end_at, as in
+production.
+"""
+import hashlib
+import itertools
+import random
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Category, CourseRegistration, Program, RoomReservation, StudentProfile, StudyRoom
+
+SEED_SLUG = 'seed-'
+SEED_ROOM = 'Seed '
+SEED_USERNAME = 'seed.student'
+SEED_PASSWORD = 'seed-password'
+PLACEHOLDER_PROOF = 'registrations/payments/seed-placeholder.pdf'
+
+FIRST_NAMES = [
+    'Kwame', 'Ama', 'Kofi', 'Akosua', 'Yaw', 'Abena', 'Kwabena', 'Efua', 'Kojo', 'Adwoa', 'Kwaku', 'Afia',
+    'Nana', 'Esi', 'Fiifi', 'Araba', 'Selorm', 'Dzifa', 'Ebo', 'Naa', 'Mensah', 'Grace', 'Daniel', 'Mary',
+]
+LAST_NAMES = [
+    'Mensah', 'Owusu', 'Boateng', 'Asante', 'Osei', 'Agyeman', 'Appiah', 'Addo', 'Quaye', 'Ansah', 'Darko',
+    'Amoah', 'Tetteh', 'Frimpong', 'Nkrumah', 'Ofori', 'Sarpong', 'Acheampong', 'Kuffour', 'Adjei',
+]
+CATEGORIES = ['Business', 'Finance', 'Management', 'Marketing', 'Technology', 'Public Policy']
+SUBJECTS = [
+    'Accounting', 'Banking', 'Human Resource Management', 'Supply Chain Management', 'Project Management',
+    'Data Analytics', 'International Business', 'Procurement', 'Digital Marketing', 'Oil and Gas Management',
+    'Leadership', 'Entrepreneurship', 'Health Services Management', 'Information Systems',
+]
+LEVELS = [('postgraduate', 'MSc'), ('postgraduate', 'MBA'), ('undergraduate', 'Diploma in'), ('professional', 'Certificate in')]
+MONTHS = ['january', 'may', 'september']
+
+OPENING, CLOSING = 8, 20  # study rooms are bookable 08:00-20:00
+SLOT_FORMATS = [('view', 70), ('choice', 15), ('form', 10), ('broken', 5)]
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+class SyntheticData:
+    def __init__(self, seed=42, chunk_size=5000, progress=None):
+        self.random = random.Random(seed)
+        self.chunk_size = chunk_size
+        self.progress = progress or (lambda label, done: None)
+
+    def bulk_create(self, model, objects, label, stamped=None):
+        """
+        Insert ``objects`` in chunks. bulk_create() stamps auto_now_add fields
+        with "now"; the generated values of the ``stamped`` field are written
+        back afterwards, leaving the model's field definition alone.
+        """
+        created = 0
+        for chunk in chunked(objects, self.chunk_size):
+            with transaction.atomic():
+                stamps = [getattr(obj, stamped) for obj in chunk] if stamped else None
+                model.objects.bulk_create(chunk)
+                if stamped:
+                    for obj, value in zip(chunk, stamps):
+                        setattr(obj, stamped, value)
+                    model.objects.bulk_update(chunk, [stamped], batch_size=500)
+            created += len(chunk)
+            self.progress(label, created)
+        return created
+
+    def name(self):
+        return f"{self.random.choice(FIRST_NAMES)} {self.random.choice(LAST_NAMES)}"
+
+    def phone(self):
+        return f"+23324{self.random.randrange(10 ** 7):07d}"
+
+    # --- CATALOGUE AND ROOMS ---
+
+    def programs(self, count):
+        categories = [Category(name=f"{name} (seed)", slug=f"{SEED_SLUG}{name.lower().replace(' ', '-')}") for name in CATEGORIES]
+        self.bulk_create(Category, categories, 'categories')
+        categories = list(Category.objects.filter(slug__startswith=SEED_SLUG))
+        objects = []
+        for n in range(count):
+            level, award = self.random.choice(LEVELS)
+            title = f"{award} {self.random.choice(SUBJECTS)}"
+            objects.append(Program(
+                category=self.random.choice(categories), title=title, slug=f"{SEED_SLUG}{n:04d}", level=level,
+                summary=f"{title}: a flexible programme for working professionals.",
+                description=f"{title}. " * 40, duration=self.random.choice(['12 Months', '18 Months', '2 Years']),
+            ))
+        self.bulk_create(Program, objects, 'programmes')
+        return list(Program.objects.filter(slug__startswith=SEED_SLUG).values_list('pk', flat=True))
+
+    def rooms(self, count, floors):
+        objects = [
+            StudyRoom(
+                name=f"{SEED_ROOM}{n % floors + 1}-{n // floors + 1:03d}", floor=n % floors + 1,
+                capacity=self.random.choice([2, 4, 4, 6, 8, 12]), is_available=self.random.random() > 0.03,
+            )
+            for n in range(count)
+        ]
+        self.bulk_create(StudyRoom, objects, 'rooms')
+        return list(StudyRoom.objects.filter(name__startswith=SEED_ROOM).values_list('pk', flat=True))
+
+    # --- STUDENTS ---
+
+    def students(self, count):
+        """ Create ``count`` student users with profiles; returns their (user id, name, student id, email, phone). """
+        User = get_user_model()
+        password = make_password(SEED_PASSWORD)  # hashed once: hashing per user would take hours
+        joined = timezone.now() - timedelta(days=3 * 365)
+        users = []
+        for n in range(count):
+            first, last = self.random.choice(FIRST_NAMES), self.random.choice(LAST_NAMES)
+            users.append(User(
+                username=f"{SEED_USERNAME}{n:06d}", first_name=first, last_name=last,
+                email=f"{first}.{last}.{n}@students.example.com".lower(), password=password,
+                date_joined=joined + timedelta(minutes=self.random.randrange(3 * 365 * 24 * 60)),
+            ))
+        self.bulk_create(User, users, 'students')
+
+        rows = list(
+            User.objects.filter(username__startswith=SEED_USERNAME).order_by('pk')
+            .values_list('pk', 'username', 'first_name', 'last_name', 'email')
+        )
+        students = []
+        profiles = []
+        for pk, username, first, last, email in rows:
+            student_id = f"ABS{username[-6:]}"
+            phone = self.phone()
+            profiles.append(StudentProfile(user_id=pk, student_id=student_id, phone_number=phone))
+            students.append((pk, f"{first} {last}", student_id, email, phone))
+        self.bulk_create(StudentProfile, profiles, 'student profiles')
+        return students
+
+    # --- RESERVATIONS ---
+
+    def _slot_label(self, kind, start, end):
+        if kind == 'view':
+            return f"{start:%H:%M} TO {end:%H:%M}"
+        if kind == 'choice':
+            return f"{start:%H:%M}-{end:%H:%M}"
+        if kind == 'form':
+            return f"{start:%Y-%m-%d %H:%M} TO {end:%Y-%m-%d %H:%M}"
+        return "N/A TO N/A"
+
+    def _day_windows(self, day, bookings):
+        """ Up to ``bookings`` non-overlapping (start, end) windows on ``day``, in opening hours. """
+        cursor = datetime.combine(day, time(OPENING))
+        closing = datetime.combine(day, time(CLOSING))
+        for _ in range(bookings):
+            cursor += timedelta(minutes=self.random.choice([0, 0, 15, 30, 60, 90]))
+            end = cursor + timedelta(minutes=self.random.choice([60, 90, 120, 120, 180]))
+            if end > closing:
+                return
+            yield cursor, end
+            cursor = end
+
+    def reservations(self, count, rooms, students, per_day=4):
+        """ ``count`` reservations spread over as many days as it takes at ~``per_day`` per room. """
+        days = max(1, -(-count // max(1, len(rooms) * per_day)))
+        first_day = timezone.localdate() + timedelta(days=7) - timedelta(days=days)
+        kinds = [kind for kind, _ in SLOT_FORMATS]
+        weights = [weight for _, weight in SLOT_FORMATS]
+        tz = timezone.get_current_timezone()
+
+        def generate():
+            made = 0
+            for offset in itertools.count():
+                day = first_day + timedelta(days=offset)
+                for room_id in rooms:
+                    for start, end in self._day_windows(day, self.random.randint(0, 2 * per_day)):
+                        if made == count:
+                            return
+                        kind = self.random.choices(kinds, weights)[0]
+                        start, end = timezone.make_aware(start, tz), timezone.make_aware(end, tz)
+                        booked = start - timedelta(hours=self.random.randint(1, 24 * 14))
+                        if students and self.random.random() < 0.9:
+                            user_id, name, student_id, email, phone = self.random.choice(students)
+                        else:
+                            user_id, name, student_id, email, phone = None, self.name(), '-', '-', 'Not Provided'
+                        windowed = kind in ('view', 'choice')
+                        made += 1
+                        yield RoomReservation(
+                            room_id=room_id, user_id=user_id, student_name=name, student_id=student_id,
+                            email=email, phone_number=phone, date=day, time_slot=self._slot_label(kind, start, end),
+                            start_at=start if windowed else None, end_at=end if windowed else None,
+                            reserved_at=booked,
+                        )
+
+        return self.bulk_create(RoomReservation, generate(), 'reservations', stamped='reserved_at')
+
+    # --- REGISTRATIONS ---
+
+    def registrations(self, count, programs):
+        """ Processed course registrations that all point at one placeholder payment proof. """
+        placeholder = b"%PDF-1.4\n% seeded placeholder payment proof\n%%EOF\n"
+        if not default_storage.exists(PLACEHOLDER_PROOF):
+            default_storage.save(PLACEHOLDER_PROOF, ContentFile(placeholder))
+        checksum = hashlib.sha256(placeholder).hexdigest()
+        now = timezone.now()
+
+        def generate():
+            for n in range(count):
+                submitted = now - timedelta(minutes=self.random.randrange(2 * 365 * 24 * 60))
+                name = self.name()
+                yield CourseRegistration(
+                    full_name=name, email=f"{name.replace(' ', '.').lower()}.{n}@applicants.example.com",
+                    phone_number=self.phone(), program_id=self.random.choice(programs),
+                    registration_type='resit' if self.random.random() < 0.1 else 'regular',
+                    study_month=self.random.choice(MONTHS), payment_proof=PLACEHOLDER_PROOF,
+                    payment_checksum=checksum, submitted_at=submitted, processed_at=submitted + timedelta(seconds=5),
+                )
+
+        return self.bulk_create(CourseRegistration, generate(), 'registrations', stamped='submitted_at')
+
+    # --- CLEAN UP ---
+
+    def rooms_seeded(self):
+        return StudyRoom.objects.filter(name__startswith=SEED_ROOM).exists()
+
+    def clear(self):
+        """ Delete everything a previous run generated. """
+        RoomReservation.objects.filter(room__name__startswith=SEED_ROOM).delete()
+        CourseRegistration.objects.filter(program__slug__startswith=SEED_SLUG).delete()
+        StudentProfile.objects.filter(user__username__startswith=SEED_USERNAME).delete()
+        get_user_model().objects.filter(username__startswith=SEED_USERNAME).delete()
+        StudyRoom.objects.filter(name__startswith=SEED_ROOM).delete()
+        Program.objects.filter(slug__startswith=SEED_SLUG).delete()
+        Category.objects.filter(slug__startswith=SEED_SLUG).delete()
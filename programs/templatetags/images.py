@@ -0,0 +1,76 @@
+import os
+import re
+from functools import lru_cache
+from pathlib import PurePosixPath
+
+from django import template
+from django.contrib.staticfiles import finders
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+from programs.images import DERIVATIVE_DIR, FORMATS, media_derivative_files
+
+register = template.Library()
+
+DEFAULT_SIZES = '100vw'
+
+
+def _matching(stem, files):
+    """ {fmt: [(width, filename), ...]} for the derivatives of ``stem`` among ``files``. """
+    pattern = re.compile(rf"{re.escape(stem)}-(\d+)w\.(\w+)")
+    found = {}
+    for f in files:
+        match = pattern.fullmatch(f)
+        if match and match.group(2) in FORMATS:
+            found.setdefault(match.group(2), []).append((int(match.group(1)), f))
+    return {fmt: sorted(entries) for fmt, entries in found.items()}
+
+
+@lru_cache(maxsize=None)
+def _static_derivatives(name):
+    # Static files only change on deploy, so the directory scan is done once per process
+    path = PurePosixPath(name)
+    folder = str(path.parent / DERIVATIVE_DIR)
+    location = finders.find(folder)
+    if not location or not os.path.isdir(location):
+        return folder, {}
+    return folder, _matching(path.stem, os.listdir(location))
+
+
+def _media_derivatives(fieldfile):
+    path = PurePosixPath(fieldfile.name)
+    folder = str(path.parent / DERIVATIVE_DIR)
+    return folder, _matching(path.stem, media_derivative_files(fieldfile.name, fieldfile.storage))
+
+
+@register.simple_tag
+def responsive_image(source, alt='', sizes=DEFAULT_SIZES, loading='lazy', **attrs):
+    """
+    Render ``source`` (a static path or an uploaded FieldFile) as a <picture>
+    with AVIF/WebP srcsets from its generated derivatives, falling back to the
+    original file. Extra keyword arguments become <img> attributes, e.g.
+    {% responsive_image member.thumbnail alt=member.name class="gc-image" %}.
+    """
+    if hasattr(source, 'storage'):
+        if not source:
+            return ''
+        original = source.url
+        folder, derivatives = _media_derivatives(source)
+        url_for = lambda f: source.storage.url(f"{folder}/{f}")
+    else:
+        original = static(source)
+        folder, derivatives = _static_derivatives(source)
+        url_for = lambda f: static(f"{folder}/{f}")
+
+    sources = format_html_join(
+        '', '<source type="image/{}" srcset="{}" sizes="{}">',
+        (
+            (fmt, ', '.join(f"{url_for(f)} {width}w" for width, f in derivatives[fmt]), sizes)
+            for fmt in FORMATS if fmt in derivatives
+        ),
+    )
+    extra = format_html_join('', ' {}="{}"', sorted(attrs.items()))
+    return format_html(
+        '<picture>{}<img src="{}" alt="{}" loading="{}" decoding="async"{}></picture>',
+        sources, original, alt, loading, extra,
+    )
@@ -0,0 +1,23 @@
+"""
+Test runner for `manage.py test` (settings.TEST_RUNNER).
+
+The configured cache is shared with the running site (a file cache under
+BASE_DIR/.cache by default, or CACHE_URL), so tests would bump its room,
+role and catalogue versions and pick up keys left by earlier runs. The whole
+run therefore uses a fresh local-memory cache instead.
+"""
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+TEST_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tests'}}
+
+
+class TestRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._caches = override_settings(CACHES=TEST_CACHES)
+        self._caches.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._caches.disable()
+        super().teardown_test_environment(**kwargs)
@@ -1,3 +1,1314 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import os
+import tempfile
+import threading
+import uuid
+from datetime import date, datetime, timedelta
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.management import CommandError, call_command
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
+from django.db import OperationalError, connections, transaction
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+from PIL import Image
+
+from . import urls as programs_urls
+from .availability import RoomUnavailable, book_room, day_schedule, room_state_version, rooms_with_status
+from .broadcast import RESYNC, CacheBroadcaster, InProcessBroadcaster, get_broadcaster
+from .benchmarks import ROUTES, Fixtures, booking_throughput, compare, run_benchmarks
+from .analytics import compute_day_stats, dashboard_summary, refresh_room_stats
+from .caching import catalogue_cache_stats
+from .history import archive_reservations, archived_rows, load_index
+from .images import FORMATS
+from .jobs import claim_jobs, enqueue, queue_stats, renew_leases, requeue_stale, run_due_jobs
+from .models import Category, CourseRegistration, GoverningCouncil, Job, Program, RoomDayStats, RoomReservation, StaffProfile, StudentProfile, StudyRoom
+from .onboarding import import_students, read_rows
+from .profiles import create_users
+from .purge import ARCHIVE_FIELDS, purge_reservations
+from .reservations import count_matches, filter_reservations
+from .release import CURSOR_KEY, next_change, release_due
+from .receipts import receipt_for, render_batch
+from .registrations import process_registration
+from .roles import ROLE_SESSION_KEY
+from .routers import REPLICA, CatalogueReplicaRouter, primary_reads
+from .search import rebuild_index, search_programs
+from .sqlite import write_transaction
+from .synthetic import SEED_ROOM, SyntheticData
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    """ Many students hitting the same room at once must produce exactly one booking. """
+
+    WORKERS = 12
+
+    def setUp(self):
+        self.room = StudyRoom.objects.create(name='Suite 1')
+        self.start = timezone.make_aware(datetime(2030, 1, 1, 9, 0))
+        self.end = self.start + timedelta(hours=2)
+
+    def _race(self, windows):
+        barrier = threading.Barrier(len(windows))
+        results = []
+        lock = threading.Lock()
+
+        def attempt(i, start, end):
+            try:
+                barrier.wait()
+                book_room(self.room, start, end, student_name=f'Student {i}', date=start.date(), time_slot='-')
+                outcome = 'booked'
+            except RoomUnavailable:
+                outcome = 'taken'
+            finally:
+                connections.close_all()
+            with lock:
+                results.append(outcome)
+
+        threads = [threading.Thread(target=attempt, args=(i, s, e)) for i, (s, e) in enumerate(windows)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return results
+
+    def test_parallel_bookings_for_one_window_have_one_winner(self):
+        results = self._race([(self.start, self.end)] * self.WORKERS)
+        self.assertEqual(results.count('booked'), 1)
+        self.assertEqual(results.count('taken'), self.WORKERS - 1)
+        self.assertEqual(RoomReservation.objects.filter(room=self.room).count(), 1)
+
+    def test_parallel_bookings_for_overlapping_windows_have_one_winner(self):
+        windows = [(self.start + timedelta(minutes=5 * i), self.end + timedelta(minutes=5 * i)) for i in range(self.WORKERS)]
+        results = self._race(windows)
+        self.assertEqual(results.count('booked'), 1)
+        self.assertEqual(RoomReservation.objects.filter(room=self.room).count(), 1)
+
+
+class SQLiteWriteTests(TransactionTestCase):
+    def test_lock_errors_are_retried(self):
+        calls = []
+
+        @write_transaction(attempts=3)
+        def write(error):
+            calls.append(transaction.get_connection().in_atomic_block)
+            if len(calls) < 3:
+                raise error
+            return 'done'
+
+        self.assertEqual(write(OperationalError('database is locked')), 'done')
+        self.assertEqual(calls, [True, True, True])
+        calls.clear()
+        with self.assertRaises(OperationalError):
+            write(OperationalError('no such table: programs_studyroom'))
+        self.assertEqual(len(calls), 1)
+
+    @override_settings(SQLITE_TUNING=True, SQLITE_BUSY_TIMEOUT=1234)
+    def test_tuning_applies_to_new_connections(self):
+        conn = connections.create_connection('default')
+        try:
+            conn.ensure_connection()
+            self.assertEqual(conn.transaction_mode, 'IMMEDIATE')
+            self.assertEqual(conn.connection.execute('PRAGMA busy_timeout').fetchone(), (1234,))
+        finally:
+            conn.close()
+
+    def test_concurrent_clients_never_double_book(self):
+        rooms = [StudyRoom.objects.create(name=f'Suite {n}') for n in range(2)]
+        result = booking_throughput(rooms, clients=4, bookings=10, seed=1)
+        self.assertEqual(result['booked'] + result['taken'], 40)
+        self.assertEqual(result['failed'], 0)
+        self.assertEqual(RoomReservation.objects.count(), result['booked'])
+
+
+class BookRoomTests(TestCase):
+    def setUp(self):
+        self.room = StudyRoom.objects.create(name='Suite 2')
+        self.start = timezone.make_aware(datetime(2030, 1, 1, 9, 0))
+
+    def book(self, start, end):
+        return book_room(self.room, start, end, student_name='Ama', date=start.date(), time_slot='-')
+
+    def test_adjacent_windows_do_not_clash(self):
+        self.book(self.start, self.start + timedelta(hours=1))
+        self.book(self.start + timedelta(hours=1), self.start + timedelta(hours=2))
+        self.assertEqual(RoomReservation.objects.count(), 2)
+
+    def test_room_out_of_service_cannot_be_booked(self):
+        StudyRoom.objects.filter(pk=self.room.pk).update(is_available=False)
+        with self.assertRaises(RoomUnavailable):
+            self.book(self.start, self.start + timedelta(hours=1))
+
+
+class ReservationLogTests(TestCase):
+    def setUp(self):
+        self.client.force_login(get_user_model().objects.create_user('staff', password='x', is_staff=True))
+        self.room = StudyRoom.objects.create(name='Suite 7')
+        for name, student_id in [('Ama Mensah', 'ABS0001'), ('Kofi Ama', 'ABS0002'), ('Esi Boateng', 'ABS0003')]:
+            RoomReservation.objects.create(room=self.room, student_name=name, student_id=student_id, date=date(2026, 2, 1), time_slot='-')
+
+    def test_search_matches_name_prefixes_ids_and_rooms(self):
+        names = lambda params: sorted(filter_reservations(params).values_list('student_name', flat=True))
+        self.assertEqual(names({'q': 'ama'}), ['Ama Mensah'])
+        self.assertEqual(names({'q': 'abs0002'}), ['Kofi Ama'])
+        self.assertEqual(len(names({'q': 'suite 7'})), 3)
+
+    def test_impossible_dates_are_ignored(self):
+        params = {'date_from': '2024-02-30', 'date_to': '2026-13-01'}
+        self.assertEqual(filter_reservations(params).count(), 3)
+        self.assertEqual(self.client.get(reverse('programs:staff_room_bookings'), params).status_code, 200)
+        self.assertEqual(self.client.get(reverse('programs:export_room_bookings'), params).status_code, 200)
+
+    def test_exports_neutralise_formulas(self):
+        RoomReservation.objects.create(
+            room=self.room, student_name='=HYPERLINK("http://evil.example")', student_id='@SUM(A1)',
+            phone_number='+233241234567', date=date(2026, 2, 2), time_slot='-',
+        )
+        url = reverse('programs:export_room_bookings')
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('attachment; filename="ABS_Room_Reservations_', response['Content-Disposition'])
+        rows = list(csv.reader(StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(rows[0][:3], ['Student Name', 'Student ID', 'Email'])
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[1][:4], ['\'=HYPERLINK("http://evil.example")', "'@SUM(A1)", '', '+233241234567'])
+
+        from openpyxl import load_workbook
+        response = self.client.get(url, {'format': 'xlsx'})
+        self.assertEqual(response['Content-Type'], 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        self.assertTrue(response['Content-Disposition'].endswith('.xlsx"'))
+        sheet = load_workbook(BytesIO(b''.join(response.streaming_content))).active
+        rows = list(sheet.values)
+        self.assertEqual(rows[0][0], 'Student Name')
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(rows[1][:7], ('\'=HYPERLINK("http://evil.example")', "'@SUM(A1)", None, '+233241234567', 'Suite 7', datetime(2026, 2, 2), '-'))
+        self.assertEqual(sheet.cell(2, 1).data_type, 's')
+        self.assertIsInstance(rows[1][7], datetime)
+
+    def test_xlsx_goes_out_while_rows_are_read(self):
+        from .exports import xlsx_blocks
+        read = []
+
+        def rows():
+            for n in range(2000):
+                read.append(n)
+                yield (str(uuid.uuid4()), n)
+
+        blocks = xlsx_blocks(['Name', 'Number'], rows(), block_size=1024)
+        next(blocks)
+        next(blocks)
+        self.assertLess(len(read), 2000)
+
+    def test_count_stops_at_the_limit(self):
+        self.assertEqual(count_matches(RoomReservation.objects.all(), limit=2), 3)
+        self.assertEqual(count_matches(RoomReservation.objects.all(), limit=5), 3)
+        self.assertEqual(self.client.get(reverse('programs:staff_room_bookings')).context['total_count'], 3)
+
+
+class PurgeTests(TestCase):
+    def setUp(self):
+        self.archive = tempfile.TemporaryDirectory()
+        self.addCleanup(self.archive.cleanup)
+        room = StudyRoom.objects.create(name='Suite 3')
+        RoomReservation.objects.bulk_create([
+            RoomReservation(room=room, student_name=f'Student {i}', date=date(2026, 1, 1 + i % 10), time_slot='-')
+            for i in range(25)
+        ])
+
+    def test_purge_archives_then_deletes_in_batches(self):
+        with self.settings(RESERVATION_ARCHIVE_DIR=self.archive.name):
+            deleted, path = purge_reservations(batch_size=7, pause=0)
+        self.assertEqual(deleted, 25)
+        self.assertFalse(RoomReservation.objects.exists())
+        with gzip.open(path, 'rt', newline='') as fh:
+            rows = list(csv.reader(fh))
+        self.assertEqual(rows[0], ARCHIVE_FIELDS)
+        self.assertEqual(len(rows) - 1, 25)
+
+    def test_purge_before_keeps_newer_rows(self):
+        with self.settings(RESERVATION_ARCHIVE_DIR=self.archive.name):
+            deleted, _ = purge_reservations(before=date(2026, 1, 6), batch_size=4, pause=0)
+        self.assertEqual(deleted, 15)
+        self.assertFalse(RoomReservation.objects.filter(date__lt=date(2026, 1, 6)).exists())
+        self.assertEqual(RoomReservation.objects.count(), 10)
+
+    def test_staff_purge_is_queued_for_the_worker(self):
+        self.client.force_login(get_user_model().objects.create_user('staff', password='x', is_staff=True))
+        self.client.post(reverse('programs:clear_all_bookings'))
+        self.assertEqual(RoomReservation.objects.count(), 25)
+        job = Job.objects.get()
+        self.assertEqual((job.task, job.kwargs), ('programs.purge.purge_reservations', {'up_to': RoomReservation.objects.latest('id').pk}))
+
+        RoomReservation.objects.create(room=StudyRoom.objects.get(), student_name='Late', date=date(2026, 1, 1), time_slot='-')
+        with self.settings(RESERVATION_ARCHIVE_DIR=self.archive.name):
+            self.assertEqual(run_due_jobs(), {job.pk: Job.DONE})
+        self.assertEqual(list(RoomReservation.objects.values_list('student_name', flat=True)), ['Late'])
+
+
+class HistoryArchiveTests(TestCase):
+    TODAY = date(2026, 5, 15)
+
+    def setUp(self):
+        archive = tempfile.TemporaryDirectory()
+        self.addCleanup(archive.cleanup)
+        self.enterContext(self.settings(RESERVATION_ARCHIVE_DIR=archive.name, RESERVATION_ARCHIVE_FORMAT='csv'))
+        self.room = StudyRoom.objects.create(name='Suite 4')
+        for day, name in [(date(2026, 1, 10), 'Ama'), (date(2026, 1, 20), 'Kofi'), (date(2026, 2, 3), 'Esi'), (date(2026, 4, 1), 'Yaw')]:
+            self.book(day, name)
+
+    def book(self, day, name):
+        start = timezone.make_aware(datetime.combine(day, datetime.min.time()).replace(hour=9))
+        return RoomReservation.objects.create(
+            room=self.room, student_name=name, student_id='NA', date=day, time_slot='-', start_at=start, end_at=start + timedelta(hours=1),
+        )
+
+    def test_old_months_move_to_monthly_files(self):
+        self.assertEqual(archive_reservations(months=2, today=self.TODAY, pause=0), {'2026-01': 2, '2026-02': 1})
+        self.assertEqual(list(RoomReservation.objects.values_list('student_name', flat=True)), ['Yaw'])
+        self.assertEqual({month: entry['rows'] for month, entry in load_index().items()}, {'2026-01': 2, '2026-02': 1})
+
+        rows = list(archived_rows({}, ['student_name', 'student_id', 'room__name', 'date', 'start_at']))
+        self.assertEqual([row[0] for row in rows], ['Esi', 'Kofi', 'Ama'])
+        self.assertEqual(rows[0][1:4], ('NA', 'Suite 4', date(2026, 2, 3)))
+        self.assertEqual(rows[0][4], timezone.make_aware(datetime(2026, 2, 3, 9)))
+        self.assertEqual([row[0] for row in archived_rows({'q': 'kofi'}, ['student_name'])], ['Kofi'])
+        self.assertEqual([row[0] for row in archived_rows({'date_from': '2026-02-01'}, ['student_name'])], ['Esi'])
+
+    def test_rerun_merges_late_rows_into_the_month(self):
+        archive_reservations(months=2, today=self.TODAY, pause=0)
+        self.book(date(2026, 1, 25), 'Abena')
+        self.assertEqual(archive_reservations(months=2, today=self.TODAY, pause=0), {'2026-01': 1})
+        self.assertEqual(load_index()['2026-01']['rows'], 3)
+        self.assertEqual(archive_reservations(months=2, today=self.TODAY, pause=0), {})
+
+    def test_staff_export_reads_the_archive(self):
+        archive_reservations(months=2, today=self.TODAY, pause=0)
+        self.client.force_login(get_user_model().objects.create_user('staff', password='x', is_staff=True))
+        response = self.client.get(reverse('programs:export_room_bookings'), {'source': 'archive', 'room': self.room.pk})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[1].startswith('Esi,NA,'))
+
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class QueryBudgetTests(TestCase):
+    """
+    Pins the number of SQL queries each programs URL runs, as recorded by
+    QueryBudgetMiddleware. The counts must not move as the tables grow; if one
+    does, something started querying per row.
+    """
+
+    ROWS = 10
+
+    # URL name -> (who is asking, HTTP method, pinned query count)
+    BUDGETS = {
+        'program_list': ('anon', 'get', 2),
+        'program_search': ('anon', 'get', 2),
+        'admission': ('anon', 'get', 0),
+        'president_message': ('anon', 'get', 0),
+        'about_abs': ('anon', 'get', 0),
+        'governing_council': ('anon', 'get', 1),
+        'accreditation': ('anon', 'get', 0),
+        'contact': ('anon', 'get', 0),
+        'student_login': ('anon', 'get', 0),
+        'student_logout': ('student', 'post', 4),
+        'staff_logout': ('staff', 'post', 4),
+        'student_request': ('anon', 'get', 0),
+        'study_room_reservation': ('student', 'get', 5),
+        'room_reservation_grid': ('student', 'get', 5),
+        'room_availability': ('student', 'get', 4),
+        'room_events': ('student', 'get', 2),
+        'course_registration': ('anon', 'get', 1),
+        'registration_success': ('anon', 'get', 0),
+        'staff_dashboard': ('staff', 'get', 3),
+        'add_program': ('staff', 'get', 3),
+        'edit_program': ('staff', 'get', 4),
+        'staff_room_portal': ('staff', 'get', 1),
+        'staff_room_dashboard': ('staff', 'get', 4),
+        'release_room': ('staff', 'get', 4),
+        'toggle_room_status': ('staff', 'get', 4),
+        'staff_room_bookings': ('staff', 'get', 5),
+        'export_room_bookings': ('staff', 'get', 1),
+        'clear_all_bookings': ('staff', 'get', 1),
+        'delete_single_booking': ('staff', 'get', 1),
+        'staff_job_queue': ('staff', 'get', 6),
+        'reservation_receipt': ('staff', 'get', 3),
+        'registration_receipt': ('staff', 'get', 2),
+        'program_detail': ('anon', 'get', 1),
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        n = cls.ROWS
+        User = get_user_model()
+        cls.staff = User.objects.create_user('staff', password='x', is_staff=True)
+        cls.student = User.objects.create_user('student', password='x')
+        StudentProfile.objects.update_or_create(user=cls.student, defaults={'student_id': 'ABS0001'})
+
+        category = Category.objects.create(name='Business', slug='business')
+        Program.objects.bulk_create([
+            Program(category=category, title=f'Programme {i}', slug=f'programme-{i}', summary='-', description='-')
+            for i in range(n)
+        ])
+        rebuild_index()  # bulk_create skips the post_save signal that indexes programmes
+        GoverningCouncil.objects.bulk_create([
+            GoverningCouncil(name=f'Member {i}', role='Member', thumbnail='council/member.png', order=i)
+            for i in range(min(n, 50))
+        ])
+        rooms = StudyRoom.objects.bulk_create([StudyRoom(name=f'Suite {i}') for i in range(min(n, 100))])
+        now = timezone.now()
+        RoomReservation.objects.bulk_create([
+            RoomReservation(
+                room=rooms[i % len(rooms)], user=cls.student, student_name=f'Student {i}', student_id=f'ABS{i:05d}',
+                date=now.date(), time_slot='-', start_at=now - timedelta(hours=1), end_at=now + timedelta(hours=1),
+            )
+            for i in range(n)
+        ])
+        cls.room = rooms[0]
+        cls.booking = RoomReservation.objects.first()
+        cls.registration = CourseRegistration.objects.create(
+            full_name='Ama Mensah', email='ama@example.com', phone_number='0240000000',
+            program=Program.objects.first(), study_month='march',
+        )
+
+    def setUp(self):
+        cache.clear()
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = self.settings(MEDIA_ROOT=media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def client_for(self, who):
+        client = Client()
+        if who != 'anon':
+            client.force_login(getattr(self, who))
+        return client
+
+    def url_for(self, name):
+        kwargs = {
+            'edit_program': {'slug': 'programme-1'},
+            'program_detail': {'slug': 'programme-1'},
+            'release_room': {'room_id': self.room.pk},
+            'toggle_room_status': {'room_id': self.room.pk},
+            'delete_single_booking': {'booking_id': self.booking.pk},
+            'reservation_receipt': {'booking_id': self.booking.pk},
+            'registration_receipt': {'registration_id': self.registration.pk},
+        }.get(name, {})
+        query = {'program_search': '?q=programme'}.get(name, '')
+        return reverse(f'programs:{name}', kwargs=kwargs) + query
+
+    def test_every_url_has_a_budget(self):
+        names = {p.name for p in programs_urls.urlpatterns if isinstance(p, URLPattern)}
+        self.assertEqual(names - set(self.BUDGETS), set())
+
+    def test_query_counts_are_pinned(self):
+        for name, (who, method, expected) in self.BUDGETS.items():
+            with self.subTest(url=name, rows=self.ROWS):
+                response = getattr(self.client_for(who), method)(self.url_for(name))
+                self.assertLess(response.status_code, 500)
+                self.assertEqual(response.query_stats.count, expected)
+
+
+class QueryBudgetTests1k(QueryBudgetTests):
+    ROWS = 1000
+
+
+class QueryBudgetTests10k(QueryBudgetTests):
+    ROWS = 10000
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class CatalogueCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name='Business', slug='business')
+        cls.program = Program.objects.create(category=cls.category, title='MBA', summary='-', description='-')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_second_anonymous_hit_is_served_from_cache(self):
+        url = reverse('programs:program_list')
+        first = self.client.get(url)
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+        self.assertEqual(first['X-Catalogue-Cache'], 'MISS')
+        self.assertEqual(second['X-Catalogue-Cache'], 'HIT')
+        self.assertEqual(first.content, second.content)
+        stats = catalogue_cache_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 1))
+
+    def test_saving_a_programme_invalidates_cached_pages(self):
+        url = reverse('programs:program_list')
+        self.client.get(url)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.program.title = 'Executive MBA'
+            self.program.save()
+            # Before the commit the version stands; a page rendered now cannot be cached as current
+            self.assertEqual(self.client.get(url)['X-Catalogue-Cache'], 'HIT')
+        for callback in callbacks:
+            callback()
+        response = self.client.get(url)
+        self.assertEqual(response['X-Catalogue-Cache'], 'MISS')
+        self.assertContains(response, 'Executive MBA')
+
+    def test_keys_only_use_the_parameters_a_page_reads(self):
+        url = reverse('programs:program_list')
+        self.client.get(url, {'q': 'mba', 'level': ''})
+        self.assertEqual(self.client.get(url, {'utm_source': 'x', 'q': 'mba'})['X-Catalogue-Cache'], 'HIT')
+        self.assertEqual(self.client.get(reverse('programs:contact'), {'fbclid': 'x'})['X-Catalogue-Cache'], 'MISS')
+        self.assertEqual(self.client.get(reverse('programs:contact'), {'fbclid': 'y'})['X-Catalogue-Cache'], 'HIT')
+        self.assertNotIn('X-Catalogue-Cache', self.client.get(url, {'q': 'x' * 300}))
+
+    def test_authenticated_users_bypass_the_cache(self):
+        user = get_user_model().objects.create_user('staff', password='x', is_staff=True)
+        self.client.force_login(user)
+        response = self.client.get(reverse('programs:program_list'))
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(catalogue_cache_stats()['misses'], 0)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ProgramSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        business = Category.objects.create(name='Business', slug='business')
+        finance = Category.objects.create(name='Finance', slug='finance')
+        cls.mba = Program.objects.create(
+            category=business, title='Master of Business Administration', level='postgraduate',
+            summary='Leadership for managers.', description='Strategy, marketing and operations.',
+        )
+        cls.msc = Program.objects.create(
+            category=finance, title='MSc Accounting and Finance', level='postgraduate',
+            summary='Corporate finance.', description='Business reporting and audit.',
+        )
+        cls.acca = Program.objects.create(
+            category=finance, title='ACCA Professional', level='professional',
+            summary='Chartered accountancy.', description='Accounting practice.',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def titles(self, **params):
+        return [program.title for program in search_programs(**params).object_list]
+
+    def test_title_matches_rank_above_body_matches(self):
+        self.assertEqual(self.titles(query='business')[0], 'Master of Business Administration')
+        self.assertIn('MSc Accounting and Finance', self.titles(query='business'))
+
+    def test_prefix_and_category_matching(self):
+        self.assertEqual(set(self.titles(query='account')), {'MSc Accounting and Finance', 'ACCA Professional'})
+        self.assertEqual(set(self.titles(query='finance', level='professional')), {'ACCA Professional'})
+
+    def test_index_follows_saves_and_deletes(self):
+        self.acca.title = 'CIMA Professional'
+        self.acca.save()
+        self.assertEqual(self.titles(query='cima'), ['CIMA Professional'])
+        self.acca.delete()
+        self.assertEqual(self.titles(query='cima'), [])
+
+    def test_inactive_programmes_are_hidden(self):
+        Program.objects.filter(pk=self.mba.pk).update(is_active=False)
+        self.assertNotIn('Master of Business Administration', self.titles(query='business'))
+
+    def test_results_are_paginated(self):
+        page = search_programs('', per_page=2)
+        self.assertEqual(page.paginator.num_pages, 2)
+        response = self.client.get(reverse('programs:program_search'), {'q': 'finance'})
+        self.assertEqual(response.json()['count'], 2)
+
+
+class TailwindBundleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_cdn_fallback_only_where_allowed(self):
+        from .context_processors import check_tailwind_bundle
+        home = reverse('programs:contact')
+        with mock.patch('programs.context_processors._bundle_built', return_value=False):
+            with self.settings(TAILWIND_CDN_FALLBACK=True):
+                self.assertContains(self.client.get(home), 'cdn.tailwindcss.com')
+                self.assertEqual(check_tailwind_bundle(None), [])
+            with self.settings(TAILWIND_CDN_FALLBACK=False):
+                self.assertEqual([error.id for error in check_tailwind_bundle(None)], ['programs.E001'])
+                cache.clear()  # the catalogue cache holds the page rendered above
+                with self.assertRaises(ImproperlyConfigured):
+                    self.client.get(home)
+        with mock.patch('programs.context_processors._bundle_built', return_value=True), self.settings(TAILWIND_CDN_FALLBACK=False):
+            response = self.client.get(home)
+        self.assertContains(response, 'css/site.css')
+        self.assertNotContains(response, 'cdn.tailwindcss.com')
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ImageDerivativeTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        override = self.settings(MEDIA_ROOT=self.media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def upload(self, width, height):
+        buffer = BytesIO()
+        Image.new('RGB', (width, height), 'gold').save(buffer, format='PNG')
+        return SimpleUploadedFile('member.png', buffer.getvalue(), content_type='image/png')
+
+    def test_uploaded_thumbnail_gets_derivatives_and_srcset(self):
+        cache.clear()
+        member = GoverningCouncil.objects.create(name='Ama', role='Chair', thumbnail=self.upload(800, 1000))
+        folder = os.path.join(self.media.name, 'council', '_derivatives')
+        render = lambda: Template('{% load images %}{% responsive_image m.thumbnail alt=m.name class="gc-image" %}').render(Context({'m': member}))
+        # Encoding waits for the worker; meanwhile the original is shown
+        self.assertFalse(os.path.exists(folder))
+        self.assertNotIn('<source', render())
+        run_due_jobs()
+        self.assertEqual(
+            sorted(os.listdir(folder)),
+            sorted(f'member-{w}w.{fmt}' for w in (320, 640, 800) for fmt in FORMATS),
+        )
+        with mock.patch.object(member.thumbnail.storage, 'listdir', wraps=member.thumbnail.storage.listdir) as listdir:
+            html = render()
+            render()
+        self.assertEqual(listdir.call_count, 1)
+        self.assertIn('loading="lazy"', html)
+        self.assertIn('class="gc-image"', html)
+        for fmt in FORMATS:
+            self.assertIn(f'member-640w.{fmt} 640w', html)
+
+
+@override_settings(CACHES=LOCMEM_CACHE, PAYMENT_PROOF_MAX_SIZE=256 * 1024)
+class CourseRegistrationTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        override = self.settings(MEDIA_ROOT=self.media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        category = Category.objects.create(name='Business', slug='business')
+        self.program = Program.objects.create(category=category, title='MBA', slug='mba', summary='-', description='-')
+
+    def png(self, size=(1200, 1600)):
+        buffer = BytesIO()
+        Image.new('RGB', size, 'gold').save(buffer, format='PNG')
+        return buffer.getvalue()
+
+    def submit(self, name, content):
+        return self.client.post(reverse('programs:course_registration'), {
+            'first_name': 'Ama', 'middle_name': '', 'last_name': 'Mensah',
+            'email': 'ama@example.com', 'phone_number': '0240000000',
+            'program': self.program.pk, 'reg_type': 'resit', 'study_month': 'march',
+            'payment_file': SimpleUploadedFile(name, content),
+        })
+
+    def test_submission_is_saved_and_processed_after_the_request(self):
+        response = self.submit('receipt.png', self.png())
+        self.assertRedirects(response, reverse('programs:registration_success'))
+        registration = CourseRegistration.objects.get()
+        self.assertEqual((registration.full_name, registration.registration_type), ('Ama Mensah', 'resit'))
+        self.assertEqual(registration.payment_checksum, '')
+        self.assertEqual(len(mail.outbox), 0)
+
+        job = Job.objects.get()
+        self.assertEqual((job.task, job.args), ('programs.registrations.process_registration', [registration.pk]))
+        self.assertEqual(run_due_jobs(), {job.pk: Job.DONE})
+        registration.refresh_from_db()
+        self.assertEqual(len(registration.payment_checksum), 64)
+        with Image.open(registration.payment_preview.path) as preview:
+            self.assertEqual(preview.size, (480, 640))
+        self.assertEqual(mail.outbox[0].to, ['ama@example.com'])
+        self.assertIsNotNone(registration.confirmation_sent_at)
+
+        process_registration(registration.pk)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_proof_is_checked_while_streaming(self):
+        cases = {
+            'receipt.exe': b'%PDF-1.4 not really',
+            'receipt.pdf': b'MZ\x90\x00 an executable',
+            'scan.png': self.png((2000, 2000)) + os.urandom(300 * 1024),
+        }
+        for name, content in cases.items():
+            with self.subTest(name=name):
+                response = self.submit(name, content)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(response.context['form'].errors['payment_file'])
+        self.assertFalse(CourseRegistration.objects.exists())
+        self.assertFalse(Job.objects.exists())
+
+
+def failing_task(message):
+    raise RuntimeError(message)
+
+
+class JobQueueTests(TestCase):
+    def test_failed_jobs_back_off_then_give_up(self):
+        job = enqueue(failing_task, 'smtp down', max_attempts=2)
+        self.assertEqual(job.task, 'programs.tests.failing_task')
+
+        with self.assertLogs('programs.jobs', 'WARNING'):
+            self.assertEqual(run_due_jobs(), {job.pk: Job.QUEUED})
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('smtp down', job.last_error)
+        self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=20))
+        self.assertEqual(run_due_jobs(), {})
+
+        Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+        with self.assertLogs('programs.jobs', 'ERROR'):
+            self.assertEqual(run_due_jobs(), {job.pk: Job.FAILED})
+        self.assertEqual(queue_stats()['failed'], 1)
+
+    def test_a_job_is_claimed_once(self):
+        job = enqueue('django.utils.timezone.now')
+        self.assertEqual(claim_jobs('a', 10), [job.pk])
+        self.assertEqual(claim_jobs('b', 10), [])
+
+        # A slow job whose worker keeps renewing its lease stays with that worker
+        Job.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(hours=1))
+        later = timezone.now() + timedelta(seconds=50)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            self.assertEqual(renew_leases('a', [job.pk]), 1)
+        self.assertEqual(requeue_stale(later + timedelta(seconds=30)), 0)
+
+        self.assertEqual(requeue_stale(later + timedelta(minutes=5)), 1)
+        self.assertEqual(claim_jobs('b', 10), [job.pk])
+        self.assertEqual(renew_leases('a', [job.pk]), 0)
+
+    def test_booking_queues_its_confirmation(self):
+        student = get_user_model().objects.create_user('ama', email='ama@example.com', password='x')
+        StudentProfile.objects.update_or_create(user=student, defaults={'student_id': 'ABS0001'})
+        room = StudyRoom.objects.create(name='Suite 1')
+        self.client.force_login(student)
+        self.client.post(reverse('programs:study_room_reservation'), {
+            'room_name': room.name, 'arrival_datetime': '2030-01-01T09:00', 'departure_datetime': '2030-01-01T11:00',
+        })
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(list(Job.objects.values_list('task', flat=True)), ['programs.notifications.email_booking_confirmation'])
+        run_due_jobs()
+        self.assertIn('Suite 1', mail.outbox[0].body)
+
+        # A queue failure is logged; the booking itself went through
+        with mock.patch('programs.views.queue_booking_confirmation', side_effect=OperationalError('queue down')), \
+                self.assertLogs('programs.views', 'ERROR'):
+            response = self.client.post(reverse('programs:study_room_reservation'), {
+                'room_name': room.name, 'arrival_datetime': '2030-01-02T09:00', 'departure_datetime': '2030-01-02T11:00',
+            }, follow=True)
+        self.assertContains(response, 'Reservation confirmed')
+        self.assertEqual(RoomReservation.objects.count(), 2)
+
+
+class ReceiptTests(TestCase):
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        override = self.settings(MEDIA_ROOT=self.media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        User = get_user_model()
+        self.owner = User.objects.create_user('ama', password='x')
+        self.other = User.objects.create_user('kofi', password='x')
+        room = StudyRoom.objects.create(name='Suite 1')
+        start = timezone.now()
+        self.booking = RoomReservation.objects.create(
+            room=room, user=self.owner, student_name='Ama Mensah', student_id='ABS0001',
+            date=start.date(), time_slot='-', start_at=start, end_at=start + timedelta(hours=2),
+        )
+
+    def stored(self):
+        return sorted(os.listdir(os.path.join(self.media.name, 'receipts', 'reservation')))
+
+    def test_pdf_is_cached_on_record_content(self):
+        filename, data = receipt_for('reservation', self.booking)
+        self.assertEqual(filename, f'RR-{self.booking.pk:06d}.pdf')
+        self.assertTrue(data.startswith(b'%PDF'))
+        self.assertEqual(receipt_for('reservation', self.booking)[1], data)
+        self.assertEqual(len(self.stored()), 1)
+
+        self.booking.student_name = 'Ama K. Mensah'
+        self.booking.save()
+        self.assertNotEqual(receipt_for('reservation', self.booking)[1], data)
+        self.assertEqual(len(self.stored()), 2)
+        self.assertEqual([name for name, _ in render_batch('reservation', [self.booking.pk])], [filename])
+
+    def test_students_only_get_their_own_receipts(self):
+        url = reverse('programs:reservation_receipt', args=[self.booking.pk])
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.client.force_login(self.owner)
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class RoomAvailabilityApiTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user('ama', password='x')
+        self.client.force_login(self.user)
+        self.room = StudyRoom.objects.create(name='Suite 1')
+        self.spare = StudyRoom.objects.create(name='Suite 2', is_available=False)
+        self.day = date(2030, 1, 1)
+        for start, end in ((9, 11), (10, 12), (14, 15)):
+            self.book(start, end)
+        self.url = reverse('programs:room_availability') + '?date=2030-01-01'
+
+    def book(self, start, end):
+        at = lambda hour: timezone.make_aware(datetime(2030, 1, 1, hour))
+        return RoomReservation.objects.create(
+            room=self.room, student_name='Ama', date=self.day, time_slot='-', start_at=at(start), end_at=at(end),
+        )
+
+    def test_intervals_are_merged_and_clipped_to_the_day(self):
+        suite1, suite2 = day_schedule(self.day)
+        hours = lambda intervals: [[value[11:16] for value in pair] for pair in intervals]
+        self.assertEqual(hours(suite1['busy']), [['09:00', '12:00'], ['14:00', '15:00']])
+        self.assertEqual(hours(suite1['free']), [['00:00', '09:00'], ['12:00', '14:00'], ['15:00', '00:00']])
+        self.assertEqual((suite2['in_service'], suite2['free']), (False, []))
+
+    def test_unchanged_grid_is_a_304_without_room_queries(self):
+        response = self.client.get(self.url)
+        self.assertEqual(len(response.json()['rooms']), 2)
+        etag = response['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.query_stats.count, 2)  # session and user only
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.book(16, 17)
+            # Not committed yet: a poll now must not be handed a new ETag for the old grid
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        for callback in callbacks:
+            callback()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_staff_actions_change_the_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        staff = get_user_model().objects.create_user('staff', password='x', is_staff=True)
+        self.client.force_login(staff)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.get(reverse('programs:toggle_room_status', args=[self.spare.pk]))
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+@override_settings(CACHES=LOCMEM_CACHE, ROOM_RELEASE_GRACE=600)
+class RoomReleaseTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.room = StudyRoom.objects.create(name='Suite 1')
+        self.now = timezone.now().replace(microsecond=0)
+
+    def book(self, start, end):
+        return RoomReservation.objects.create(
+            room=self.room, student_name='Ama', date=timezone.localdate(start), time_slot='-', start_at=start, end_at=end,
+        )
+
+    def test_room_is_held_for_the_grace_period(self):
+        self.book(self.now - timedelta(hours=1), self.now - timedelta(minutes=5))
+        self.assertTrue(rooms_with_status().get().is_booked)
+        with self.assertRaises(RoomUnavailable):
+            book_room(self.room, self.now, self.now + timedelta(hours=1), student_name='Kofi', date=self.now.date(), time_slot='-')
+        with self.settings(ROOM_RELEASE_GRACE=0):
+            self.assertTrue(rooms_with_status().get().is_free)
+
+    def test_staff_release_frees_the_room_within_the_grace(self):
+        self.client.force_login(get_user_model().objects.create_user('staff', password='x', is_staff=True))
+        current = self.book(self.now - timedelta(hours=1), self.now + timedelta(hours=1))
+        self.client.get(reverse('programs:release_room', args=[self.room.pk]))
+        self.assertTrue(rooms_with_status().get().is_free)
+        current.refresh_from_db()
+        self.assertEqual(current.start_at, self.now - timedelta(hours=1))
+
+        lapsing = self.book(self.now - timedelta(hours=2), self.now - timedelta(minutes=5))  # in its grace window
+        just_started = StudyRoom.objects.create(name='Suite 2')
+        RoomReservation.objects.create(
+            room=just_started, student_name='Kofi', date=self.now.date(), time_slot='-',
+            start_at=self.now - timedelta(minutes=2), end_at=self.now + timedelta(hours=1),
+        )
+        self.client.get(reverse('programs:release_room', args=[self.room.pk]))
+        self.client.get(reverse('programs:release_room', args=[just_started.pk]))
+        self.assertEqual(rooms_with_status().filter(is_free=True).count(), 2)
+        lapsing.refresh_from_db()
+        self.assertLess(lapsing.end_at, self.now - timedelta(minutes=5))
+
+    def test_sweep_announces_starts_and_releases_once(self):
+        cache.set(CURSOR_KEY, self.now - timedelta(minutes=30))
+        self.book(self.now - timedelta(hours=2), self.now - timedelta(minutes=15))  # released 5 minutes ago
+        other = StudyRoom.objects.create(name='Suite 2')
+        RoomReservation.objects.create(
+            room=other, student_name='Kofi', date=self.now.date(), time_slot='-',
+            start_at=self.now - timedelta(minutes=1), end_at=self.now + timedelta(hours=1),
+        )
+        StudyRoom.objects.create(name='Suite 3')
+        version = room_state_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(release_due(self.now), {self.room.pk, other.pk})
+        self.assertGreater(room_state_version(), version)
+        self.assertEqual(release_due(self.now + timedelta(seconds=5)), set())
+
+    def test_clock_wakes_for_the_next_release(self):
+        self.book(self.now - timedelta(hours=1), self.now + timedelta(minutes=20))
+        self.assertEqual(next_change(self.now), self.now + timedelta(minutes=30))
+        self.assertIsNone(next_change(self.now + timedelta(hours=1)))
+
+
+class RoomEventTests(TestCase):
+    def setUp(self):
+        self.room = StudyRoom.objects.create(name='Suite 1')
+
+    def listen(self, broadcaster, action):
+        """ Subscribe from an event loop in another thread, run ``action`` here and return the events received. """
+        subscribed, received = threading.Event(), []
+
+        async def main():
+            events = broadcaster.subscribe(heartbeat=5)
+            first = asyncio.ensure_future(anext(events))
+            await asyncio.sleep(0)  # lets the subscriber register
+            subscribed.set()
+            received.append(await first)
+            await events.aclose()
+
+        listener = threading.Thread(target=asyncio.run, args=(main(),))
+        listener.start()
+        subscribed.wait(5)
+        action()
+        listener.join(10)
+        return received
+
+    def test_events_published_from_any_thread_reach_subscribers(self):
+        broadcaster = InProcessBroadcaster()
+        self.assertEqual(self.listen(broadcaster, lambda: broadcaster.publish({'type': 'rooms'})), [{'type': 'rooms'}])
+        self.assertFalse(broadcaster.has_listeners())
+
+    def test_slow_subscriber_is_told_to_resync(self):
+        broadcaster = InProcessBroadcaster()
+
+        async def main():
+            # Published from the subscriber's own loop, so all 150 arrive before it reads any
+            events, received = broadcaster.subscribe(), []
+            first = asyncio.ensure_future(anext(events))
+            await asyncio.sleep(0)
+            for n in range(150):
+                broadcaster.publish({'type': 'rooms', 'n': n})
+            received.append(await first)
+            while received[-1].get('n') != 149:
+                received.append(await anext(events))
+            await events.aclose()
+            return received
+
+        events = asyncio.run(main())
+        self.assertIn(RESYNC, events)
+        self.assertLess(len(events), 150)
+        self.assertEqual(events[-1], {'type': 'rooms', 'n': 149})
+
+    def test_cache_broadcaster_needs_an_atomic_incr(self):
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': tempfile.gettempdir()}}):
+            with self.assertRaisesMessage(ImproperlyConfigured, 'FileBasedCache'):
+                CacheBroadcaster()
+        with override_settings(CACHES=LOCMEM_CACHE):
+            cache.clear()
+            broadcaster = CacheBroadcaster()
+            broadcaster.publish({'type': 'rooms', 'n': 1})
+            broadcaster.publish({'type': 'rooms', 'n': 2})
+            self.assertEqual(cache.get(CacheBroadcaster.SEQUENCE_KEY), 2)
+            self.assertEqual(cache.get(CacheBroadcaster.EVENT_KEY.format(2)), {'type': 'rooms', 'n': 2})
+
+    def test_booking_pushes_the_room_entry(self):
+        start = timezone.localtime().replace(hour=10, minute=0, second=0, microsecond=0)
+
+        def book():
+            with self.captureOnCommitCallbacks(execute=True):
+                book_room(self.room, start, start + timedelta(hours=1), student_name='Ama', date=start.date(), time_slot='-')
+
+        event, = self.listen(get_broadcaster(), book)
+        self.assertEqual(event['type'], 'rooms')
+        self.assertEqual([room['id'] for room in event['rooms']], [self.room.pk])
+        self.assertEqual(len(event['rooms'][0]['busy']), 1)
+
+    def test_wsgi_clients_are_told_to_poll(self):
+        url = reverse('programs:room_events')
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_login(get_user_model().objects.create_user('ama', password='x'))
+        self.assertEqual(self.client.get(url).status_code, 204)
+
+
+class SyntheticDataTests(TestCase):
+    SIZES = ['--rooms', '6', '--floors', '2', '--students', '20', '--reservations', '300', '--programs', '4', '--registrations', '25']
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        override = self.settings(MEDIA_ROOT=self.media.name, DEBUG=True)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def seed(self, *extra):
+        call_command('seed_data', *self.SIZES, *extra, stdout=StringIO())
+
+    def snapshot(self):
+        return list(RoomReservation.objects.order_by('room__name', 'date', 'reserved_at').values_list(
+            'room__name', 'student_name', 'time_slot', 'start_at', 'reserved_at',
+        ))
+
+    def test_seeding_is_reproducible_and_realistic(self):
+        self.seed()
+        self.assertEqual(RoomReservation.objects.count(), 300)
+        self.assertEqual(StudentProfile.objects.exclude(student_id=None).count(), 20)
+        self.assertEqual(CourseRegistration.objects.count(), 25)
+        # Generated timestamps are kept, and the models still stamp new rows themselves
+        week_ago = timezone.now() - timedelta(days=7)
+        self.assertTrue(RoomReservation.objects.filter(reserved_at__lt=week_ago).exists())
+        self.assertTrue(CourseRegistration.objects.filter(submitted_at__lt=week_ago).exists())
+        self.assertTrue(RoomReservation._meta.get_field('reserved_at').auto_now_add)
+        self.assertTrue(CourseRegistration._meta.get_field('submitted_at').auto_now_add)
+        self.assertTrue(RoomReservation.objects.filter(start_at=None).exists())
+        self.assertTrue(RoomReservation.objects.filter(time_slot__contains='-', start_at__isnull=False).exists())
+        for room in StudyRoom.objects.all():
+            windows = list(room.reservations.exclude(start_at=None).order_by('start_at').values_list('start_at', 'end_at'))
+            self.assertTrue(all(end <= start for (_, end), (start, _) in zip(windows, windows[1:])))
+
+        first = self.snapshot()
+        self.seed('--clear')
+        self.assertEqual(self.snapshot(), first)
+
+    def test_refuses_to_seed_twice_or_without_debug(self):
+        self.seed()
+        with self.assertRaises(CommandError):
+            self.seed()
+        SyntheticData().clear()
+        self.assertFalse(StudyRoom.objects.filter(name__startswith=SEED_ROOM).exists())
+        with self.settings(DEBUG=False), self.assertRaises(CommandError):
+            self.seed()
+
+
+class BenchmarkTests(TestCase):
+    def test_every_named_route_is_benchmarked(self):
+        from config import urls as project_urls
+        names = {p.name for p in project_urls.urlpatterns if isinstance(p, URLPattern) and p.name}
+        names |= {f'programs:{p.name}' for p in programs_urls.urlpatterns if isinstance(p, URLPattern)}
+        self.assertEqual(names - set(ROUTES), set())
+
+    def test_results_and_regressions(self):
+        get_user_model().objects.create_user('staff', password='x', is_staff=True)
+        routes = ['programs:program_list', 'programs:staff_room_bookings', 'programs:release_room']
+        results, skipped = run_benchmarks(Fixtures(), routes=routes, requests=3, warmup=0)
+        self.assertEqual(set(results), {'programs:program_list', 'programs:staff_room_bookings'})
+        self.assertEqual(set(skipped), {'programs:release_room'})
+        bookings = results['programs:staff_room_bookings']
+        self.assertEqual(bookings['status'], 200)
+        self.assertGreater(bookings['bytes'], 0)
+        self.assertLessEqual(bookings['p50_ms'], bookings['p99_ms'])
+
+        baseline = {'runs': [{'size': None, 'routes': results}]}
+        slower = {**bookings, 'p95_ms': bookings['p95_ms'] * 2 + 5, 'queries': bookings['queries'] + 1}
+        current = {'runs': [{'size': None, 'routes': {**results, 'programs:staff_room_bookings': slower}}]}
+        self.assertEqual(compare(baseline, baseline, 10), [])
+        self.assertEqual([name for _, name, _ in compare(baseline, current, 10)], ['programs:staff_room_bookings'] * 2)
+
+
+class ProfileProvisioningTests(TestCase):
+    def test_new_users_get_the_profile_of_their_role(self):
+        User = get_user_model()
+        with self.assertNumQueries(2):  # user, profile
+            student = User.objects.create_user('ama', password='x')
+        staff = User.objects.create_user('kofi', password='x', is_staff_member=True)
+        self.assertTrue(StudentProfile.objects.filter(user=student).exists())
+        self.assertFalse(StaffProfile.objects.filter(user=student).exists())
+        self.assertTrue(StaffProfile.objects.filter(user=staff).exists())
+        self.assertFalse(StudentProfile.objects.filter(user=staff).exists())
+
+    def test_saves_without_a_role_change_touch_no_profile(self):
+        get_user_model().objects.create_user('ama', password='x')
+        user = get_user_model().objects.get(username='ama')
+        with self.assertNumQueries(1):
+            user.save(update_fields=['last_login'])
+        with self.assertNumQueries(1):
+            user.first_name = 'Ama'
+            user.save()
+        self.assertTrue(self.client.login(username='ama', password='x'))
+
+        user.is_staff = True
+        with self.assertNumQueries(2):
+            user.save()
+        self.assertTrue(StaffProfile.objects.filter(user=user).exists())
+        self.assertTrue(StudentProfile.objects.filter(user=user).exists())  # keeps the student ID
+
+    def test_bulk_path_costs_the_same_for_any_number_of_users(self):
+        User = get_user_model()
+        users = [User(username=f'student{i}', is_staff=i % 10 == 0) for i in range(50)]
+        with self.assertNumQueries(5):  # savepoint, users, staff profiles, student profiles, release
+            create_users(users)
+        self.assertEqual(StaffProfile.objects.count(), 5)
+        self.assertEqual(StudentProfile.objects.count(), 45)
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class PortalRoleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        User = get_user_model()
+        self.student = User.objects.create_user('ama', password='x')
+        self.staff = User.objects.create_user('staff', password='x', is_staff=True)
+        self.export = reverse('programs:export_room_bookings')
+
+    def test_role_is_resolved_at_login(self):
+        response = self.client.post(reverse('programs:student_login'), {'username': 'staff', 'password': 'x'})
+        self.assertRedirects(response, reverse('programs:staff_room_bookings'), fetch_redirect_response=False)
+        self.assertEqual(self.client.session[ROLE_SESSION_KEY]['name'], 'staff')
+        with self.assertNumQueries(1):  # the session; neither the user nor a profile
+            self.client.get(reverse('programs:staff_room_portal'))
+
+        self.client.force_login(self.student)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.export)
+        self.assertRedirects(response, reverse('programs:study_room_reservation'), fetch_redirect_response=False)
+
+    def test_role_changes_reach_open_sessions(self):
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.get(self.export).status_code, 200)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.staff.is_staff = False
+            self.staff.save()
+            # Until the change commits the old version stands, so nothing can re-cache the old role under a new one
+            self.assertEqual(self.client.get(self.export).status_code, 200)
+        for callback in callbacks:
+            callback()
+        self.assertRedirects(self.client.get(self.export), reverse('programs:study_room_reservation'), fetch_redirect_response=False)
+
+        self.client.force_login(self.student)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.student.student_profile.delete()
+        response = self.client.get(reverse('programs:study_room_reservation'))
+        self.assertRedirects(response, reverse('programs:program_list'), fetch_redirect_response=False)
+
+    def test_password_change_still_ends_other_sessions(self):
+        self.client.force_login(self.staff)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.staff.set_password('new')
+            self.staff.save()
+        response = self.client.get(self.export)
+        self.assertTrue(response['Location'].startswith(reverse('programs:student_login')))
+
+
+class ReplicaRouterTests(SimpleTestCase):
+    """ The routing rules themselves; ReplicaRoutingTests runs them against a real replica alias. """
+    router = CatalogueReplicaRouter()
+
+    def test_catalogue_reads_go_to_a_configured_replica(self):
+        self.assertEqual(self.router.db_for_read(Program), 'default')  # no replica configured
+        with mock.patch.dict(settings.DATABASES, {REPLICA: {}}):
+            self.assertEqual(self.router.db_for_read(Program), REPLICA)
+            self.assertEqual(self.router.db_for_read(GoverningCouncil), REPLICA)
+            self.assertEqual(self.router.db_for_read(RoomReservation), 'default')
+            with primary_reads():
+                self.assertEqual(self.router.db_for_read(Program), 'default')
+            with mock.patch.object(connections['default'], 'in_atomic_block', True):
+                self.assertEqual(self.router.db_for_read(Program), 'default')
+        self.assertNotIn(REPLICA, settings.DATABASES)
+
+    def test_writes_and_migrations_stay_on_the_primary(self):
+        with mock.patch.dict(settings.DATABASES, {REPLICA: {}}):
+            self.assertEqual(self.router.db_for_write(Program), 'default')
+            self.assertEqual(self.router.db_for_write(RoomReservation), 'default')
+            self.assertTrue(self.router.allow_relation(Program(), Category()))
+            self.assertTrue(self.router.allow_migrate('default', 'programs'))
+            self.assertFalse(self.router.allow_migrate(REPLICA, 'programs'))
+
+
+@skipUnless(REPLICA in settings.DATABASES, "set DATABASE_REPLICA_URL, e.g. sqlite:////tmp/replica.sqlite3")
+@override_settings(CACHES=LOCMEM_CACHE)
+class ReplicaRoutingTests(TransactionTestCase):
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        self.category = Category.objects.create(name='Business', slug='business')
+        Program.objects.create(category=self.category, title='MBA', summary='-', description='-')
+
+    def reads_on(self, alias, action):
+        with CaptureQueriesContext(connections[alias]) as queries:
+            action()
+        return len(queries)
+
+    def test_catalogue_reads_use_the_replica(self):
+        self.assertEqual(Program.objects.all().db, REPLICA)
+        self.assertEqual(RoomReservation.objects.all().db, 'default')
+        self.assertEqual(Program.objects.all().count(), 1)
+        with primary_reads():
+            self.assertEqual(Program.objects.all().db, 'default')
+        with transaction.atomic():
+            self.assertEqual(Program.objects.all().db, 'default')
+
+    def test_fresh_catalogue_pages_read_the_primary(self):
+        list_page = lambda: self.client.get(reverse('programs:program_list'))
+        self.assertEqual(self.reads_on(REPLICA, list_page), 0)  # rendered just after the change above
+        cache.clear()
+        self.assertGreater(self.reads_on(REPLICA, list_page), 0)
+
+
+class StudentImportTests(TestCase):
+    SHEET = (
+        "Student ID,First Name,Last Name,Email,Phone\n"
+        "ABS1001,Ama,Mensah,ama@example.com,024 123 4567\n"
+        "ABS1002,Kofi,Owusu,,\n"
+        "ABS1001,Yaw,Boateng,yaw@example.com,\n"
+        "ABS1003,Esi,,not-an-email,12\n"
+        "ABS0001,Efua,Asante,,\n"
+    )
+
+    def setUp(self):
+        existing = get_user_model().objects.create_user('efua')
+        StudentProfile.objects.filter(user=existing).update(student_id='ABS0001')
+
+    def test_valid_rows_are_created_and_the_rest_reported(self):
+        records = read_rows(BytesIO(self.SHEET.encode()), 'intake.csv')
+        with self.assertNumQueries(6):  # two checks, then savepoint, users, profiles, release
+            created, errors = import_students(records, default_password='Intake2026')
+        self.assertEqual(created, 2)
+        self.assertEqual([(row, student_id) for row, student_id, _ in errors], [(4, 'ABS1001'), (5, 'ABS1003'), (6, 'ABS0001')])
+        self.assertIn('repeats row 2', errors[0][2])
+        self.assertIn('last name is required', errors[1][2])
+        self.assertIn('already exists', errors[2][2])
+
+        profile = StudentProfile.objects.select_related('user').get(student_id='ABS1001')
+        self.assertEqual((profile.user.username, profile.phone_number), ('abs1001', '+233241234567'))
+        self.assertTrue(self.client.login(username='abs1002', password='Intake2026'))
+
+    def test_xlsx_sheets_and_dry_runs(self):
+        from openpyxl import Workbook
+        wb = Workbook()
+        wb.active.append(['student_id', 'first_name', 'last_name', 'password'])
+        wb.active.append([2002, 'Abena', 'Darko', 'own-secret'])
+        data = BytesIO()
+        wb.save(data)
+        data.seek(0)
+        records = read_rows(data, 'intake.xlsx')
+        self.assertEqual(records, [(2, {'student_id': '2002', 'first_name': 'Abena', 'last_name': 'Darko', 'password': 'own-secret'})])
+        self.assertEqual(import_students(records, dry_run=True), (1, []))
+        self.assertFalse(get_user_model().objects.filter(username='2002').exists())
+        import_students(records)
+        self.assertTrue(self.client.login(username='2002', password='own-secret'))
+
+    def test_admin_import_page(self):
+        admin = get_user_model().objects.create_superuser('admin', password='x')
+        self.client.force_login(admin)
+        url = reverse('admin:users_customuser_import')
+        sheet = SimpleUploadedFile('intake.csv', self.SHEET.encode(), content_type='text/csv')
+        response = self.client.post(url, {'sheet': sheet})
+        self.assertContains(response, '2 of 5 students were created')
+        self.assertContains(response, 'repeats row 2')
+
+    def test_admin_import_sends_big_sheets_to_the_command(self):
+        admin = get_user_model().objects.create_superuser('admin', password='x')
+        self.client.force_login(admin)
+        rows = ''.join(f"ABS2{n:03},Kwame,Ofori,own-secret-{n}\n" for n in range(21))
+        sheet = SimpleUploadedFile('intake.csv', f"Student ID,First Name,Last Name,Password\n{rows}".encode(), content_type='text/csv')
+        with mock.patch('programs.onboarding.ProcessPoolExecutor') as pool:
+            response = self.client.post(reverse('admin:users_customuser_import'), {'sheet': sheet})
+        self.assertContains(response, 'manage.py import_students')
+        pool.assert_not_called()
+        self.assertFalse(StudentProfile.objects.filter(student_id='ABS2000').exists())
+
+    def test_ids_taken_during_the_import_are_reported_against_their_row(self):
+        from . import onboarding
+        records = read_rows(BytesIO(self.SHEET.encode()), 'intake.csv')
+        checked = onboarding.validate_rows
+
+        def taken_meanwhile(records):
+            # Another import claims ABS1002 once this one has checked the sheet
+            result = checked(records)
+            if not StudentProfile.objects.filter(student_id='ABS1002').exists():
+                rival = get_user_model().objects.create_user('rival')
+                StudentProfile.objects.filter(user=rival).update(student_id='ABS1002')
+            return result
+
+        with mock.patch('programs.onboarding.validate_rows', taken_meanwhile):
+            created, errors = import_students(records, workers=1)
+        self.assertEqual(created, 1)
+        self.assertEqual([(row, student_id) for row, student_id, _ in errors], [(3, 'ABS1002'), (4, 'ABS1001'), (5, 'ABS1003'), (6, 'ABS0001')])
+        self.assertTrue(StudentProfile.objects.filter(student_id='ABS1001').exists())
+
+
+@override_settings(CACHES=LOCMEM_CACHE, ROOM_OPENING_HOURS=(8, 22))
+class RoomAnalyticsTests(TestCase):
+    DAY = date(2026, 3, 2)  # a Monday
+
+    def setUp(self):
+        cache.clear()
+        self.suite = StudyRoom.objects.create(name='Suite 1', floor=2, capacity=4)
+        self.booth = StudyRoom.objects.create(name='Booth 1', floor=1, capacity=1)
+        self.book(self.suite, 9, 10)
+        self.book(self.suite, 11, 12.5)
+        self.book(self.booth, 23.5, 24.5)  # runs past midnight, outside opening hours
+
+    def book(self, room, start, end, day=None):
+        midnight = timezone.make_aware(datetime.combine(day or self.DAY, datetime.min.time()))
+        return RoomReservation.objects.create(
+            room=room, student_name='Ama', date=day or self.DAY, time_slot='-',
+            start_at=midnight + timedelta(hours=start), end_at=midnight + timedelta(hours=end),
+        )
+
+    def test_day_stats_from_minute_occupancy(self):
+        stats = {(s.room_id, s.day): s for s in compute_day_stats(self.DAY, self.DAY + timedelta(days=1))}
+        self.assertEqual(len(stats), 4)
+
+        suite = stats[self.suite.pk, self.DAY]
+        self.assertEqual((suite.bookings, suite.booked_minutes, suite.open_minutes), (2, 150, 840))
+        self.assertEqual((suite.gap_minutes, suite.gaps, suite.floor, suite.capacity), (60, 1, 2, 4))
+        self.assertEqual(suite.hourly_minutes[9:13], [60, 0, 60, 30])
+        self.assertEqual(sum(suite.hourly_minutes), 150)
+
+        booth, next_day = stats[self.booth.pk, self.DAY], stats[self.booth.pk, self.DAY + timedelta(days=1)]
+        self.assertEqual((booth.bookings, booth.booked_minutes, booth.hourly_minutes[23]), (1, 0, 30))
+        self.assertEqual((next_day.bookings, next_day.hourly_minutes[0], next_day.gap_minutes), (0, 30, 0))
+
+    def test_refresh_is_incremental_and_picks_up_late_changes(self):
+        self.assertEqual(refresh_room_stats(until=self.DAY + timedelta(days=3)), (self.DAY, self.DAY + timedelta(days=3)))
+        self.assertEqual(RoomDayStats.objects.count(), 8)
+
+        self.book(self.suite, 14, 16, day=self.DAY + timedelta(days=3))
+        self.assertEqual(refresh_room_stats(until=self.DAY + timedelta(days=4)), (self.DAY + timedelta(days=2), self.DAY + timedelta(days=4)))
+        self.assertEqual(RoomDayStats.objects.count(), 10)
+        self.assertEqual(RoomDayStats.objects.get(room=self.suite, day=self.DAY + timedelta(days=3)).booked_minutes, 120)
+
+        call_command('build_room_stats', '--days', '1', '--until', str(self.DAY), stdout=StringIO())
+        self.assertEqual(RoomDayStats.objects.filter(day=self.DAY).count(), 2)
+        with self.assertRaises(CommandError):
+            call_command('build_room_stats', '--days', '0')
+
+    def test_dashboard_summary_reads_only_the_aggregates(self):
+        refresh_room_stats(since=self.DAY, until=self.DAY + timedelta(days=1))
+        today = self.DAY + timedelta(days=2)
+        with self.assertNumQueries(1):
+            summary = dashboard_summary(days=2, today=today)
+        with self.assertNumQueries(0):
+            dashboard_summary(days=2, today=today)
+
+        self.assertEqual((summary['occupancy'], summary['capacity_use'], summary['bookings']), (round(150 / 3360 * 100, 1), round(150 / 8400 * 100, 1), 3))
+        self.assertEqual((summary['peak_hour'], summary['peak_weekday']), ('09:00', 'Mon'))
+        self.assertEqual([room['name'] for room in summary['rooms']], ['Suite 1', 'Booth 1'])
+        self.assertEqual({floor['floor']: floor['percent'] for floor in summary['floors']}, {1: 0.0, 2: round(150 / 1680 * 100, 1)})
+        self.assertEqual(summary['average_gap_minutes'], 60.0)
+
+        self.book(self.suite, 9, 12, day=self.DAY + timedelta(days=1))
+        refresh_room_stats(since=self.DAY, until=self.DAY + timedelta(days=1))
+        self.assertEqual(dashboard_summary(days=2, today=today)['bookings'], 4)
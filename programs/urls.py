@@ -8,6 +8,7 @@ app_name = 'programs'
 urlpatterns = [
     # --- PUBLIC STATIC PATHS ---
     path('', views.program_list, name='program_list'),
+    path('search/', views.program_search, name='program_search'),
     path('admission/', views.admission, name='admission'), 
     path('message-from-the-president/', views.president_message, name='president_message'),
     path('about-accra-business-school/', views.about_abs, name='about_abs'),
@@ -27,6 +28,8 @@ urlpatterns = [
     path('student-request/', views.student_request_view, name='student_request'),
     path('study-room-reservation/', views.study_room_reservation, name='study_room_reservation'),
     path('study-room-grid/', views.room_reservation_grid, name='room_reservation_grid'),
+    path('study-room-availability/', views.room_availability, name='room_availability'),
+    path('study-room-events/', views.room_events, name='room_events'),
 
     # --- REGISTRATION FLOW ---
     path('course-registration/', views.course_registration_view, name='course_registration'),
@@ -51,6 +54,9 @@ urlpatterns = [
 
     # Table view for student IDs, emails, etc. (This is where the logs live)
     path('dashboard/room-bookings/', views.staff_room_bookings, name='staff_room_bookings'),
+
+    # Streaming CSV/XLSX download of the (filtered) logs
+    path('dashboard/room-bookings/export/', views.export_room_bookings, name='export_room_bookings'),
     
     # --- THE PURGE: DELETE ALL BOOKING LOGS ---
     path('dashboard/room-bookings/purge/', views.clear_all_bookings, name='clear_all_bookings'),
@@ -58,6 +64,13 @@ urlpatterns = [
     # --- NEW: DELETE SINGLE BOOKING LOG ---
     path('dashboard/room-bookings/delete/<int:booking_id>/', views.delete_single_booking, name='delete_single_booking'),
     
+    # --- PRINTABLE PDF RECEIPTS ---
+    path('receipts/reservation/<int:booking_id>/', views.reservation_receipt, name='reservation_receipt'),
+    path('receipts/registration/<int:registration_id>/', views.registration_receipt, name='registration_receipt'),
+
+    # Background job queue depth and failures
+    path('dashboard/jobs/', views.staff_job_queue, name='staff_job_queue'),
+
     # --- DYNAMIC SLUG PATH ---
     path('<slug:slug>/', views.program_detail, name='program_detail'),
 ]
\ No newline at end of file
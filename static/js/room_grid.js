@@ -0,0 +1,61 @@
+/**
+ * Live room grid: polls the room availability API and hands each room's
+ * current state to the page, which updates just the affected cards.
+ * The browser revalidates with If-None-Match, so an unchanged grid costs a 304.
+ * With an `events` URL it also listens to the server-sent room events and
+ * applies each pushed room straight away; polling then only backs the stream
+ * up. Where the server cannot stream (204, error) it simply keeps polling.
+ */
+const RoomGrid = (() => {
+    function stateAt(room, now) {
+        const booked = room.busy.some(([start, end]) => new Date(start) <= now && now < new Date(end));
+        return { booked, free: room.in_service && !booked, inService: room.in_service };
+    }
+
+    function watch(url, onRoom, { interval = 30000, onUpdate = null, events = null, streamInterval = 300000 } = {}) {
+        let timer = null;
+
+        function apply(rooms) {
+            const now = new Date();
+            const states = rooms.map(room => [room, stateAt(room, now)]);
+            states.forEach(([room, state]) => onRoom(room, state));
+            if (onUpdate) onUpdate(states);
+        }
+
+        async function refresh() {
+            try {
+                const response = await fetch(url, { cache: 'no-cache', credentials: 'same-origin' });
+                if (!response.ok) return;
+                const data = await response.json();
+                apply(data.rooms);
+            } catch (err) {
+                // Offline or mid-deploy: keep what is on screen and try again next tick
+            }
+        }
+
+        function poll(every) {
+            clearInterval(timer);
+            timer = setInterval(refresh, every);
+        }
+
+        refresh();
+        poll(interval);
+        document.addEventListener('visibilitychange', () => {
+            if (document.visibilityState === 'visible') refresh();
+        });
+
+        if (events && window.EventSource) {
+            const source = new EventSource(events);
+            source.onopen = () => poll(streamInterval);
+            source.addEventListener('rooms', e => apply(JSON.parse(e.data).rooms));
+            source.addEventListener('resync', refresh);
+            source.onerror = () => {
+                // Reconnecting (or closed for good on a 204): poll at full rate meanwhile
+                poll(interval);
+                if (source.readyState === EventSource.CLOSED) source.close();
+            };
+        }
+    }
+
+    return { watch };
+})();
@@ -0,0 +1,11 @@
+/**
+ * Tailwind build for static/css/site.css -- run `python manage.py build_css`.
+ * The content globs are passed by build_css (--content), which also scans the
+ * installed apps' template directories outside the project tree.
+ */
+module.exports = {
+  theme: {
+    extend: {},
+  },
+  plugins: [],
+};
@@ -1,17 +1,30 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from phonenumber_field.modelfields import PhoneNumberField
-from django.db.models.signals import post_save
-from django.dispatch import receiver
-from django.db import IntegrityError
 
 class CustomUser(AbstractUser):
+    # Any of these makes the user staff; otherwise they are a student
+    ROLE_FIELDS = ('is_staff', 'is_superuser', 'is_staff_member')
+
     phone_number = PhoneNumberField(
-        blank=True, 
-        null=True, 
+        blank=True,
+        null=True,
         help_text="Format: +233201234567. Required for SMS OTP."
     )
-    is_staff_member = models.BooleanField(default=False) 
+    is_staff_member = models.BooleanField(default=False)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored role so saves that do not change it skip profile
+        # provisioning (programs/profiles.py), last_login updates included
+        if not instance.get_deferred_fields().intersection(cls.ROLE_FIELDS):
+            instance._loaded_role = instance.role
+        return instance
+
+    @property
+    def role(self):
+        return 'staff' if any(getattr(self, field) for field in self.ROLE_FIELDS) else 'student'
 
     @property
     def phone_number_for_sms(self):
@@ -22,38 +35,4 @@ class CustomUser(AbstractUser):
     def __str__(self):
         return self.username
 
-# --- THE FIXED AUTO-CREATE STAFF LOGIC ---
-@receiver(post_save, sender=CustomUser)
-def create_or_update_staff_profile(sender, instance, created, **kwargs):
-    from programs.models import StaffProfile 
-    
-    # Only create a StaffProfile if the user is actually staff/admin
-    if instance.is_staff or instance.is_superuser or instance.is_staff_member:
-        if created:
-            StaffProfile.objects.get_or_create(user=instance)
-        else:
-            profile = getattr(instance, 'staff_profile', None)
-            if profile:
-                profile.save()
-            else:
-                StaffProfile.objects.get_or_create(user=instance)
-
-# --- THE FIXED AUTO-CREATE STUDENT LOGIC ---
-@receiver(post_save, sender=CustomUser)
-def create_or_update_student_profile(sender, instance, created, **kwargs):
-    from programs.models import StudentProfile 
-    
-    # ONLY create a StudentProfile if the user is NOT staff
-    if not (instance.is_staff or instance.is_superuser or instance.is_staff_member):
-        try:
-            if created:
-                StudentProfile.objects.get_or_create(user=instance)
-            else:
-                profile = getattr(instance, 'student_profile', None)
-                if profile:
-                    profile.save()
-                else:
-                    StudentProfile.objects.get_or_create(user=instance)
-        except IntegrityError:
-            # This prevents the crash if a student_id conflict occurs
-            pass
\ No newline at end of file
+# Student/staff profiles are created by programs.profiles (post_save on this model)